@@ -63,10 +63,14 @@ INSTALLED_APPS = [
     'kokeilunpaikka.users.apps.UsersConfig',
     'kokeilunpaikka.stages.apps.StagesConfig',
     'kokeilunpaikka.sitemap.apps.SitemapConfig',
+    'kokeilunpaikka.performance.apps.PerformanceConfig',
     'importer',
 ]
 
 MIDDLEWARE = [
+    'kokeilunpaikka.performance.middleware.MetricsMiddleware',
+    'kokeilunpaikka.performance.middleware.ProfilingMiddleware',
+    'kokeilunpaikka.performance.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -191,6 +195,22 @@ DATABASES = {
     }
 }
 
+# CACHE
+##########
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Backends of caches not shared by processes. Deployments must use a shared
+# cache, as cached data is invalidated through generations stored in it.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
 # SECURITY
 ##########
 
@@ -244,6 +264,24 @@ LOGGING = {
     },
 }
 
+# METRICS
+##########
+# The metrics are kept in the memory of each process, so with several
+# workers every worker has to be scraped separately, or the series of the
+# workers get mixed. Disabled unless the deployment is set up for that.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+
+# Bearer token of the metrics scraper. Staff users can read the metrics
+# without the token.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Profiling of requests made by staff users with the X-Profile header.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+
+# Inspection of the queries of every request, 'warn' or 'raise'. Only meant
+# for development and tests.
+QUERY_INSPECTION = None
+
 # DJANGO REST FRAMEWORK
 ##########
 REST_FRAMEWORK = {
@@ -270,6 +308,13 @@ REST_AUTH_SERIALIZERS = {
 
 REST_TOKEN_EXPIRATION_TIME = 24 * 7  # hours
 
+REST_TOKEN_CACHE_TIMEOUT = 5 * 60  # seconds
+
+# Validated tokens are cached only when the cache is shared by all
+# processes. A logout or a deactivation invalidates the cached tokens only in
+# the cache of the process handling it.
+REST_TOKEN_CACHE_ENABLED = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
 REST_AUTH_TOKEN_CREATOR = 'kokeilunpaikka.utils.authentication.create_expiring_token'
 
 BASE_FRONTEND_URL = os.environ.get('BASE_FRONTEND_URL')
@@ -5,8 +5,12 @@ ALLOWED_HOSTS = []
 
 DEBUG = True
 
-# Use nose to run all tests
-TEST_RUNNER = 'django_nose.NoseTestSuiteRunner'
+# Log queries repeated per row and requests exceeding their query budgets.
+QUERY_INSPECTION = 'warn'
+
+# Use nose to run all tests. Requests exceeding the query budgets of the
+# views fail the tests.
+TEST_RUNNER = 'kokeilunpaikka.performance.runner.QueryInspectingTestRunner'
 
 NOSE_ARGS = [
     '--exe',
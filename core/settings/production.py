@@ -1,3 +1,5 @@
+import os
+
 from .base import *  # noqa: F401, F403
 
 SITE_ID = 1
@@ -12,3 +14,16 @@ GS_BUCKET_NAME = 'motiva-production'
 GS_LOCATION = 'kokeilunpaikka'
 GS_FILE_OVERWRITE = False
 THUMBNAIL_DEFAULT_STORAGE = DEFAULT_FILE_STORAGE
+
+# The cache must be shared by all processes, see `REST_TOKEN_CACHE_ENABLED`.
+CACHES = {
+    'default': {
+        'BACKEND': (
+            os.getenv('CACHE_BACKEND') or
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION') or '127.0.0.1:11211',
+    }
+}
+
+REST_TOKEN_CACHE_ENABLED = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS  # noqa: F405
@@ -1,6 +1,18 @@
 from django.contrib.auth.apps import AuthConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class AuthenticationConfig(AuthConfig):
     name = 'extensions.auth'
     label = 'authentication'
+
+    def ready(self):
+        super().ready()
+
+        from rest_framework.authtoken.models import Token
+
+        from .signals import invalidate_token, invalidate_user_tokens
+
+        post_save.connect(invalidate_token, sender=Token)
+        post_delete.connect(invalidate_token, sender=Token)
+        post_save.connect(invalidate_user_tokens, sender=self.get_model('User'))
@@ -8,7 +8,7 @@ from rest_auth.views import (
     PasswordResetView
 )
 
-from .views import CustomUserDetailsView
+from .views import CustomUserDetailsView, SessionView
 
 urlpatterns = [
     # URLs that do not require a session or valid token
@@ -20,6 +20,7 @@ urlpatterns = [
     # URLs that require a user to be logged in with a valid session / token.
     url(r'^logout/$', LogoutView.as_view(), name='rest_logout'),
     url(r'^user/$', CustomUserDetailsView.as_view(), name='rest_user_details'),
+    url(r'^session/$', SessionView.as_view(), name='rest_session'),
     url(r'^password/change/$', PasswordChangeView.as_view(),
         name='rest_password_change'),
 ]
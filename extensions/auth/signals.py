@@ -0,0 +1,21 @@
+from rest_framework.authtoken.models import Token
+
+from kokeilunpaikka.utils.authentication import invalidate_token_cache
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """Remove a saved or deleted token, e.g. on logout, from the cache."""
+    invalidate_token_cache(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Remove the tokens of a saved user from the cache.
+
+    The cached token contains the active status of the user, so it must not
+    outlive the user being deactivated.
+    """
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    invalidate_token_cache(*Token.objects.filter(
+        user_id=instance.pk,
+    ).values_list('key', flat=True))
@@ -1,14 +1,31 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.test import APITestCase
 
 from kokeilunpaikka.themes.models import Theme
 from kokeilunpaikka.uploads.models import Image
-from kokeilunpaikka.users.models import UserLookingForOption, UserStatusOption
+from kokeilunpaikka.users.models import (
+    UserLookingForOption,
+    UserProfile,
+    UserStatusOption
+)
+from kokeilunpaikka.utils.authentication import (
+    ExpiringTokenAuthentication,
+    create_expiring_token
+)
 
 
 class AuthenticationAPITestCase(APITestCase):
@@ -103,6 +120,51 @@ class AuthenticationAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), expected_response_body)
 
+    def test_session(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.create(user=self.user)
+        url = reverse('rest_session')
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'id': self.user.id,
+            'avatar_url': '',
+            'first_name': 'John',
+            'full_name': 'John Doe',
+            'last_name': 'Doe',
+            'profile_version': 1,
+        })
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.description = 'Lorem ipsum'
+            self.user.profile.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()['profile_version'], 2)
+
+    @patch('kokeilunpaikka.users.directory.thumbnail_default_storage')
+    def test_session_resolves_avatar_url(self, storage_mock):
+        signed_url = 'https://storage.example.com/avatar.jpg?Signature=' + 'x' * 300
+        storage_mock.url.return_value = signed_url
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.create(user=self.user)
+        self.user.directory_entry.avatar_thumbnail = 'avatar.jpg'
+        self.user.directory_entry.save()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse('rest_session'))
+        self.assertEqual(response.json()['avatar_url'], signed_url)
+        storage_mock.url.assert_called_once_with('avatar.jpg')
+
+    def test_session_requires_authentication(self):
+        response = self.client.get(reverse('rest_session'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_current_user_update(self):
         theme = Theme.objects.create(
             name='Theme'
@@ -217,3 +279,69 @@ class AuthenticationAPITestCase(APITestCase):
         image.save()
         response = self.client.patch(url, request_body)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(REST_TOKEN_CACHE_ENABLED=True)
+class ExpiringTokenAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(
+            username='john.doe@example.com',
+            is_active=True,
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = ExpiringTokenAuthentication()
+
+    def test_cached_token_is_authenticated_without_queries(self):
+        with self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+            self.assertEqual(user.id, self.user.id)
+            self.assertTrue(user.is_authenticated)
+        self.assertEqual(user.username, 'john.doe@example.com')
+
+    def test_cached_user_reflects_assigned_attributes(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        user, token = self.authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(1):
+            user.is_active = False
+        self.assertFalse(user.is_active)
+        self.assertFalse(user.is_staff)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_deleted_token_is_rejected(self):
+        key = self.token.key
+        self.authentication.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(key)
+
+    @override_settings(REST_TOKEN_CACHE_ENABLED=False)
+    def test_token_deleted_out_of_band_is_rejected_without_shared_cache(self):
+        key = self.token.key
+        self.authentication.authenticate_credentials(key)
+        # Deleted by another process, the signals of which don't reach the
+        # cache of this process.
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM authtoken_token WHERE key = %s', [key])
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(key)
+
+    def test_token_of_deactivated_user_is_rejected(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_refreshed_token_is_not_expired(self):
+        Token.objects.filter(pk=self.token.pk).update(
+            created=timezone.now() - timedelta(hours=settings.REST_TOKEN_EXPIRATION_TIME + 1)
+        )
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+        create_expiring_token(Token, self.user, None)
+        user, token = self.authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
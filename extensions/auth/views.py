@@ -1,4 +1,9 @@
 from rest_auth.views import UserDetailsView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from kokeilunpaikka.users.directory import get_session_data, get_thumbnail_url
 
 
 class CustomUserDetailsView(UserDetailsView):
@@ -8,6 +13,12 @@ class CustomUserDetailsView(UserDetailsView):
 
     Return details of the currently logged in user.
 
+    ### Notices
+
+    - The experiments of the user are left out of the response when an extra
+      `without_experiments` query parameter is given in the URL like
+      `http://localhost:8019/api/auth/user/?without_experiments`.
+
     ### Response
 
     #### Example response data:
@@ -165,3 +176,49 @@ class CustomUserDetailsView(UserDetailsView):
         }
 
     """
+
+
+class SessionView(APIView):
+    """Return the minimal data of the currently logged in user.
+
+    get:
+
+    Return the data needed on every page load to show who is logged in.
+
+    ### Notices
+
+    - The response is served from a cache, so it is cheap enough to be
+      requested on every navigation.
+    - `profile_version` changes whenever the user or the profile of the user
+      changes. The full profile needs to be fetched from `/api/auth/user/`
+      only when the version differs from the one fetched previously.
+
+    ### Response
+
+    #### Example response data:
+
+        {
+            "id": 1,
+            "avatar_url": "http://testserver/media/test.jpeg.120x120_q80_crop.jpg",
+            "first_name": "John",
+            "full_name": "John Doe",
+            "last_name": "Doe",
+            "profile_version": 3
+        }
+
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        data = get_session_data(request.user)
+        return Response({
+            'id': data['id'],
+            'avatar_url': (
+                request.build_absolute_uri(get_thumbnail_url(data['avatar_thumbnail']))
+                if data['avatar_thumbnail'] else ''
+            ),
+            'first_name': data['first_name'],
+            'full_name': data['full_name'],
+            'last_name': data['last_name'],
+            'profile_version': data['version'],
+        })
@@ -1,25 +1,248 @@
 import csv
+import time
 from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait
+)
 from datetime import datetime
+from functools import reduce
+from itertools import groupby
+from operator import or_
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.text import slugify
 from django.utils.timezone import make_aware
 
 import pytz
+from parler.cache import get_translation_cache_key
 
+from kokeilunpaikka.experiments.feed import (
+    update_experiment_feed_scores,
+    update_user_feed_scores
+)
 from kokeilunpaikka.experiments.models import (
     Experiment,
     ExperimentExternalLink,
     ExperimentPost
 )
 from kokeilunpaikka.stages.models import QuestionAnswer
+from kokeilunpaikka.themes.catalog import theme_catalog
 from kokeilunpaikka.themes.models import Theme
 from kokeilunpaikka.uploads.models import Image
+from kokeilunpaikka.users.directory import update_directory_entries
 from kokeilunpaikka.users.models import UserProfile
 
+DEFAULT_BATCH_SIZE = 500
+
+# Slug base of experiments whose name has nothing to slugify, e.g. only
+# punctuation. The slug must not be empty as it identifies the experiment in
+# the URLs.
+FALLBACK_SLUG = 'experiment'
+
+
+def parse_timestamp(value, default=None):
+    """Parse a timestamp of the old system given in Helsinki time."""
+    if value == '':
+        return default
+    return make_aware(
+        datetime.strptime(value, '%Y-%m-%d %H:%M:%S'),
+        timezone=pytz.timezone('Europe/Helsinki')
+    )
+
+
+def parse_list(value):
+    """Parse a list exported in format `[a, b, c]`."""
+    return [x for x in value.replace('[', '').replace(']', '').split(', ') if x]
+
+
+def chunked(reader, size):
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def unique_rows(chunk):
+    """Return the rows of the chunk by id, the last occurrence of an id wins
+    like it would when the rows were saved one by one.
+    """
+    return {int(row['id']): row for row in chunk}
+
+
+def bulk_create_with_timestamps(model, instances):
+    """Insert the instances keeping their own `created_at` and `updated_at`.
+
+    `bulk_create` overwrites the timestamps as the fields have `auto_now` and
+    `auto_now_add` set. The original timestamps are written by a following
+    `bulk_update`, which doesn't touch them.
+    """
+    timestamps = [(instance.created_at, instance.updated_at) for instance in instances]
+    model.objects.bulk_create(instances)
+    for instance, (created_at, updated_at) in zip(instances, timestamps):
+        instance.created_at = created_at
+        instance.updated_at = updated_at
+    model.objects.bulk_update(instances, ('created_at', 'updated_at'))
+
+
+def generate_unique_slugs(instances):
+    """Set unique slugs for new experiment instances.
+
+    Mimics the behaviour of the `AutoSlugField`, which doesn't notice
+    duplicates within a batch inserted with `bulk_create`. The field uses
+    the `slugify_function` of an instance if it has one, so the instances
+    are given one returning their slug. The field still checks that the slug
+    is free before the insert.
+    """
+    slug_field = Experiment._meta.get_field('slug')
+    bases = {
+        instance: slugify(instance.name)[:slug_field.max_length].strip('-') or FALLBACK_SLUG
+        for instance in instances
+    }
+    if not bases:
+        return
+    taken = set(
+        Experiment.objects.filter(
+            reduce(or_, (Q(slug__startswith=base) for base in set(bases.values())))
+        ).values_list('slug', flat=True)
+    )
+    for instance, base in bases.items():
+        slug = base
+        i = 2
+        while slug in taken:
+            end = '-{}'.format(i)
+            slug = '{}{}'.format(base[:slug_field.max_length - len(end)].strip('-'), end)
+            i += 1
+        taken.add(slug)
+        instance.slug = slug
+        instance.slugify_function = lambda content, slug=slug: slug
+
+
+# Dictionary in format:
+# - key: question id in new django database to which this answer should be
+# assigned to
+# - value: list of content_key identifiers for question answers in the old
+# database, in the order of presentation (and the order in which these
+# answers should be concatenated)
+QUESTION_ANSWER_CONVERSION_TABLE = {
+    1: ['0_short_description', '2_point_of_exp'],
+    2: ['1_short_description', '2_what', '2_when'],
+    3: ['2_who'],
+    4: ['5_short_description'],
+    5: ['what_learned'],
+    6: ['what_next'],
+    8: ['3_short_description'],
+    9: ['2_skills'],
+}
+
+
+def add_experiment_data_row(language_data, row):
+    language_data[row['lang_code']][row['content_key']] = (
+        row['content'],
+        row['created_at'],
+        row['updated_at'],
+        row['stage'],
+    )
+
+
+def group_experiment_data(reader):
+    """Group all experiment data rows by the experiment id in memory.
+
+    Yields tuples of experiment id and the content of the experiment by
+    language and content key.
+    """
+    grouped_by_experiment_id = defaultdict(lambda: defaultdict(dict))
+    for row in reader:
+        add_experiment_data_row(grouped_by_experiment_id[int(row['experiment_id'])], row)
+    yield from grouped_by_experiment_id.items()
+
+
+def stream_experiment_groups(reader):
+    """Group experiment data rows sorted by the experiment id on the fly.
+
+    Yields the same tuples as `group_experiment_data` but keeps only the rows
+    of a single experiment in memory at a time.
+    """
+    previous_id = None
+    for experiment_id, rows in groupby(reader, key=lambda row: int(row['experiment_id'])):
+        if previous_id is not None and experiment_id <= previous_id:
+            raise CommandError(
+                'Experiment data is not sorted by experiment id '
+                '(id {} after {}).'.format(experiment_id, previous_id)
+            )
+        previous_id = experiment_id
+        language_data = defaultdict(dict)
+        for row in rows:
+            add_experiment_data_row(language_data, row)
+        yield experiment_id, language_data
+
+
+def read_checkpoint(path):
+    """Return the ids of experiments completely imported by a previous run."""
+    try:
+        with open(path) as f:
+            return {int(line) for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def build_experiment_post(experiment, data):
+    stage_id = int(data['title'][3])
+    lookup = f'{stage_id}_long_description'
+    if lookup not in data or data[lookup][0] == '':
+        return None
+
+    long_description, created_at_str, updated_at_str = data[lookup][:3]
+    created_at = parse_timestamp(created_at_str, timezone.now())
+    return ExperimentPost(
+        experiment_id=experiment.id,
+        created_by_id=experiment.created_by_id,
+        content=long_description,
+        title='',
+        created_at=created_at,
+        updated_at=parse_timestamp(updated_at_str, created_at),
+    )
+
+
+def build_question_answers(experiment, data):
+    answers = []
+    for question_id, old_keys in QUESTION_ANSWER_CONVERSION_TABLE.items():
+        answer = ''
+        for old_key in old_keys:
+            if old_key in data and data[old_key][0]:
+                # Add two linebreaks as separator if there are already
+                # answer content concatenated.
+                if answer != '':
+                    answer += '\n\n'
+
+                answer += data[old_key][0]
+                created_at_str = data[old_key][1]
+                updated_at_str = data[old_key][2]
+
+        if answer != '':
+            created_at = parse_timestamp(created_at_str, timezone.now())
+            answers.append(QuestionAnswer(
+                answered_by_id=experiment.created_by_id,
+                experiment_id=experiment.id,
+                question_id=question_id,
+                value=answer,
+                created_at=created_at,
+                updated_at=parse_timestamp(updated_at_str, created_at),
+            ))
+    return answers
+
 
 class Command(BaseCommand):
     help = 'Imports data from a given .csv file by data type'
@@ -27,115 +250,187 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--file', type=str)
         parser.add_argument('--type', type=str)
+        parser.add_argument(
+            '--batch-size',
+            default=DEFAULT_BATCH_SIZE,
+            help=(
+                'Number of rows imported in a single transaction. For '
+                'experiment data the number of experiments.'
+            ),
+            type=int,
+        )
+        parser.add_argument(
+            '--sorted',
+            action='store_true',
+            help=(
+                'Experiment data is sorted by experiment id. The rows are '
+                'grouped while reading instead of loading the whole file '
+                'into memory.'
+            ),
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'File where the ids of imported experiments are recorded. '
+                'Experiments listed in the file are skipped when the import '
+                'is run again.'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            default=1,
+            help='Number of threads importing experiment data in parallel.',
+            type=int,
+        )
 
     def handle(self, *args, **options):
         if not options['file']:
             raise CommandError('Invalid file path given.')
 
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        started = time.monotonic()
+
         with open(options['file'], newline='') as csvfile:
             reader = csv.DictReader(csvfile, delimiter=';', quotechar='"')
 
             if options['type'] == 'themes':
-                num_added, num_updated = self.import_themes(reader)
+                num_added, num_updated = self.import_in_chunks(reader, self.import_themes)
             elif options['type'] == 'users':
-                num_added, num_updated = self.import_users(reader)
+                self.check_themes_exist()
+                num_added, num_updated = self.import_in_chunks(reader, self.import_users)
             elif options['type'] == 'experiments':
-                num_added, num_updated = self.import_experiments(reader)
+                self.check_themes_exist()
+                num_added, num_updated = self.import_in_chunks(reader, self.import_experiments)
             elif options['type'] == 'experiment_data':
-                num_added, num_updated = self.import_experiment_data(reader)
+                num_added, num_updated = self.import_experiment_data(reader, options)
             else:
                 raise CommandError('Invalid import type given.')
 
+        elapsed = time.monotonic() - started
         self.stdout.write(self.style.SUCCESS(
-            'Successfully added {} rows, updated {} rows.'.format(num_added, num_updated)
-        ))
-
-    def import_themes(self, reader):
-        counter_created = 0
-        counter_updated = 0
-        for row in reader:
-            obj, created = Theme.objects.language('fi').update_or_create(
-                id=row['id'],
-                defaults={
-                    'name': row['name'],
-                    'is_curated': False,
-                }
+            'Successfully added {} rows, updated {} rows in {:.1f} s ({:.0f} rows/s).'.format(
+                num_added,
+                num_updated,
+                elapsed,
+                (num_added + num_updated) / elapsed if elapsed else 0,
             )
+        ))
 
-            # Override automatically set default timestamps on creation.
-            # This must be done with the update method of an queryset.
-            created_at = make_aware(
-                datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S'),
-                timezone=pytz.timezone('Europe/Helsinki')
-            ) if row['created_at'] != '' else timezone.now()
-            updated_at = make_aware(
-                datetime.strptime(row['updated_at'], '%Y-%m-%d %H:%M:%S'),
-                timezone=pytz.timezone('Europe/Helsinki')
-            ) if row['updated_at'] != '' else created_at
-
-            Theme.objects.filter(pk=obj.id).update(
-                created_at=created_at,
-                updated_at=updated_at,
-            )
-
-            if created:
-                counter_created += 1
-            else:
-                counter_updated += 1
-        return counter_created, counter_updated
-
-    def import_users(self, reader):
+    def check_themes_exist(self):
         if not Theme.objects.exists():
             raise CommandError('Themes must be imported before experiments.')
 
+    def import_in_chunks(self, reader, import_chunk):
+        """Import rows in chunks, each chunk in a single transaction."""
         counter_created = 0
         counter_updated = 0
-        for row in reader:
-            user_obj, created = get_user_model().objects.update_or_create(
-                id=row['id'],
-                defaults={
-                    'first_name': row['first_name'],
-                    'is_staff': False,
-                    'is_active': True,
-                    'last_name': row['last_name'],
-                    'username': row['email'],
-                    'email': row['email'],
-                    'last_login': make_aware(
-                        datetime.strptime(row['last_login'], '%Y-%m-%d %H:%M:%S'),
-                        timezone=pytz.timezone('Europe/Helsinki')
-                    ) if row['last_login'] != '' else None,
-                    'date_joined': make_aware(
-                        datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S'),
-                        timezone=pytz.timezone('Europe/Helsinki')
-                    ) if row['created_at'] != '' else timezone.now(),
-                }
-            )
+        started = time.monotonic()
+        for chunk in chunked(reader, self.batch_size):
+            with transaction.atomic():
+                num_created, num_updated = import_chunk(chunk)
+            counter_created += num_created
+            counter_updated += num_updated
+            if self.verbosity > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write('{} rows imported ({:.0f} rows/s).'.format(
+                    counter_created + counter_updated,
+                    (counter_created + counter_updated) / elapsed if elapsed else 0,
+                ))
+        return counter_created, counter_updated
 
-            # Remove existing photo instance if updating
-            if not created and user_obj.profile.image:
-                user_obj.profile.image.delete()
+    def import_themes(self, chunk):
+        rows = unique_rows(chunk)
+        translation_model = Theme._parler_meta.root_model
+        existing = Theme.objects.in_bulk(rows.keys())
+        translations = {
+            translation.master_id: translation
+            for translation in translation_model.objects.filter(
+                master_id__in=rows.keys(),
+                language_code='fi',
+            )
+        }
 
-            if row['image_filename']:
-                image = Image.objects.create(
-                    image=row['image_filename'],
-                    uploaded_by_id=user_obj.id
-                )
+        new_themes, updated_themes = [], []
+        new_translations, updated_translations = [], []
+        for theme_id, row in rows.items():
+            # Override automatically set default timestamps on creation.
+            created_at = parse_timestamp(row['created_at'], timezone.now())
+            updated_at = parse_timestamp(row['updated_at'], created_at)
+
+            theme = existing.get(theme_id) or Theme(id=theme_id)
+            theme.is_curated = False
+            theme.created_at = created_at
+            theme.updated_at = updated_at
+            (updated_themes if theme_id in existing else new_themes).append(theme)
+
+            translation = translations.get(theme_id)
+            if translation is None:
+                new_translations.append(translation_model(
+                    language_code='fi',
+                    master_id=theme_id,
+                    name=row['name'],
+                ))
             else:
-                image = None
-
-            theme_ids = [
-                int(x)
-                for x
-                in row['tags'].replace('[', '').replace(']', '').split(', ')
-                if x.isdigit()
-            ]
-
-            link_urls = [
-                x
-                for x
-                in row['links'].replace('[', '').replace(']', '').split(', ')
-                if x
-            ]
+                translation.name = row['name']
+                updated_translations.append(translation)
+
+        bulk_create_with_timestamps(Theme, new_themes)
+        Theme.objects.bulk_update(
+            updated_themes,
+            ('is_curated', 'created_at', 'updated_at'),
+        )
+        translation_model.objects.bulk_create(new_translations)
+        translation_model.objects.bulk_update(updated_translations, ('name',))
+
+        # Bulk operations bypass the translation cache of parler and the
+        # signals keeping the theme catalog up to date.
+        cache.delete_many([
+            get_translation_cache_key(translation_model, theme_id, 'fi')
+            for theme_id in rows
+        ])
+        theme_catalog.announce_change()
+
+        return len(new_themes), len(chunk) - len(new_themes)
+
+    def import_users(self, chunk):
+        user_model = get_user_model()
+        rows = unique_rows(chunk)
+        existing = user_model.objects.in_bulk(rows.keys())
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects.filter(user_id__in=rows.keys())
+        }
+
+        # Remove existing photo instances of updated users
+        Image.objects.filter(id__in=[
+            profile.image_id for profile in profiles.values() if profile.image_id
+        ]).delete()
+
+        images = {
+            user_id: Image(image=row['image_filename'], uploaded_by_id=user_id)
+            for user_id, row in rows.items()
+            if row['image_filename']
+        }
+        Image.objects.bulk_create(images.values())
+
+        new_users, updated_users = [], []
+        new_profiles, updated_profiles = [], []
+        theme_ids = {}
+        now = timezone.now()
+        for user_id, row in rows.items():
+            user = existing.get(user_id) or user_model(id=user_id)
+            user.first_name = row['first_name']
+            user.is_staff = False
+            user.is_active = True
+            user.last_name = row['last_name']
+            user.username = row['email']
+            user.email = row['email']
+            user.last_login = parse_timestamp(row['last_login'])
+            user.date_joined = parse_timestamp(row['created_at'], now)
+            (updated_users if user_id in existing else new_users).append(user)
+
+            link_urls = parse_list(row['links'])
 
             # Parse URLs per type for new profile model. Only the first
             # occurence is taken into account.
@@ -146,35 +441,84 @@ class Command(BaseCommand):
                 'twitter_url': next((x for x in link_urls if x.find('twitter.com') != -1), ''),
             }
 
-            profile_obj, profile_created = UserProfile.objects.update_or_create(
-                user_id=user_obj.id,
-                defaults={
-                    'description': row['description'],
-                    'expose_email_address': False,
-                    'language': settings.LANGUAGE_CODE,
-                    'status': None,
-                    'image': image,
-                    **links
-                }
-            )
-            profile_obj.interested_in_themes.set(theme_ids)
-            profile_obj.looking_for.clear()
-
-            if created:
-                counter_created += 1
-            else:
-                counter_updated += 1
-        return counter_created, counter_updated
-
-    def import_experiments(self, reader):
-        if not Theme.objects.exists():
-            raise CommandError('Themes must be imported before experiments.')
-
-        counter_created = 0
-        counter_updated = 0
-
-        for row in reader:
+            profile = profiles.get(user_id) or UserProfile(user_id=user_id)
+            profile.description = row['description']
+            profile.expose_email_address = False
+            profile.language = settings.LANGUAGE_CODE
+            profile.status = None
+            profile.image = images.get(user_id)
+            profile.updated_at = now
+            for field, value in links.items():
+                setattr(profile, field, value)
+            (updated_profiles if user_id in profiles else new_profiles).append(profile)
+
+            theme_ids[user_id] = {int(x) for x in parse_list(row['tags']) if x.isdigit()}
+
+        user_model.objects.bulk_create(new_users)
+        user_model.objects.bulk_update(updated_users, (
+            'first_name',
+            'is_staff',
+            'is_active',
+            'last_name',
+            'username',
+            'email',
+            'last_login',
+            'date_joined',
+        ))
+        UserProfile.objects.bulk_create(new_profiles)
+        UserProfile.objects.bulk_update(updated_profiles, (
+            'description',
+            'expose_email_address',
+            'language',
+            'status',
+            'image',
+            'updated_at',
+            'facebook_url',
+            'instagram_url',
+            'linkedin_url',
+            'twitter_url',
+        ))
 
+        profile_ids = [profile.id for profile in new_profiles + updated_profiles]
+        themes_through = UserProfile.interested_in_themes.through
+        themes_through.objects.filter(userprofile_id__in=profile_ids).delete()
+        themes_through.objects.bulk_create([
+            themes_through(userprofile_id=profile.id, theme_id=theme_id)
+            for profile in new_profiles + updated_profiles
+            for theme_id in theme_ids[profile.user_id]
+        ])
+        UserProfile.looking_for.through.objects.filter(userprofile_id__in=profile_ids).delete()
+
+        # The relations were replaced without signals.
+        update_user_feed_scores(list(rows.keys()))
+        update_directory_entries(list(rows.keys()))
+
+        return len(new_users), len(chunk) - len(new_users)
+
+    def import_experiments(self, chunk):
+        rows = unique_rows(chunk)
+        existing = Experiment.objects.in_bulk(rows.keys())
+
+        # Remove existing photo and link instances of updated experiments
+        Image.objects.filter(id__in=[
+            experiment.image_id for experiment in existing.values() if experiment.image_id
+        ]).delete()
+        ExperimentExternalLink.objects.filter(experiment_id__in=existing.keys()).delete()
+
+        images = {
+            experiment_id: Image(
+                image=row['image_filename'],
+                uploaded_by_id=row['created_by_id']
+            )
+            for experiment_id, row in rows.items()
+            if row['image_filename']
+        }
+        Image.objects.bulk_create(images.values())
+
+        new_experiments, updated_experiments = [], []
+        theme_ids = {}
+        links = []
+        for experiment_id, row in rows.items():
             stage_id = int(row['stage_id'])
 
             # Convert stage_id to match the new states in the system
@@ -187,34 +531,7 @@ class Command(BaseCommand):
             else:
                 raise CommandError('Invalid stage number')
 
-            # Remove existing photo and link instances if updating
-            existing_object = Experiment.objects.filter(pk=row['id']).first()
-            if existing_object:
-                if existing_object.image:
-                    existing_object.image.delete()
-                existing_object.external_links.all().delete()
-
-            if row['image_filename']:
-                image = Image.objects.create(
-                    image=row['image_filename'],
-                    uploaded_by_id=row['created_by_id']
-                )
-            else:
-                image = None
-
-            theme_ids = [
-                int(x)
-                for x
-                in row['tags'].replace('[', '').replace(']', '').split(', ')
-                if x.isdigit()
-            ]
-
-            link_urls = [
-                x
-                for x
-                in row['links'].replace('[', '').replace(']', '').split(', ')
-                if x
-            ]
+            link_urls = parse_list(row['links'])
 
             if row['name_fi'] != '':
                 language = 'fi'
@@ -223,190 +540,188 @@ class Command(BaseCommand):
             elif row['name_en'] != '':
                 language = 'en'
             else:
-                CommandError('Could not detect language for experiment content.')
-
-            obj, created = Experiment.objects.update_or_create(
-                id=row['id'],
-                defaults={
-                    'is_published': row['is_published'],
-                    'created_by_id': row['created_by_id'],
-                    'image': image,
-                    'language': language,
-                    'success_rating': None,
-                    'name': row[f'name_{language}'],
-                    'description': row[f'description_{language}'],
-                    'organizer': row[f'organizer_{language}'],
-                    'stage_id': converted_stage_id,
-                    'published_at': make_aware(
-                        datetime.strptime(row['published_at'], '%Y-%m-%d %H:%M:%S'),
-                        timezone=pytz.timezone('Europe/Helsinki')
-                    ) if row['published_at'] != '' else None,
-                }
-            )
-            obj.themes.set(theme_ids)
-            obj.responsible_users.set([row['created_by_id']])
-            obj.looking_for.clear()
-
-            for link_url in link_urls:
-                ExperimentExternalLink.objects.create(
-                    url=link_url,
-                    experiment=obj,
-                )
+                raise CommandError('Could not detect language for experiment content.')
 
             # Override automatically set default timestamps on creation.
-            # This must be done with the update method of an queryset.
-            created_at = make_aware(
-                datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S'),
-                timezone=pytz.timezone('Europe/Helsinki')
-            ) if row['created_at'] != '' else timezone.now()
-            updated_at = make_aware(
-                datetime.strptime(row['updated_at'], '%Y-%m-%d %H:%M:%S'),
-                timezone=pytz.timezone('Europe/Helsinki')
-            ) if row['updated_at'] != '' else created_at
-
-            Experiment.objects.filter(pk=obj.id).update(
-                created_at=created_at,
-                updated_at=updated_at,
-                description=obj.description + '\n\n' + '\n'.join(link_urls)
+            created_at = parse_timestamp(row['created_at'], timezone.now())
+            updated_at = parse_timestamp(row['updated_at'], created_at)
+
+            experiment = existing.get(experiment_id) or Experiment(
+                id=experiment_id,
+                stage_id=converted_stage_id,
+            )
+            experiment.is_published = row['is_published']
+            experiment.created_by_id = row['created_by_id']
+            experiment.image = images.get(experiment_id)
+            experiment.language = language
+            experiment.success_rating = None
+            experiment.name = row[f'name_{language}']
+            experiment.description = (
+                row[f'description_{language}'] + '\n\n' + '\n'.join(link_urls)
+            )
+            experiment.organizer = row[f'organizer_{language}']
+            experiment.stage_id = converted_stage_id
+            experiment.published_at = parse_timestamp(row['published_at'])
+            experiment.created_at = created_at
+            experiment.updated_at = updated_at
+            (updated_experiments if experiment_id in existing else new_experiments).append(
+                experiment
             )
 
-            if created:
-                counter_created += 1
-            else:
-                counter_updated += 1
-        return counter_created, counter_updated
+            theme_ids[experiment_id] = {int(x) for x in parse_list(row['tags']) if x.isdigit()}
+            links += [
+                ExperimentExternalLink(url=link_url, experiment_id=experiment_id)
+                for link_url in link_urls
+            ]
+
+        generate_unique_slugs(new_experiments)
+        bulk_create_with_timestamps(Experiment, new_experiments)
+        Experiment.objects.bulk_update(updated_experiments, (
+            'is_published',
+            'created_by',
+            'image',
+            'language',
+            'success_rating',
+            'name',
+            'description',
+            'organizer',
+            'stage',
+            'published_at',
+            'created_at',
+            'updated_at',
+        ))
 
-    def import_experiment_data(self, reader):
+        experiment_ids = list(rows.keys())
+        themes_through = Experiment.themes.through
+        themes_through.objects.filter(experiment_id__in=experiment_ids).delete()
+        themes_through.objects.bulk_create([
+            themes_through(experiment_id=experiment_id, theme_id=theme_id)
+            for experiment_id in experiment_ids
+            for theme_id in theme_ids[experiment_id]
+        ])
+        responsible_through = Experiment.responsible_users.through
+        responsible_through.objects.filter(experiment_id__in=experiment_ids).delete()
+        responsible_through.objects.bulk_create([
+            responsible_through(experiment_id=experiment_id, user_id=row['created_by_id'])
+            for experiment_id, row in rows.items()
+        ])
+        Experiment.looking_for.through.objects.filter(experiment_id__in=experiment_ids).delete()
+        ExperimentExternalLink.objects.bulk_create(links)
+
+        # The relations were replaced without signals.
+        update_experiment_feed_scores(experiment_ids)
+
+        return len(new_experiments), len(chunk) - len(new_experiments)
+
+    def import_experiment_data(self, reader, options):
         if not Experiment.objects.exists():
             raise CommandError('Experiments must be imported before data.')
 
-        counter_created = 0
-        counter_updated = 0
+        if options['sorted']:
+            groups = stream_experiment_groups(reader)
+        else:
+            groups = group_experiment_data(reader)
 
-        grouped_by_experiment_id = defaultdict(dict)
-
-        for row in reader:
-            experiment_id = int(row.pop('experiment_id'))
-            lang_code = row.pop('lang_code')
-
-            if lang_code not in grouped_by_experiment_id[experiment_id]:
-                grouped_by_experiment_id[experiment_id][lang_code] = {}
-            grouped_by_experiment_id[experiment_id][lang_code][row['content_key']] = (
-                row['content'],
-                row['created_at'],
-                row['updated_at'],
-                row['stage'],
+        checkpoint = None
+        if options['checkpoint']:
+            finished_ids = read_checkpoint(options['checkpoint'])
+            groups = (
+                group for group in groups if group[0] not in finished_ids
             )
+            checkpoint = open(options['checkpoint'], 'a')
 
-        for experiment_id, language_data in grouped_by_experiment_id.items():
-            try:
-                experiment = Experiment.objects.get(pk=experiment_id)
-            except Experiment.DoesNotExist:
-                continue
-
-            # Remove all related posts in case there are any to prevent
-            # duplicates if the command is run multiple times.
-            experiment.posts.all().delete()
-
-            stage_id = int(language_data[experiment.language]['title'][3])
-
-            long_description = ''
-            lookup = f'{stage_id}_long_description'
-            if lookup in language_data[experiment.language].keys():
-                long_description = language_data[experiment.language][lookup][0]
-                created_at_str = language_data[experiment.language][lookup][1]
-                updated_at_str = language_data[experiment.language][lookup][2]
-
-            if long_description != '':
-                counter_updated += 1
-
-                experiment_post = ExperimentPost.objects.create(
-                    experiment=experiment,
-                    created_by=experiment.created_by,
-                    content=long_description,
-                    title='',
-                )
-                experiment_post.images.clear()
-
-                # Override automatically set default timestamps on creation.
-                # This must be done with the update method of an queryset.
-                created_at = make_aware(
-                    datetime.strptime(created_at_str, '%Y-%m-%d %H:%M:%S'),
-                    timezone=pytz.timezone('Europe/Helsinki')
-                ) if created_at_str != '' else timezone.now()
-                updated_at = make_aware(
-                    datetime.strptime(updated_at_str, '%Y-%m-%d %H:%M:%S'),
-                    timezone=pytz.timezone('Europe/Helsinki')
-                ) if updated_at_str != '' else created_at
-
-                ExperimentPost.objects.filter(pk=experiment_post.id).update(
-                    created_at=created_at,
-                    updated_at=updated_at,
-                )
-
-            # Dictionary in format:
-            # - key: question id in new django database to which this answer
-            # should be assigned to
-            # - value: list of content_key identifiers for question answers in
-            # the old database, in the order of presentation (and the order in
-            # which these answers should be concatenated)
-            question_answer_conversion_table = {
-                1: ['0_short_description', '2_point_of_exp'],
-                2: ['1_short_description', '2_what', '2_when'],
-                3: ['2_who'],
-                4: ['5_short_description'],
-                5: ['what_learned'],
-                6: ['what_next'],
-                8: ['3_short_description'],
-                9: ['2_skills'],
-            }
-
-            # Remove all related answers in case there are any to prevent
-            # duplicates if the command is run multiple times.
-            experiment.questionanswer_set.all().delete()
+        counter_created = 0
+        counter_updated = 0
+        counter_experiments = 0
+        started = time.monotonic()
+
+        try:
+            for experiment_ids, num_created, num_updated in self.run_in_workers(
+                self.import_experiment_data_chunk,
+                chunked(groups, self.batch_size),
+                options['workers'],
+            ):
+                counter_created += num_created
+                counter_updated += num_updated
+                counter_experiments += len(experiment_ids)
+                if checkpoint:
+                    checkpoint.writelines('{}\n'.format(pk) for pk in experiment_ids)
+                    checkpoint.flush()
+                if self.verbosity > 1:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write('{} experiments imported ({:.0f} rows/s).'.format(
+                        counter_experiments,
+                        (counter_created + counter_updated) / elapsed if elapsed else 0,
+                    ))
+        finally:
+            if checkpoint:
+                checkpoint.close()
 
-            for question_id, old_keys in question_answer_conversion_table.items():
-                answer = ''
-                for old_key in old_keys:
-                    key_found_and_not_empty = (
-                        old_key in language_data[experiment.language].keys() and
-                        language_data[experiment.language][old_key][0]
-                    )
+        return counter_created, counter_updated
 
-                    if key_found_and_not_empty:
-                        # Add two linebreaks as separator if there are already
-                        # answer content concatenated.
-                        if answer != '':
-                            answer += '\n\n'
+    def run_in_workers(self, func, chunks, workers):
+        """Yield the results of func called for every chunk.
 
-                        answer += language_data[experiment.language][old_key][0]
-                        created_at_str = language_data[experiment.language][old_key][1]
-                        updated_at_str = language_data[experiment.language][old_key][2]
+        With more than one worker the chunks are processed in a thread pool.
+        Only a limited number of chunks is submitted at a time so that the
+        input is not read further than needed. Results are yielded in the
+        order of completion.
+        """
+        if workers <= 1:
+            for chunk in chunks:
+                yield func(chunk)
+            return
 
-                if answer != '':
-                    counter_updated += 1
-
-                    question_answer = QuestionAnswer.objects.create(
-                        answered_by=experiment.created_by,
-                        experiment=experiment,
-                        question_id=question_id,
-                        value=answer,
-                    )
-
-                    # Override automatically set default timestamps on creation.
-                    # This must be done with the update method of an queryset.
-                    created_at = make_aware(
-                        datetime.strptime(created_at_str, '%Y-%m-%d %H:%M:%S'),
-                        timezone=pytz.timezone('Europe/Helsinki')
-                    ) if created_at_str != '' else timezone.now()
-                    updated_at = make_aware(
-                        datetime.strptime(updated_at_str, '%Y-%m-%d %H:%M:%S'),
-                        timezone=pytz.timezone('Europe/Helsinki')
-                    ) if updated_at_str != '' else created_at
-
-                    QuestionAnswer.objects.filter(pk=question_answer.id).update(
-                        created_at=created_at,
-                        updated_at=updated_at,
-                    )
+        def run(chunk):
+            try:
+                return func(chunk)
+            finally:
+                # Every thread has a connection of its own.
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(run, chunk))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+    def import_experiment_data_chunk(self, groups):
+        """Import posts and answers of the given experiment groups.
+
+        Returns the ids of the handled experiments and the number of created
+        and updated rows.
+        """
+        language_data_by_id = dict(groups)
+        counter_updated = 0
 
-        return counter_created, counter_updated
+        with transaction.atomic():
+            experiments = Experiment.objects.only(
+                'id',
+                'created_by_id',
+                'language',
+            ).in_bulk(language_data_by_id.keys())
+
+            # Remove all related posts and answers in case there are any to
+            # prevent duplicates if the command is run multiple times.
+            ExperimentPost.objects.filter(experiment_id__in=experiments.keys()).delete()
+            QuestionAnswer.objects.filter(experiment_id__in=experiments.keys()).delete()
+
+            posts = []
+            answers = []
+            for experiment_id, experiment in experiments.items():
+                data = language_data_by_id[experiment_id][experiment.language]
+                post = build_experiment_post(experiment, data)
+                if post:
+                    posts.append(post)
+                answers += build_question_answers(experiment, data)
+
+            bulk_create_with_timestamps(ExperimentPost, posts)
+            bulk_create_with_timestamps(QuestionAnswer, answers)
+            counter_updated += len(posts) + len(answers)
+
+        return list(language_data_by_id.keys()), 0, counter_updated
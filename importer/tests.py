@@ -0,0 +1,314 @@
+import csv
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from kokeilunpaikka.experiments.models import Experiment, ExperimentPost
+from kokeilunpaikka.stages.models import Question, QuestionAnswer, Stage
+from kokeilunpaikka.themes.models import Theme
+from kokeilunpaikka.users.models import UserProfile
+
+THEME_FIELDS = ('id', 'name', 'created_at', 'updated_at')
+
+USER_FIELDS = (
+    'id', 'first_name', 'last_name', 'email', 'last_login', 'created_at',
+    'links', 'description', 'image_filename', 'tags',
+)
+
+EXPERIMENT_FIELDS = (
+    'id', 'stage_id', 'links', 'name_fi', 'name_sv', 'name_en',
+    'description_fi', 'description_sv', 'description_en', 'organizer_fi',
+    'organizer_sv', 'organizer_en', 'created_at', 'updated_at',
+    'published_at', 'is_published', 'created_by_id', 'image_filename', 'tags',
+)
+
+EXPERIMENT_DATA_FIELDS = (
+    'experiment_id', 'lang_code', 'content_key', 'content', 'created_at',
+    'updated_at', 'stage',
+)
+
+# Timestamps of the old system are in Helsinki time.
+CREATED_AT = '2015-03-01 12:00:00'
+UPDATED_AT = '2016-06-01 15:30:00'
+CREATED_AT_UTC = datetime(2015, 3, 1, 10, 0, tzinfo=timezone.utc)
+UPDATED_AT_UTC = datetime(2016, 6, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def theme_row(pk, name='Teema'):
+    return (pk, name, CREATED_AT, UPDATED_AT)
+
+
+def user_row(pk, first_name='Matti', tags='[1]'):
+    return (
+        pk, first_name, 'Meikäläinen', 'user{}@example.com'.format(pk), '',
+        CREATED_AT, '[https://twitter.com/matti]', 'Kuvaus', '', tags,
+    )
+
+
+def experiment_row(pk, name='Kokeilu', created_by_id=1, tags='[1]'):
+    return (
+        pk, 4, '[https://example.com]', name, '', '', 'Kuvaus', '', '',
+        'Järjestäjä', '', '', CREATED_AT, UPDATED_AT, UPDATED_AT, '1',
+        created_by_id, '', tags,
+    )
+
+
+def experiment_data_rows(experiment_id):
+    return [
+        (experiment_id, 'fi', content_key, content, CREATED_AT, UPDATED_AT, '1')
+        for content_key, content in (
+            ('title', 'Otsikko'),
+            ('1_long_description', 'Pitkä kuvaus {}'.format(experiment_id)),
+            ('0_short_description', 'Lyhyt kuvaus'),
+            ('2_point_of_exp', 'Tarkoitus'),
+            ('2_who', 'Kuka {}'.format(experiment_id)),
+        )
+    ]
+
+
+def interleaved_experiment_data_rows(experiment_ids):
+    """Return the data rows of the experiments mixed with each other, like
+    they are in an unsorted dump.
+    """
+    return [
+        row
+        for rows in zip(*(experiment_data_rows(pk) for pk in experiment_ids))
+        for row in rows
+    ]
+
+
+def imported_experiment_data():
+    return (
+        list(ExperimentPost.objects.order_by('experiment_id').values_list(
+            'experiment_id', 'content', 'created_at', 'updated_at',
+        )),
+        list(QuestionAnswer.objects.order_by('experiment_id', 'question_id').values_list(
+            'experiment_id', 'question_id', 'value', 'created_at', 'updated_at',
+        )),
+    )
+
+
+class ImportMixin:
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for stage_number in (1, 2, 3):
+            Stage.objects.create(stage_number=stage_number)
+
+    def import_rows(self, import_type, fields, rows, **options):
+        path = os.path.join(self.directory, '{}.csv'.format(import_type))
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';', quotechar='"')
+            writer.writerow(fields)
+            writer.writerows(rows)
+        call_command(
+            'import_csv_dump',
+            file=path,
+            type=import_type,
+            stdout=StringIO(),
+            **options
+        )
+
+    def import_themes_and_users(self):
+        self.import_rows('themes', THEME_FIELDS, [theme_row(1), theme_row(2)])
+        self.import_rows('users', USER_FIELDS, [user_row(1), user_row(2, tags='[1, 2]')])
+
+    def import_experiments(self, experiment_ids):
+        self.import_themes_and_users()
+        self.import_rows('experiments', EXPERIMENT_FIELDS, [
+            experiment_row(pk) for pk in experiment_ids
+        ])
+        for pk in (1, 3):
+            Question.objects.create(id=pk, stage_id=1, question='Kysymys')
+
+
+class ImportCsvDumpTestCase(ImportMixin, TestCase):
+
+    def test_import_themes(self):
+        self.import_rows('themes', THEME_FIELDS, [theme_row(1), theme_row(2)])
+        theme = Theme.objects.get(pk=1)
+        self.assertEqual(theme.name, 'Teema')
+        self.assertEqual(theme.created_at, CREATED_AT_UTC)
+        self.assertEqual(theme.updated_at, UPDATED_AT_UTC)
+
+        # The import can be run again to update the rows.
+        self.import_rows('themes', THEME_FIELDS, [theme_row(1, name='Uusi teema')])
+        self.assertEqual(Theme.objects.count(), 2)
+        theme = Theme.objects.get(pk=1)
+        self.assertEqual(theme.name, 'Uusi teema')
+        self.assertEqual(theme.created_at, CREATED_AT_UTC)
+
+    def test_import_users(self):
+        self.import_themes_and_users()
+        user = get_user_model().objects.get(pk=2)
+        self.assertEqual(user.username, 'user2@example.com')
+        self.assertEqual(user.date_joined, CREATED_AT_UTC)
+        self.assertEqual(user.profile.twitter_url, 'https://twitter.com/matti')
+        self.assertEqual(
+            sorted(user.profile.interested_in_themes.values_list('pk', flat=True)),
+            [1, 2]
+        )
+
+        self.import_rows('users', USER_FIELDS, [user_row(2, first_name='Maija', tags='')])
+        self.assertEqual(get_user_model().objects.count(), 2)
+        self.assertEqual(UserProfile.objects.count(), 2)
+        user = get_user_model().objects.get(pk=2)
+        self.assertEqual(user.first_name, 'Maija')
+        self.assertFalse(user.profile.interested_in_themes.exists())
+
+    def test_import_experiments(self):
+        self.import_themes_and_users()
+        self.import_rows('experiments', EXPERIMENT_FIELDS, [
+            experiment_row(1, tags='[1, 2]'),
+            experiment_row(2, created_by_id=2),
+        ])
+        experiment = Experiment.objects.get(pk=1)
+        self.assertEqual(experiment.name, 'Kokeilu')
+        self.assertEqual(experiment.language, 'fi')
+        self.assertEqual(experiment.stage_id, 2)
+        self.assertTrue(experiment.is_published)
+        self.assertEqual(experiment.created_at, CREATED_AT_UTC)
+        self.assertEqual(experiment.updated_at, UPDATED_AT_UTC)
+        self.assertEqual(sorted(experiment.themes.values_list('pk', flat=True)), [1, 2])
+        self.assertEqual(list(experiment.responsible_users.values_list('pk', flat=True)), [1])
+        self.assertEqual(
+            list(experiment.external_links.values_list('url', flat=True)),
+            ['https://example.com']
+        )
+
+        self.import_rows('experiments', EXPERIMENT_FIELDS, [
+            experiment_row(1, name='Uusi nimi', tags='[2]'),
+        ])
+        self.assertEqual(Experiment.objects.count(), 2)
+        experiment = Experiment.objects.get(pk=1)
+        self.assertEqual(experiment.name, 'Uusi nimi')
+        self.assertEqual(list(experiment.themes.values_list('pk', flat=True)), [2])
+        self.assertEqual(experiment.external_links.count(), 1)
+
+    def test_import_experiments_generates_unique_slugs(self):
+        self.import_themes_and_users()
+        Experiment.objects.create(name='Kokeilu')
+        self.import_rows('experiments', EXPERIMENT_FIELDS, [
+            experiment_row(10),
+            experiment_row(11),
+        ])
+        self.assertEqual(
+            sorted(Experiment.objects.values_list('slug', flat=True)),
+            ['kokeilu', 'kokeilu-2', 'kokeilu-3']
+        )
+
+    def test_import_experiments_without_sluggable_name(self):
+        self.import_themes_and_users()
+        self.import_rows('experiments', EXPERIMENT_FIELDS, [
+            experiment_row(10, name='!!!'),
+            experiment_row(11, name='?'),
+        ])
+        self.assertEqual(
+            sorted(Experiment.objects.values_list('slug', flat=True)),
+            ['experiment', 'experiment-2']
+        )
+
+    def test_import_experiment_data(self):
+        self.import_experiments([1])
+        self.import_rows('experiment_data', EXPERIMENT_DATA_FIELDS, experiment_data_rows(1))
+        post = ExperimentPost.objects.get()
+        self.assertEqual(post.content, 'Pitkä kuvaus 1')
+        self.assertEqual(post.created_by_id, 1)
+        self.assertEqual(post.created_at, CREATED_AT_UTC)
+        self.assertEqual(post.updated_at, UPDATED_AT_UTC)
+        self.assertEqual(
+            dict(QuestionAnswer.objects.values_list('question_id', 'value')),
+            {1: 'Lyhyt kuvaus\n\nTarkoitus', 3: 'Kuka 1'}
+        )
+
+        # Running the import again replaces the posts and answers.
+        self.import_rows('experiment_data', EXPERIMENT_DATA_FIELDS, experiment_data_rows(1))
+        self.assertEqual(ExperimentPost.objects.count(), 1)
+        self.assertEqual(QuestionAnswer.objects.count(), 2)
+
+    def test_import_sorted_experiment_data(self):
+        self.import_experiments([1, 2, 3])
+        self.import_rows(
+            'experiment_data',
+            EXPERIMENT_DATA_FIELDS,
+            interleaved_experiment_data_rows([3, 1, 2]),
+        )
+        unsorted_data = imported_experiment_data()
+        self.assertEqual(len(unsorted_data[0]), 3)
+
+        ExperimentPost.objects.all().delete()
+        QuestionAnswer.objects.all().delete()
+        self.import_rows(
+            'experiment_data',
+            EXPERIMENT_DATA_FIELDS,
+            experiment_data_rows(1) + experiment_data_rows(2) + experiment_data_rows(3),
+            sorted=True,
+            batch_size=2,
+        )
+        self.assertEqual(imported_experiment_data(), unsorted_data)
+
+    def test_import_sorted_experiment_data_rejects_unsorted_rows(self):
+        self.import_experiments([1, 2])
+        with self.assertRaises(CommandError):
+            self.import_rows(
+                'experiment_data',
+                EXPERIMENT_DATA_FIELDS,
+                interleaved_experiment_data_rows([1, 2]),
+                sorted=True,
+            )
+
+    def test_import_experiment_data_with_checkpoint(self):
+        self.import_experiments([1, 2, 3])
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        with open(checkpoint, 'w') as f:
+            f.write('1\n')
+
+        rows = interleaved_experiment_data_rows([1, 2, 3])
+        self.import_rows('experiment_data', EXPERIMENT_DATA_FIELDS, rows, checkpoint=checkpoint)
+        self.assertEqual(
+            sorted(ExperimentPost.objects.values_list('experiment_id', flat=True)),
+            [2, 3]
+        )
+        with open(checkpoint) as f:
+            self.assertEqual(sorted(int(line) for line in f), [1, 2, 3])
+
+        # A resumed run skips all the experiments recorded so far.
+        ExperimentPost.objects.filter(experiment_id=2).delete()
+        self.import_rows('experiment_data', EXPERIMENT_DATA_FIELDS, rows, checkpoint=checkpoint)
+        self.assertEqual(
+            list(ExperimentPost.objects.values_list('experiment_id', flat=True)),
+            [3]
+        )
+
+
+class ImportCsvDumpWorkersTestCase(ImportMixin, TransactionTestCase):
+    """The worker threads have database connections of their own, so the
+    imported rows must be committed for them to see.
+    """
+
+    def test_import_experiment_data_with_workers(self):
+        self.import_experiments([1, 2, 3, 4])
+        rows = interleaved_experiment_data_rows([1, 2, 3, 4])
+
+        self.import_rows('experiment_data', EXPERIMENT_DATA_FIELDS, rows, batch_size=1)
+        single_worker_data = imported_experiment_data()
+        self.assertEqual(len(single_worker_data[0]), 4)
+
+        ExperimentPost.objects.all().delete()
+        QuestionAnswer.objects.all().delete()
+        self.import_rows(
+            'experiment_data',
+            EXPERIMENT_DATA_FIELDS,
+            rows,
+            batch_size=1,
+            workers=2,
+        )
+        self.assertEqual(imported_experiment_data(), single_worker_data)
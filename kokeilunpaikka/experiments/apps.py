@@ -1,7 +1,32 @@
 from django.apps import AppConfig
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
 from django.utils.translation import gettext_lazy as _
 
 
 class ExperimentsConfig(AppConfig):
     name = 'kokeilunpaikka.experiments'
     verbose_name = _('Experiments')
+
+    def ready(self):
+        from ..themes.models import Theme
+        from ..users.models import UserProfile
+        from . import signals
+        from .catalog import looking_for_option_catalog
+        from .models import Experiment
+
+        m2m_changed.connect(signals.experiment_themes_changed, sender=Experiment.themes.through)
+        m2m_changed.connect(
+            signals.user_interests_changed,
+            sender=UserProfile.interested_in_themes.through
+        )
+        post_save.connect(signals.experiment_post_save, sender=Experiment)
+        post_delete.connect(signals.experiment_post_delete, sender=Experiment)
+        pre_delete.connect(signals.theme_pre_delete, sender=Theme)
+        post_delete.connect(signals.theme_post_delete, sender=Theme)
+        post_delete.connect(signals.user_profile_post_delete, sender=UserProfile)
+        looking_for_option_catalog.connect_signals()
@@ -0,0 +1,7 @@
+from ..utils.catalog import Catalog
+from .models import ExperimentLookingForOption
+
+looking_for_option_catalog = Catalog(
+    ExperimentLookingForOption,
+    translated_fields=('value',),
+)
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Experiment, ExperimentFeedScore
+
+
+def calculate_feed_scores(**lookups):
+    """Count the themes shared by experiments and user interests.
+
+    Keyword arguments filter the experiment theme relations the scores are
+    calculated from.
+    """
+    return (
+        Experiment.themes.through.objects
+        .filter(theme__userprofile__isnull=False, **lookups)
+        .values('experiment_id', user_id=F('theme__userprofile__user_id'))
+        .annotate(score=Count('theme_id'))
+        .order_by()
+    )
+
+
+def replace_feed_scores(old_scores, new_scores):
+    with transaction.atomic():
+        old_scores.delete()
+        ExperimentFeedScore.objects.bulk_create(
+            ExperimentFeedScore(**row) for row in new_scores
+        )
+
+
+def update_user_feed_scores(user_ids):
+    replace_feed_scores(
+        ExperimentFeedScore.objects.filter(user_id__in=user_ids),
+        calculate_feed_scores(theme__userprofile__user_id__in=user_ids),
+    )
+
+
+def update_experiment_feed_scores(experiment_ids):
+    replace_feed_scores(
+        ExperimentFeedScore.objects.filter(experiment_id__in=experiment_ids),
+        calculate_feed_scores(experiment_id__in=experiment_ids),
+    )
@@ -1,7 +1,15 @@
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
 from ..themes.models import Theme
-from .models import Experiment, ExperimentChallenge
+from ..users.models import UserProfile
+from .index import experiment_index
+from .models import Experiment, ExperimentChallenge, ExperimentFeedScore
+
+FACETS_GENERATION = 'experiment_facets'
 
 
 class ExperimentChallengeFilter(filters.FilterSet):
@@ -17,13 +25,36 @@ class ExperimentChallengeFilter(filters.FilterSet):
         )
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
 class ExperimentFilter(filters.FilterSet):
+    THEMES_MATCH_ALL = 'all'
+    THEMES_MATCH_ANY = 'any'
+    THEMES_MATCH_CHOICES = (
+        (THEMES_MATCH_ALL, THEMES_MATCH_ALL),
+        (THEMES_MATCH_ANY, THEMES_MATCH_ANY),
+    )
+
     theme_ids = filters.ModelChoiceFilter(
         queryset=Theme.objects.all(),
         field_name='themes'
     )
+    themes = NumberInFilter(method='filter_by_index')
+    themes_match = filters.ChoiceFilter(
+        choices=THEMES_MATCH_CHOICES,
+        method='filter_by_index',
+    )
+    stages = NumberInFilter(method='filter_by_index')
     first_load = filters.BooleanFilter(method="first_load_filter")
 
+    # Facets counted by the facets endpoint.
+    facets = {
+        'stages': 'stage',
+        'themes': 'themes',
+    }
+
     class Meta:
         model = Experiment
         fields = (
@@ -32,9 +63,59 @@ class ExperimentFilter(filters.FilterSet):
         )
 
     def first_load_filter(self, queryset, name, value):
-        if value is True:
-            user_profile = getattr(self.request.user, 'profile', False)
-            if user_profile and user_profile.interested_in_themes.count():
-                return queryset.filter(themes__in=user_profile.interested_in_themes.all())
+        """Return the personalized feed of the current user.
 
+        Experiments sharing themes with the interests of the user are ranked
+        by the number of shared themes and then by recency. Users without
+        interests get all experiments by recency.
+        """
+        user = self.request.user
+        if value is not True or not user.is_authenticated:
+            return queryset
+
+        scores = ExperimentFeedScore.objects.filter(
+            experiment=OuterRef('pk'),
+            user_id=user.id,
+        )
+        interests = UserProfile.interested_in_themes.through.objects.filter(
+            userprofile__user_id=user.id,
+        )
+        return queryset.annotate(
+            feed_score=Coalesce(Subquery(scores.values('score')), 0),
+        ).filter(
+            Q(feed_score__gt=0) | ~Exists(interests)
+        ).order_by(
+            '-feed_score',
+            F('published_at').desc(nulls_last=True),
+            '-created_at',
+        )
+
+    def filter_by_index(self, queryset, name, value):
+        # Themes and stages are matched together in filter_queryset.
         return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        theme_ids = self.form.cleaned_data.get('themes')
+        stage_ids = self.form.cleaned_data.get('stages')
+        if not theme_ids and not stage_ids:
+            return queryset
+
+        experiment_ids = experiment_index.match(
+            theme_ids=[int(theme_id) for theme_id in theme_ids or ()],
+            match_all=self.form.cleaned_data.get('themes_match') == self.THEMES_MATCH_ALL,
+            stage_ids=[int(stage_id) for stage_id in stage_ids or ()],
+        )
+        return queryset.filter(pk__in=experiment_ids)
+
+
+class ExperimentOrderingFilter(OrderingFilter):
+    """Keep the ranking of the personalized feed unless ordering is given
+    explicitly.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ranked = 'feed_score' in queryset.query.annotations
+        if ranked and not request.query_params.get(self.ordering_param):
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from ..utils.cache import bump_generation, get_generation
+from .models import Experiment
+
+GENERATION = 'experiment_index'
+
+# Rebuild the index at least this often (in seconds) to recover from changes
+# made without signals, e.g. with queryset updates.
+MAX_AGE = 10 * 60
+
+
+def iter_bits(bits):
+    """Yield the positions of the set bits of an integer."""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class ExperimentIndex:
+    """In-memory bitmap index of experiments by theme and stage.
+
+    Every theme and stage has an integer used as a bitset where bit N is set
+    when the experiment with id N has the theme or is in the stage. Matching
+    experiments are then found with bit arithmetic only.
+
+    The index of a process is built on first use and kept up to date by
+    signals. Changes are announced to other processes by bumping the shared
+    generation of the index, which makes them rebuild their index. The
+    process making a change applies it to its own index only if no other
+    process has bumped the generation since, otherwise it rebuilds it too.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.generation = None
+        self.built_at = 0
+        self.all_bits = 0
+        self.stage_bits = defaultdict(int)
+        self.stage_by_experiment = {}
+        self.theme_bits = defaultdict(int)
+
+    def build(self, generation):
+        all_bits = 0
+        stage_bits = defaultdict(int)
+        stage_by_experiment = {}
+        theme_bits = defaultdict(int)
+
+        for experiment_id, stage_id in Experiment.objects.values_list('id', 'stage_id'):
+            all_bits |= 1 << experiment_id
+            stage_bits[stage_id] |= 1 << experiment_id
+            stage_by_experiment[experiment_id] = stage_id
+        for experiment_id, theme_id in Experiment.themes.through.objects.values_list(
+            'experiment_id',
+            'theme_id',
+        ):
+            theme_bits[theme_id] |= 1 << experiment_id
+
+        self.all_bits = all_bits
+        self.stage_bits = stage_bits
+        self.stage_by_experiment = stage_by_experiment
+        self.theme_bits = theme_bits
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+    def ensure_current(self):
+        generation = get_generation(GENERATION)
+        if self.generation != generation or time.monotonic() - self.built_at > MAX_AGE:
+            self.build(generation)
+
+    def match(self, theme_ids=None, match_all=False, stage_ids=None):
+        """Return ids of experiments having any or all of the given themes
+        and being in any of the given stages.
+        """
+        with self.lock:
+            self.ensure_current()
+            bits = self.all_bits
+            if theme_ids:
+                theme_bitsets = [self.theme_bits.get(theme_id, 0) for theme_id in theme_ids]
+                if match_all:
+                    for theme_bitset in theme_bitsets:
+                        bits &= theme_bitset
+                else:
+                    any_bits = 0
+                    for theme_bitset in theme_bitsets:
+                        any_bits |= theme_bitset
+                    bits &= any_bits
+            if stage_ids:
+                stage_bits = 0
+                for stage_id in stage_ids:
+                    stage_bits |= self.stage_bits.get(stage_id, 0)
+                bits &= stage_bits
+        return list(iter_bits(bits))
+
+    # Incremental updates called by signals
+
+    def experiment_saved(self, experiment_id, stage_id):
+        """Index an experiment which has been created or moved to another
+        stage.
+        """
+        def apply():
+            bit = 1 << experiment_id
+            previous_stage_id = self.stage_by_experiment.get(experiment_id)
+            if previous_stage_id is not None:
+                self.stage_bits[previous_stage_id] &= ~bit
+            self.stage_bits[stage_id] |= bit
+            self.stage_by_experiment[experiment_id] = stage_id
+            self.all_bits |= bit
+        self.apply_on_commit(apply)
+
+    def experiment_deleted(self, experiment_id):
+        def apply():
+            mask = ~(1 << experiment_id)
+            self.all_bits &= mask
+            stage_id = self.stage_by_experiment.pop(experiment_id, None)
+            if stage_id is not None:
+                self.stage_bits[stage_id] &= mask
+            for theme_id in self.theme_bits:
+                self.theme_bits[theme_id] &= mask
+        self.apply_on_commit(apply)
+
+    def themes_added(self, experiment_ids, theme_ids):
+        self.update_themes(experiment_ids, theme_ids, add=True)
+
+    def themes_removed(self, experiment_ids, theme_ids):
+        self.update_themes(experiment_ids, theme_ids, add=False)
+
+    def update_themes(self, experiment_ids, theme_ids, add):
+        bits = 0
+        for experiment_id in experiment_ids:
+            bits |= 1 << experiment_id
+
+        def apply():
+            for theme_id in theme_ids:
+                if add:
+                    self.theme_bits[theme_id] |= bits
+                else:
+                    self.theme_bits[theme_id] &= ~bits
+        self.apply_on_commit(apply)
+
+    def experiment_themes_cleared(self, experiment_id):
+        def apply():
+            mask = ~(1 << experiment_id)
+            for theme_id in self.theme_bits:
+                self.theme_bits[theme_id] &= mask
+        self.apply_on_commit(apply)
+
+    def theme_cleared(self, theme_id):
+        def apply():
+            self.theme_bits.pop(theme_id, None)
+        self.apply_on_commit(apply)
+
+    def apply_on_commit(self, apply):
+        """Apply a change to the index once the transaction making it has
+        been committed, and announce the change to other processes.
+
+        The index never contains uncommitted changes, and changes of a
+        rolled back transaction are never applied.
+        """
+        transaction.on_commit(lambda: self.apply_change(apply))
+
+    def apply_change(self, apply):
+        with self.lock:
+            generation = bump_generation(GENERATION)
+            if (
+                self.generation is not None and
+                generation is not None and
+                generation == self.generation + 1
+            ):
+                apply()
+                self.generation = generation
+            # Otherwise the index of this process has not been built or
+            # misses changes of other processes, and it is rebuilt on next
+            # use.
+
+
+experiment_index = ExperimentIndex()
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.22 on 2026-10-19 06:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F
+
+
+def calculate_feed_scores(apps, schema_editor):
+    Experiment = apps.get_model('experiments', 'Experiment')
+    ExperimentFeedScore = apps.get_model('experiments', 'ExperimentFeedScore')
+
+    scores = (
+        Experiment.themes.through.objects
+        .filter(theme__userprofile__isnull=False)
+        .values('experiment_id', user_id=F('theme__userprofile__user_id'))
+        .annotate(score=Count('theme_id'))
+        .order_by()
+    )
+    ExperimentFeedScore.objects.bulk_create(
+        (ExperimentFeedScore(**row) for row in scores.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('experiments', '0006_experiment_views'),
+        ('users', '0005_userlookingforoptiontranslation_offering_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExperimentFeedScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='score')),
+                ('experiment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_scores', to='experiments.experiment', verbose_name='experiment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'experiment feed score',
+                'verbose_name_plural': 'experiment feed scores',
+                'unique_together': {('user', 'experiment')},
+            },
+        ),
+        migrations.RunPython(calculate_feed_scores, migrations.RunPython.noop),
+    ]
@@ -259,6 +259,20 @@ class Experiment(TimeStampedModel):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The experiment index is updated only when the stage changes.
+        instance._loaded_stage_id = instance.__dict__.get('stage_id')
+        return instance
+
+    @property
+    def stage_changed(self):
+        """Whether the stage differs from the stage the experiment was
+        loaded or last saved with. True for unsaved experiments.
+        """
+        return self.__dict__.get('_loaded_stage_id') != self.stage_id
+
     def save(self, *args, **kwargs):
         if self.published_at is None and self.is_published is True:
             self.published_at = timezone.now()
@@ -268,7 +282,10 @@ class Experiment(TimeStampedModel):
         """Check if the given user is one of responsible users of this
         experiment.
         """
-        return user in self.responsible_users.all()
+        return user.id is not None and Experiment.responsible_users.through.objects.filter(
+            experiment_id=self.id,
+            user_id=user.id,
+        ).exists()
 
     @property
     def short_description(self):
@@ -323,10 +340,13 @@ class ExperimentPost(TimeStampedModel):
         """Check if the given user is one of responsible users of the
         experiment of this post.
         """
-        return user in self.experiment.responsible_users.all()
+        return user.id is not None and Experiment.responsible_users.through.objects.filter(
+            experiment_id=self.experiment_id,
+            user_id=user.id,
+        ).exists()
 
     def is_owner(self, user):
-        return user == self.created_by
+        return self.created_by_id is not None and self.created_by_id == user.id
 
 
 class ExperimentPostComment(TimeStampedModel):
@@ -359,13 +379,16 @@ class ExperimentPostComment(TimeStampedModel):
         )
 
     def is_owner(self, user):
-        return user == self.created_by
+        return self.created_by_id is not None and self.created_by_id == user.id
 
     def is_responsible(self, user):
         """Check if the given user is one of responsible users of the
         experiment of this post comment.
         """
-        return user in self.experiment_post.experiment.responsible_users.all()
+        return user.id is not None and Experiment.responsible_users.through.objects.filter(
+            experiment__posts=self.experiment_post_id,
+            user_id=user.id,
+        ).exists()
 
 
 class ExperimentExternalLink(TimeStampedModel):
@@ -387,6 +410,38 @@ class ExperimentExternalLink(TimeStampedModel):
         return self.url
 
 
+class ExperimentFeedScore(models.Model):
+    """Number of themes an experiment shares with the interests of a user.
+
+    Used to rank the personalized experiment feed. Only pairs sharing at
+    least one theme are stored. The scores are kept up to date by signals,
+    see `signals.py`.
+    """
+    experiment = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name='feed_scores',
+        to='experiments.Experiment',
+        verbose_name=_('experiment'),
+    )
+    score = models.PositiveIntegerField(
+        verbose_name=_('score'),
+    )
+    user = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name='+',
+        to=settings.AUTH_USER_MODEL,
+        verbose_name=_('user'),
+    )
+
+    class Meta:
+        unique_together = (
+            'user',
+            'experiment',
+        )
+        verbose_name = _('experiment feed score')
+        verbose_name_plural = _('experiment feed scores')
+
+
 class ExperimentLookingForOption(TimeStampedModel, TranslatableModel):
     """Editable options (by superadmin) for things experiment is looking for in
     the service.
@@ -10,6 +10,15 @@ class ExperimentQuerySet(QuerySet):
     def active(self):
         return self.filter(is_published=True)
 
+    def with_list_relations(self):
+        """Fetch the relations serialized in experiment lists up front."""
+        return self.select_related(
+            'image',
+            'stage',
+        ).prefetch_related(
+            'themes',
+        )
+
     def for_user(self, user):
         """Return experiments user is eligible to see.
 
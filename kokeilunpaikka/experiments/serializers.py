@@ -8,13 +8,21 @@ from rest_framework import serializers
 from extensions.mailer.mailer import send_template_mail
 
 from .email_pool import ExperimentEmailThread
-from ..stages.models import Question, QuestionAnswer, Stage
+from ..stages.catalog import question_catalog
+from ..stages.models import QuestionAnswer, Stage
 from ..stages.serializers import StageSerializer
-from ..themes.models import Theme
+from ..themes.catalog import theme_catalog
 from ..themes.serializers import ThemeSerializer
 from ..uploads.models import Image
-from ..utils.serializers import ThumbnailImageField
+from ..utils.catalog import CatalogPrimaryKeyRelatedField
+from ..utils.serializers import (
+    BulkPrimaryKeyRelatedField,
+    ThumbnailImageField,
+    TranslationPrefetchListSerializer,
+    TranslationPrefetchMixin
+)
 from ..users.models import UserProfile
+from .catalog import looking_for_option_catalog
 from .models import (
     Experiment,
     ExperimentChallenge,
@@ -134,19 +142,20 @@ class ExperimentChallengeBasicSerializer(serializers.ModelSerializer):
         )
 
 
-class ExperimentChallengeBaseSerializer(serializers.ModelSerializer):
+class ExperimentChallengeBaseSerializer(TranslationPrefetchMixin, serializers.ModelSerializer):
     image_url = ThumbnailImageField(
         size='list_image',
         source='image',
     )
-    theme_ids = serializers.PrimaryKeyRelatedField(
+    theme_ids = CatalogPrimaryKeyRelatedField(
+        catalog=theme_catalog,
         many=True,
-        queryset=Theme.objects.all(),
         source='themes',
     )
 
     class Meta:
         model = ExperimentChallenge
+        list_serializer_class = TranslationPrefetchListSerializer
         fields = (
             'id',
             'description',
@@ -174,6 +183,10 @@ class ExperimentChallengeListSerializer(ExperimentChallengeBaseSerializer):
 
 
 class ExperimentChallengeRetrieveSerializer(ExperimentChallengeBaseSerializer):
+    translated_relations = (
+        'experimentchallengetimelineentry_set',
+    )
+
     experiments = ExperimentChallengeMembershipSerializer(
         many=True,
         source='experimentchallengemembership_set'
@@ -217,7 +230,7 @@ class ExperimentPostSerializer(serializers.ModelSerializer):
     created_by = CreatorSerializer(
         read_only=True,
     )
-    image_ids = serializers.PrimaryKeyRelatedField(
+    image_ids = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Image.objects.all(),
         required=False,
@@ -275,7 +288,13 @@ class ExperimentQuestionAnswerSerializer(serializers.ModelSerializer):
         )
 
 
-class ExperimentRetrieveSerializer(serializers.ModelSerializer):
+class ExperimentRetrieveSerializer(TranslationPrefetchMixin, serializers.ModelSerializer):
+    translated_relations = (
+        'experiment_challenges',
+        'looking_for',
+        'themes',
+    )
+
     experiment_challenges = ExperimentChallengeBasicSerializer(
         many=True,
     )
@@ -321,50 +340,59 @@ class ExperimentRetrieveSerializer(serializers.ModelSerializer):
         )
 
     def get_question_answers(self, instance):
-        stage = instance.stage
-        answers = instance.questionanswer_set.all()
-        if instance.experiment_challenges.count() > 0:
-            answers = answers.exclude(
-                question__ignore_in_experiment_challenge__in=instance.experiment_challenges.all()
-            )
-        answers = answers.distinct()
-        serializer = ExperimentQuestionAnswerSerializer(
-            answers,
-            many=True
-        )
-        answer_data = serializer.data
-        user = self.context.get('user')
-        if user and user not in instance.responsible_users.all():
-            return answer_data
+        """Return the answers of the experiment and, for the responsible
+        users, the questions still to be answered up to the current stage.
 
-        unanswered_questions = Question.objects.filter(
-            stage__stage_number__lte=stage.stage_number,
-            experiment_challenge_id__isnull=True,
-            is_public=True
-        ).exclude(questionanswer__in=answers).distinct()
-        if instance.experiment_challenges.count() > 0:
-            unanswered_questions = unanswered_questions.exclude(
-                ignore_in_experiment_challenge__in=instance.experiment_challenges.all()
-            )
-            unanswered_challenge_questions = Question.objects.filter(
-                experiment_challenge__in=instance.experiment_challenges.all()
-            ).exclude(questionanswer__in=answers)
-            for question in unanswered_challenge_questions:
+        The questions are read from the question catalog, so only the
+        prefetched answers and experiment challenges are needed.
+        """
+        questions = question_catalog.get_map()
+        challenge_ids = {challenge.pk for challenge in instance.experiment_challenges.all()}
+
+        def is_ignored(question):
+            return not challenge_ids.isdisjoint(question['ignore_in_experiment_challenge'])
+
+        answer_data = []
+        answered_question_ids = set()
+        for answer in instance.questionanswer_set.all():
+            question = questions.get(answer.question_id)
+            if question is not None and is_ignored(question):
+                continue
+            if question is None:
+                answer_data.append(ExperimentQuestionAnswerSerializer(answer).data)
+            else:
                 answer_data.append({
-                    "id": f'{question.id}_unanswered',
-                    "question": question.question,
-                    "question_id": question.id,
-                    "stage_id": question.stage.pk,
-                    "description": question.description,
-                    "value": ''
+                    "id": answer.id,
+                    "value": answer.value,
+                    "question": question['question'],
+                    "question_id": answer.question_id,
+                    "stage_id": question['stage_id'],
+                    "description": question['description'],
                 })
-        for question in unanswered_questions:
+            answered_question_ids.add(answer.question_id)
+        user = self.context.get('user')
+        # The responsible users are prefetched for their representation.
+        if user and user.pk not in {u.pk for u in instance.responsible_users.all()}:
+            return answer_data
+
+        for question in questions.values():
+            if question['id'] in answered_question_ids:
+                continue
+            if question['experiment_challenge_id'] is None:
+                if (
+                    question['stage_id'] > instance.stage_id or
+                    not question['is_public'] or
+                    is_ignored(question)
+                ):
+                    continue
+            elif question['experiment_challenge_id'] not in challenge_ids:
+                continue
             answer_data.append({
-                "id": f'{question.id}_unanswered',
-                "question": question.question,
-                "question_id": question.id,
-                "stage_id": question.stage.pk,
-                "description": question.description,
+                "id": f'{question["id"]}_unanswered',
+                "question": question['question'],
+                "question_id": question['id'],
+                "stage_id": question['stage_id'],
+                "description": question['description'],
                 "value": ''
             })
         answer_data = sorted(answer_data, key=lambda x: x['question_id'])
@@ -379,7 +407,11 @@ class ExperimentRetrieveSerializer(serializers.ModelSerializer):
         return data
 
 
-class ExperimentListSerializer(serializers.ModelSerializer):
+class ExperimentListSerializer(TranslationPrefetchMixin, serializers.ModelSerializer):
+    translated_relations = (
+        'themes',
+    )
+
     image_url = ThumbnailImageField(
         default=None,
         size='list_image',
@@ -392,6 +424,7 @@ class ExperimentListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Experiment
+        list_serializer_class = TranslationPrefetchListSerializer
         fields = (
             'id',
             'image_url',
@@ -414,7 +447,7 @@ class ExperimentListSerializer(serializers.ModelSerializer):
 
 
 class ExperimentSerializer(serializers.ModelSerializer):
-    experiment_challenge_ids = serializers.PrimaryKeyRelatedField(
+    experiment_challenge_ids = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=ExperimentChallenge.objects.active().all(),
         required=False,
@@ -425,14 +458,14 @@ class ExperimentSerializer(serializers.ModelSerializer):
         required=False,
         source='image',
     )
-    looking_for_ids = serializers.PrimaryKeyRelatedField(
+    looking_for_ids = CatalogPrimaryKeyRelatedField(
+        catalog=looking_for_option_catalog,
         many=True,
-        queryset=ExperimentLookingForOption.objects.all(),
         required=False,
         source='looking_for',
         write_only=True,
     )
-    responsible_user_ids = serializers.PrimaryKeyRelatedField(
+    responsible_user_ids = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=get_user_model().objects.all(),
         required=False,
@@ -443,9 +476,9 @@ class ExperimentSerializer(serializers.ModelSerializer):
         required=False,
         source='stage',
     )
-    theme_ids = serializers.PrimaryKeyRelatedField(
+    theme_ids = CatalogPrimaryKeyRelatedField(
+        catalog=theme_catalog,
         many=True,
-        queryset=Theme.objects.all(),
         required=False,
         source='themes',
     )
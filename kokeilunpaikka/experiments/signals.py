@@ -0,0 +1,101 @@
+from django.db import transaction
+
+from ..utils.cache import bump_generation
+from .feed import update_experiment_feed_scores, update_user_feed_scores
+from .filters import FACETS_GENERATION
+from .index import experiment_index
+
+
+def announce_facets_change():
+    transaction.on_commit(lambda: bump_generation(FACETS_GENERATION))
+
+
+def get_changed_ids(instance, action, reverse, pk_set, related_name):
+    """Return primary keys of the instances on the source side of a changed
+    many-to-many relation.
+
+    The ids of a relation cleared from the target side are not known after
+    the relation has been cleared, so they are stored on the instance before
+    that.
+    """
+    if not reverse:
+        return [instance.pk]
+    if action == 'pre_clear':
+        instance._feed_changed_ids = list(
+            getattr(instance, related_name).values_list('pk', flat=True)
+        )
+        return []
+    if action == 'post_clear':
+        return instance.__dict__.pop('_feed_changed_ids', [])
+    return list(pk_set)
+
+
+def experiment_themes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    experiment_ids = get_changed_ids(instance, action, reverse, pk_set, 'experiment_set')
+    if experiment_ids:
+        update_experiment_feed_scores(experiment_ids)
+
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            experiment_ids, theme_ids = pk_set, [instance.pk]
+        else:
+            experiment_ids, theme_ids = [instance.pk], pk_set
+        if action == 'post_add':
+            experiment_index.themes_added(experiment_ids, theme_ids)
+        else:
+            experiment_index.themes_removed(experiment_ids, theme_ids)
+    elif action == 'post_clear':
+        if reverse:
+            experiment_index.theme_cleared(instance.pk)
+        else:
+            experiment_index.experiment_themes_cleared(instance.pk)
+    if action != 'pre_clear':
+        announce_facets_change()
+
+
+def experiment_post_save(sender, instance, created, **kwargs):
+    if created or instance.stage_changed:
+        experiment_index.experiment_saved(instance.pk, instance.stage_id)
+        instance._loaded_stage_id = instance.stage_id
+    announce_facets_change()
+
+
+def experiment_post_delete(sender, instance, **kwargs):
+    experiment_index.experiment_deleted(instance.pk)
+    announce_facets_change()
+
+
+def user_interests_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    else:
+        from ..users.models import UserProfile
+
+        profile_ids = get_changed_ids(instance, action, reverse, pk_set, 'userprofile_set')
+        user_ids = list(UserProfile.objects.filter(
+            pk__in=profile_ids,
+        ).values_list('user_id', flat=True))
+    if user_ids:
+        update_user_feed_scores(user_ids)
+
+
+def theme_pre_delete(sender, instance, **kwargs):
+    # The relations of the theme are removed without m2m_changed signals.
+    instance._feed_user_ids = list(
+        instance.userprofile_set.values_list('user_id', flat=True)
+    )
+
+
+def theme_post_delete(sender, instance, **kwargs):
+    user_ids = instance.__dict__.pop('_feed_user_ids', [])
+    if user_ids:
+        update_user_feed_scores(user_ids)
+    experiment_index.theme_cleared(instance.pk)
+
+
+def user_profile_post_delete(sender, instance, **kwargs):
+    update_user_feed_scores([instance.user_id])
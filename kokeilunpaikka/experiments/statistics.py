@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Avg
+
+from .models import Experiment
+
+
+def get_statistics():
+    """Return public statistics of users and experiments of the site."""
+    return {
+        'active_users_count': (
+            get_user_model().objects.filter(is_active=True).count()
+        ),
+        'experiment_success_rating_average': (
+            Experiment.objects.aggregate(avg=Avg('success_rating'))['avg']
+        ),
+        'users_with_experiments_count': (
+            get_user_model().objects.exclude(owned_experiments=None).count()
+        ),
+        'visible_experiments_count': Experiment.objects.active().count(),
+    }
@@ -1,7 +1,11 @@
 import datetime
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -11,12 +15,17 @@ from rest_framework.test import APITestCase
 
 from ..stages.models import Question, QuestionAnswer, Stage
 from ..themes.models import Theme
+from ..users.models import UserProfile
+from ..utils.cache import bump_generation, check_shared_cache, get_generation
+from .index import GENERATION as INDEX_GENERATION
+from .index import experiment_index
 from .models import (
     Experiment,
     ExperimentChallenge,
     ExperimentChallengeMembership,
     ExperimentChallengeTimelineEntry,
     ExperimentExternalLink,
+    ExperimentFeedScore,
     ExperimentLookingForOption,
     ExperimentPost,
     ExperimentPostComment
@@ -62,6 +71,17 @@ class ExperimentPostModelTestCase(TestCase):
         experiment_post = ExperimentPost.objects.create(experiment=experiment)
         str(experiment_post)
 
+    def test_is_responsible(self):
+        user = get_user_model().objects.create(username='responsible')
+        stage = Stage.objects.create(stage_number=1)
+        experiment = Experiment.objects.create(stage=stage)
+        experiment.responsible_users.add(user)
+        experiment_post = ExperimentPost.objects.create(experiment=experiment)
+        with self.assertNumQueries(1):
+            self.assertTrue(experiment_post.is_responsible(user))
+        with self.assertNumQueries(0):
+            self.assertFalse(experiment_post.is_responsible(AnonymousUser()))
+
 
 class ExperimentPostCommentModelTestCase(TestCase):
 
@@ -137,6 +157,7 @@ class ExperimentAPITestCase(APITestCase):
     maxDiff = None
 
     def setUp(self):
+        cache.clear()
         self.owner = get_user_model().objects.create(
             first_name='John',
             last_name='Doe',
@@ -201,7 +222,7 @@ class ExperimentAPITestCase(APITestCase):
             'published_at': '2019-07-10T12:00:00Z',
             'short_description': 'Lorem ipsum',
             'slug': 'example-experiment',
-            'themes': [{'id': 15, 'is_curated': False, 'name': 'Theme'}],
+            'themes': [{'id': self.theme.id, 'is_curated': False, 'name': 'Theme'}],
             'stage': {
                 'description': '',
                 'name': 'First stage',
@@ -255,6 +276,198 @@ class ExperimentAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('stage_id', response.data)
 
+    def test_experiment_list_filter_by_themes(self):
+        other_theme = Theme.objects.create(name='Other theme')
+        experiment = Experiment.objects.create(is_published=True, name='Both themes')
+        experiment.themes.add(self.theme, other_theme)
+        url = '{}?themes={},{}'.format(reverse('experiment-list'), self.theme.id, other_theme.id)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 2)
+
+        response = self.client.get(url + '&themes_match=all')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['id'] for e in response.json()], [experiment.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment.themes.remove(other_theme)
+        response = self.client.get(url + '&themes_match=all')
+        self.assertEqual(len(response.json()), 0)
+
+    def test_experiment_list_filter_ignores_rolled_back_changes(self):
+        url = '{}?themes={}'.format(reverse('experiment-list'), self.theme.id)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        experiment_id = self.experiment.id
+        try:
+            with transaction.atomic():
+                self.experiment.delete()
+                # Uncommitted changes are not visible in the index.
+                self.assertEqual(
+                    experiment_index.match(theme_ids=[self.theme.id]),
+                    [experiment_id]
+                )
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+    def test_experiment_list_filter_by_stages(self):
+        experiment = Experiment.objects.create(is_published=True, stage=self.second_stage)
+        url = '{}?stages={}'.format(reverse('experiment-list'), self.second_stage.pk)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['id'] for e in response.json()], [experiment.id])
+
+        experiment.stage = self.first_stage
+        experiment.save()
+        url = '{}?stages={}&themes={}'.format(
+            reverse('experiment-list'),
+            self.first_stage.pk,
+            self.theme.id
+        )
+        response = self.client.get(url)
+        self.assertEqual([e['id'] for e in response.json()], [self.experiment.id])
+
+    def test_experiment_list_translation_queries_do_not_grow_with_themes(self):
+        url = reverse('experiment-list')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        for i in range(3):
+            theme = Theme.objects.create(name='Theme {}'.format(i))
+            theme.set_current_language('en')
+            theme.name = 'Theme {} in English'.format(i)
+            theme.save()
+            Experiment.objects.create(is_published=True).themes.add(theme)
+
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        themes = [theme for e in response.json() for theme in e['themes']]
+        self.assertIn(
+            {'id': theme.id, 'is_curated': False, 'name': 'Theme 2 in English'},
+            themes
+        )
+        # Falls back to the default language without further queries.
+        self.assertIn({'id': self.theme.id, 'is_curated': False, 'name': 'Theme'}, themes)
+
+    def test_experiment_list_filter_by_themes_rebuilds_stale_index(self):
+        url = '{}?themes={}'.format(reverse('experiment-list'), self.theme.id)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        # Change made by another process.
+        experiment = Experiment.objects.create(is_published=True)
+        Experiment.themes.through.objects.create(experiment=experiment, theme=self.theme)
+        bump_generation(INDEX_GENERATION)
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_experiment_save_without_index_changes_keeps_generation(self):
+        generation = get_generation(INDEX_GENERATION)
+        experiment = Experiment.objects.get(pk=self.experiment.pk)
+        experiment.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment.save()
+        self.assertEqual(get_generation(INDEX_GENERATION), generation)
+
+        experiment.stage = self.second_stage
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment.save()
+        self.assertEqual(get_generation(INDEX_GENERATION), generation + 1)
+
+    def test_experiment_index_is_rebuilt_after_concurrent_changes(self):
+        url = '{}?themes={}'.format(reverse('experiment-list'), self.theme.id)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        # Change made by another process just before the change of this
+        # process is applied.
+        other_experiment = Experiment.objects.create(is_published=True)
+        Experiment.themes.through.objects.create(experiment=other_experiment, theme=self.theme)
+        bump_generation(INDEX_GENERATION)
+        with self.captureOnCommitCallbacks(execute=True):
+            Experiment.objects.create(is_published=True).themes.add(self.theme)
+        self.assertEqual(len(self.client.get(url).json()), 3)
+
+    def test_generations_require_shared_cache_in_deployment(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)],
+            ['kokeilunpaikka.E001']
+        )
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        }}):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_experiment_facets(self):
+        cache.clear()
+        other_theme = Theme.objects.create(name='Other theme')
+        experiment = Experiment.objects.create(is_published=True, stage=self.second_stage)
+        experiment.themes.add(self.theme, other_theme)
+        Experiment.objects.create(is_published=False, stage=self.second_stage)
+        url = reverse('experiment-facets')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'stages': [
+                {'id': self.experiment.stage_id, 'count': 1},
+                {'id': self.second_stage.pk, 'count': 1},
+            ],
+            'themes': [
+                {'id': self.theme.id, 'count': 2},
+                {'id': other_theme.id, 'count': 1},
+            ],
+        })
+
+        response = self.client.get(url, {'theme_ids': other_theme.id})
+        self.assertEqual(response.json()['themes'], [
+            {'id': self.theme.id, 'count': 1},
+            {'id': other_theme.id, 'count': 1},
+        ])
+
+        # Equal filter states share the cached counts until experiments change.
+        with self.assertNumQueries(0):
+            self.client.get(url, {'theme_ids': other_theme.id, 'ordering': 'name'})
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment.themes.remove(other_theme)
+        response = self.client.get(url, {'theme_ids': other_theme.id})
+        self.assertEqual(response.json(), {'stages': [], 'themes': []})
+
+    def test_experiment_list_first_load_ranks_by_shared_themes(self):
+        other_theme = Theme.objects.create(name='Other theme')
+        best_match = Experiment.objects.create(is_published=True, name='Best match')
+        best_match.themes.add(self.theme, other_theme)
+        Experiment.objects.create(is_published=True, name='No match')
+        UserProfile.objects.create(user=self.non_owner)
+        self.non_owner.profile.interested_in_themes.add(self.theme, other_theme)
+
+        self.client.force_authenticate(user=self.non_owner)
+        url = '{}?first_load=true'.format(reverse('experiment-list'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [experiment['id'] for experiment in response.json()],
+            [best_match.id, self.experiment.id]
+        )
+
+    def test_experiment_list_first_load_is_updated_on_theme_changes(self):
+        UserProfile.objects.create(user=self.non_owner)
+        self.non_owner.profile.interested_in_themes.add(self.theme)
+        self.client.force_authenticate(user=self.non_owner)
+        url = '{}?first_load=true'.format(reverse('experiment-list'))
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        self.theme.experiment_set.clear()
+        self.assertEqual(len(self.client.get(url).json()), 0)
+
+        self.experiment.themes.add(self.theme)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        self.theme.delete()
+        # Without interests all experiments are returned.
+        self.assertFalse(ExperimentFeedScore.objects.exists())
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
     def test_experiment_create(self):
         request_body = {
             'description': 'Lorem ipsum',
@@ -391,6 +604,24 @@ class ExperimentAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('experiment_challenge_ids', response.json())
 
+    def test_experiment_create_reports_all_missing_responsible_users(self):
+        missing_ids = [self.non_owner.id + 100, self.non_owner.id + 101]
+        request_body = {
+            'name': 'Test Experiment',
+            'responsible_user_ids': [self.non_owner.id] + missing_ids,
+        }
+        url = reverse('experiment-list')
+        self.client.force_authenticate(user=self.owner)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, request_body, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()['responsible_user_ids']
+        self.assertEqual(len(errors), 2)
+        for error, pk in zip(errors, missing_ids):
+            self.assertIn(str(pk), error['message'])
+        # All responsible users are fetched with a single query.
+        self.assertEqual(len(context.captured_queries), 1)
+
     def test_experiment_create_fails_for_non_authenticated(self):
         url = reverse('experiment-list')
         response = self.client.post(url, {})
@@ -495,6 +726,45 @@ class ExperimentAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), expected_response_body)
 
+    def test_experiment_retrieve_for_responsible_user_uses_prefetched_users(self):
+        url = reverse('experiment-detail', kwargs={'slug': self.experiment.slug})
+        # The first request builds the catalogs.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_experiment_retrieve_queries_do_not_grow_with_posts(self):
+        url = reverse('experiment-detail', kwargs={'slug': self.experiment.slug})
+        # The first request builds the catalogs.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        for i in range(3):
+            post = ExperimentPost.objects.create(
+                content='Post {}'.format(i),
+                created_by=self.non_owner,
+                experiment=self.experiment,
+                title='Post {}'.format(i),
+            )
+            ExperimentPostComment.objects.create(
+                content='Comment {}'.format(i),
+                created_by=self.non_owner,
+                experiment_post=post,
+            )
+
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['posts']), 4)
+        self.assertEqual(
+            [post['count_of_comments'] for post in response.json()['posts']],
+            [1, 1, 1, 1]
+        )
+
     def test_experiment_retrieve_show_all_experiment_challenges(self):
         experiment = Experiment.objects.create(
             is_published=True,
@@ -1047,6 +1317,58 @@ class ExperimentAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(QuestionAnswer.objects.get(question_id=question_1).value, 'Answer 2')
 
+    def test_experiment_answer_questions_writes_answers_in_one_query(self):
+        questions = [
+            Question.objects.create(stage=self.first_stage, question='Question {}'.format(i))
+            for i in range(5)
+        ]
+        QuestionAnswer.objects.create(
+            experiment=self.experiment,
+            question=questions[0],
+            value='Old answer',
+        )
+        request_body = [{
+            'question_id': question.id,
+            'value': 'Answer {}'.format(i),
+        } for i, question in enumerate(questions)]
+        url = reverse('experiment-answer-questions', kwargs={'slug': self.experiment.slug})
+        self.client.force_authenticate(user=self.owner)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(url, request_body)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        answer_queries = [
+            query for query in context.captured_queries
+            if '"stages_questionanswer"' in query['sql']
+        ]
+        self.assertEqual(len(answer_queries), 1)
+        self.assertEqual(
+            dict(QuestionAnswer.objects.values_list('question_id', 'value')),
+            {question.id: 'Answer {}'.format(i) for i, question in enumerate(questions)}
+        )
+        self.assertEqual(
+            set(QuestionAnswer.objects.values_list('answered_by', flat=True)),
+            {self.owner.id}
+        )
+
+    def test_question_answer_upsert_returns_answers(self):
+        question = Question.objects.create(stage=self.first_stage, question='Question')
+        old_answer = QuestionAnswer.objects.create(
+            experiment=self.experiment,
+            question=question,
+            value='Old answer',
+        )
+        answers = QuestionAnswer.objects.upsert(
+            experiment=self.experiment,
+            answered_by=self.owner,
+            values={question.id: 'Answer'},
+        )
+        self.assertEqual(len(answers), 1)
+        self.assertIsInstance(answers[0], QuestionAnswer)
+        self.assertEqual(answers[0].pk, old_answer.pk)
+        self.assertEqual(answers[0].created_at, old_answer.created_at)
+        self.assertEqual(answers[0].answered_by_id, self.owner.id)
+        self.assertEqual(answers[0].value, 'Answer')
+
     def test_experiment_answer_questions_fails_for_non_responsible(self):
         experiment = Experiment.objects.create(
             is_published=True,
@@ -1452,6 +1774,21 @@ class ExperimentPostAPITestCase(APITestCase):
         response = self.client.put(self.detail_url, request_body)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_experiment_post_update_fetches_post_once(self):
+        request_body = {
+            'content': 'Lorem ipsum.',
+            'title': 'New post',
+        }
+        self.client.force_authenticate(user=self.responsible)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(self.detail_url, request_body)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        post_queries = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT "experiments_experimentpost"."id"')
+        ]
+        self.assertEqual(len(post_queries), 1)
+
     def test_experiment_post_update_fails_for_not_authenticated(self):
         response = self.client.put(self.list_url, {})
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,9 +1,7 @@
 import logging
 import os
 
-from django.contrib.auth import get_user_model
-from django.contrib.auth.models import AnonymousUser
-from django.db.models import Avg, Prefetch, Q
+from django.db.models import Prefetch, Q
 from django.http import HttpResponse
 from django.utils.translation import gettext_lazy as _
 
@@ -21,6 +19,8 @@ from ..docs.mixins import ApiResponseCodeDocumentationMixin
 from ..stages.models import QuestionAnswer
 from ..stages.serializers import QuestionAnswerSerializer
 from ..themes.models import Theme
+from ..utils.catalog import catalog_response
+from ..utils.mixins import CachedObjectMixin, FacetCountsMixin
 from ..utils.pagination import ControllablePageNumberPagination
 from ..utils.permissions import (
     CreateOnly,
@@ -30,12 +30,17 @@ from ..utils.permissions import (
     IsResponsibleAndDestroyOnly,
     ReadOnly
 )
-from .filters import ExperimentChallengeFilter, ExperimentFilter
+from .catalog import looking_for_option_catalog
+from .filters import (
+    FACETS_GENERATION,
+    ExperimentChallengeFilter,
+    ExperimentFilter,
+    ExperimentOrderingFilter
+)
 from .models import (
     Experiment,
     ExperimentChallenge,
     ExperimentChallengeMembership,
-    ExperimentLookingForOption,
     ExperimentPost,
     ExperimentPostComment
 )
@@ -49,6 +54,7 @@ from .serializers import (
     ExperimentRetrieveSerializer,
     ExperimentSerializer
 )
+from .statistics import get_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -144,6 +150,10 @@ class ExperimentChallengeViewSet(
     filterset_class = ExperimentChallengeFilter
     lookup_field = 'translations__slug'
     pagination_class = ControllablePageNumberPagination
+    query_budgets = {
+        'list': 4,
+        'retrieve': 8,
+    }
     search_fields = (
         'translations__name',
     )
@@ -206,6 +216,8 @@ class ExperimentChallengeViewSet(
 
 class ExperimentViewSet(
     ApiResponseCodeDocumentationMixin,
+    CachedObjectMixin,
+    FacetCountsMixin,
     viewsets.ModelViewSet
 ):
     """Handle experiments.
@@ -218,6 +230,15 @@ class ExperimentViewSet(
     ### Notices
 
     - Pagination may be used by giving the `page_size` query parameter.
+    - Multiple themes may be given as comma separated ids with the `themes`
+      query parameter. With `themes_match=all` experiments having all of the
+      given themes are returned, otherwise (`themes_match=any`) experiments
+      having any of them.
+    - Stages may be given as comma separated stage numbers with the `stages`
+      query parameter.
+    - Logged in users get a personalized feed by giving the `first_load=true`
+      query parameter. Experiments sharing themes with the interests of the
+      user are ranked by the number of shared themes and then by recency.
 
     ### Response
 
@@ -495,6 +516,34 @@ class ExperimentViewSet(
 
     No response content returned
 
+    facets:
+    Return the number of experiments per stage and per theme for the current
+    filter state.
+
+    ### Notices
+
+    - Accepts the same filter and search query parameters as `list`.
+    - Options without matching experiments are not listed.
+
+    ### Response
+
+    Sample JSON response body:
+
+        {
+            "stages": [
+                {
+                    "id": 1,
+                    "count": 12
+                }
+            ],
+            "themes": [
+                {
+                    "id": 1,
+                    "count": 4
+                }
+            ]
+        }
+
     statistics:
     Return some statistical values based on existing experiments.
 
@@ -513,8 +562,10 @@ class ExperimentViewSet(
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
-        filters.OrderingFilter,
+        ExperimentOrderingFilter,
     )
+    facets_generation = FACETS_GENERATION
+    facets_vary_by_user = True
     ordering = ('-created_at')
     filterset_class = ExperimentFilter
     lookup_field = 'slug'
@@ -522,36 +573,70 @@ class ExperimentViewSet(
     permission_classes = (
         ReadOnly | IsAuthenticatedAndCreateOnly | IsResponsible,
     )
+    query_budgets = {
+        'answer_questions': 6,
+        'facets': 3,
+        'list': 5,
+        'retrieve': 15,
+        'statistics': 4,
+    }
     search_fields = (
         'name',
     )
     serializer_class = ExperimentSerializer
 
     def get_queryset(self):
-        query = Q(question__is_public=True) | \
-                (Q(question__is_public=False) &
-                 Q(experiment__responsible_users=self.request.user))
-        if isinstance(self.request.user, AnonymousUser):
-            query = Q(question__is_public=True)
-        return (
+        queryset = (
             Experiment.objects.for_user(self.request.user)
             .select_related('image', 'stage')
-            .prefetch_related(
-                Prefetch(
-                    'questionanswer_set',
-                    queryset=QuestionAnswer.objects.filter(
-                        query
-                    ).order_by(
-                        'question_id'
-                    )
-                ),
-                'experiment_challenges'
-            ).order_by('-published_at', '-created_at')
+            .order_by('-published_at', '-created_at')
+        )
+        if self.action != 'retrieve':
+            return queryset
+
+        # Answers, experiment challenges and posts are only represented in
+        # the `retrieve` response.
+        query = Q(question__is_public=True) | (
+            Q(question__is_public=False) &
+            Q(experiment__responsible_users__id=self.request.user.id)
+        )
+        if not self.request.user.is_authenticated:
+            query = Q(question__is_public=True)
+        return queryset.prefetch_related(
+            Prefetch(
+                'questionanswer_set',
+                queryset=QuestionAnswer.objects.filter(
+                    query
+                ).order_by(
+                    'question_id'
+                )
+            ),
+            'experiment_challenges',
+            Prefetch(
+                'posts',
+                queryset=ExperimentPost.objects.select_related(
+                    'created_by__profile__image'
+                ).prefetch_related(
+                    Prefetch(
+                        'comments',
+                        queryset=ExperimentPostComment.objects.select_related(
+                            'created_by__profile__image'
+                        )
+                    ),
+                    'images'
+                )
+            ),
+            Prefetch(
+                'responsible_users',
+                queryset=User.objects.select_related('profile__image')
+            )
         )
 
     def get_response_codes(self):
         if self.action == 'answer_questions':
             return ('204',)
+        if self.action == 'facets':
+            return ('200',)
         if self.action == 'looking_for_options':
             return ('200',)
         if self.action == 'statistics':
@@ -597,11 +682,7 @@ class ExperimentViewSet(
 
     @action(detail=False)
     def looking_for_options(self, request):
-        serializer = self.get_serializer(
-            ExperimentLookingForOption.objects.all(),
-            many=True
-        )
-        return Response(serializer.data)
+        return catalog_response(request, looking_for_option_catalog)
 
     @action(detail=True, methods=['put'])
     def answer_questions(self, request, slug=None):
@@ -616,18 +697,7 @@ class ExperimentViewSet(
 
     @action(detail=False)
     def statistics(self, request):
-        return Response({
-            'active_users_count': (
-                get_user_model().objects.filter(is_active=True).count()
-            ),
-            'experiment_success_rating_average': (
-                Experiment.objects.aggregate(avg=Avg('success_rating'))['avg']
-            ),
-            'users_with_experiments_count': (
-                get_user_model().objects.exclude(owned_experiments=None).count()
-            ),
-            'visible_experiments_count': Experiment.objects.active().count(),
-        })
+        return Response(get_statistics())
 
     def retrieve(self, request, *args, **kwargs):
         obj = self.get_object()
@@ -649,6 +719,7 @@ class ExperimentViewSet(
 
 class ExperimentPostViewSet(
     ApiResponseCodeDocumentationMixin,
+    CachedObjectMixin,
     viewsets.ModelViewSet
 ):
     """API endpoints for handling experiment post instances.
@@ -843,6 +914,10 @@ class ExperimentPostViewSet(
     permission_classes = (
         ReadOnly | IsAuthenticatedAndCreateOnly | IsResponsible | IsOwner,
     )
+    query_budgets = {
+        'list': 7,
+        'retrieve': 7,
+    }
     serializer_class = ExperimentPostSerializer
 
     def get_parent_object(self):
@@ -886,6 +961,7 @@ class ExperimentPostViewSet(
 
 class ExperimentPostCommentViewSet(
     ApiResponseCodeDocumentationMixin,
+    CachedObjectMixin,
     viewsets.ModelViewSet
 ):
     """API endpoints for handling experiment post comment instances.
@@ -1030,6 +1106,10 @@ class ExperimentPostCommentViewSet(
     permission_classes = (
         ReadOnly | CreateOnly | IsResponsibleAndDestroyOnly | IsOwner,
     )
+    query_budgets = {
+        'list': 3,
+        'retrieve': 3,
+    }
     queryset = ExperimentPostComment.objects.all()
     serializer_class = ExperimentPostCommentSerializer
 
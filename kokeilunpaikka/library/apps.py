@@ -1,7 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete
 from django.utils.translation import gettext_lazy as _
 
 
 class LibraryConfig(AppConfig):
     name = 'kokeilunpaikka.library'
     verbose_name = _('Library')
+
+    def ready(self):
+        from ..experiments.models import Experiment
+        from ..themes.models import Theme
+        from . import signals
+        from .models import LibraryItem
+
+        m2m_changed.connect(signals.themes_changed, sender=LibraryItem.themes.through)
+        m2m_changed.connect(signals.themes_changed, sender=Experiment.themes.through)
+        post_delete.connect(signals.theme_post_delete, sender=Theme)
@@ -1,12 +1,23 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count
 from django.utils.translation import gettext_lazy as _
 
 from parler.models import TranslatableModel, TranslatedFields
 
 from ..experiments.models import Experiment
+from ..utils.cache import get_generation
 from ..utils.models import SanitizedRichTextField, TimeStampedModel
 from .querysets import LibraryItemQuerySet
 
+EXPERIMENT_IDS_CACHE_TIMEOUT = 10 * 60  # seconds
+
+EXPERIMENT_IDS_GENERATION = 'library_item_experiment_ids'
+
+# Number of experiments listed in the library item details and returned
+# by default per page of the library item experiments endpoint.
+EXPERIMENTS_PAGE_SIZE = 12
+
 
 class LibraryItem(TimeStampedModel, TranslatableModel):
     image = models.ImageField(
@@ -56,14 +67,39 @@ class LibraryItem(TimeStampedModel, TranslatableModel):
     def __str__(self):
         return self.name
 
-    @property
-    def experiments(self):
-        return (
-            Experiment.objects
-            .active()
-            .filter(themes__in=self.themes.values_list('id', flat=True))
-            .order_by(
-                '-published_at',
-                '-created_at'
-            )
+    def get_experiment_ids(self):
+        """Return ids of active experiments sharing themes with this library
+        item, the ones sharing the most themes first.
+
+        The ids are cached until themes of library items or experiments
+        change, or at most for `EXPERIMENT_IDS_CACHE_TIMEOUT` seconds.
+        """
+        cache_key = 'library_item_experiment_ids:{}:{}'.format(
+            get_generation(EXPERIMENT_IDS_GENERATION),
+            self.pk,
         )
+        experiment_ids = cache.get(cache_key)
+        if experiment_ids is None:
+            experiment_ids = list(
+                Experiment.objects
+                .active()
+                .filter(themes__in=self.themes.all())
+                .annotate(shared_themes=Count('themes'))
+                .order_by(
+                    '-shared_themes',
+                    '-published_at',
+                    '-created_at'
+                )
+                .values_list('id', flat=True)
+            )
+            cache.set(cache_key, experiment_ids, EXPERIMENT_IDS_CACHE_TIMEOUT)
+        return experiment_ids
+
+    def get_experiments(self, experiment_ids=None):
+        """Return experiments by the given ids or by `get_experiment_ids` in
+        the same order.
+        """
+        if experiment_ids is None:
+            experiment_ids = self.get_experiment_ids()
+        experiments = Experiment.objects.active().with_list_relations().in_bulk(experiment_ids)
+        return [experiments[pk] for pk in experiment_ids if pk in experiments]
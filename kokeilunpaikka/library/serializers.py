@@ -1,11 +1,15 @@
 from rest_framework import serializers
 
 from ..experiments.serializers import ExperimentListSerializer
-from ..utils.serializers import ThumbnailImageField
-from .models import LibraryItem
+from ..utils.serializers import (
+    ThumbnailImageField,
+    TranslationPrefetchListSerializer,
+    TranslationPrefetchMixin
+)
+from .models import EXPERIMENTS_PAGE_SIZE, LibraryItem
 
 
-class LibraryItemBaseSerializer(serializers.ModelSerializer):
+class LibraryItemBaseSerializer(TranslationPrefetchMixin, serializers.ModelSerializer):
     image_url = ThumbnailImageField(
         size='list_image',
         source='image',
@@ -13,6 +17,7 @@ class LibraryItemBaseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LibraryItem
+        list_serializer_class = TranslationPrefetchListSerializer
         fields = (
             'id',
             'description',
@@ -36,9 +41,7 @@ class LibraryItemListSerializer(LibraryItemBaseSerializer):
 
 
 class LibraryItemRetrieveSerializer(LibraryItemBaseSerializer):
-    experiments = ExperimentListSerializer(
-        many=True,
-    )
+    experiments = serializers.SerializerMethodField()
     image_url = ThumbnailImageField(
         size='hero_image',
         source='image',
@@ -48,3 +51,11 @@ class LibraryItemRetrieveSerializer(LibraryItemBaseSerializer):
         fields = LibraryItemBaseSerializer.Meta.fields + (
             'experiments',
         )
+
+    def get_experiments(self, instance):
+        experiment_ids = instance.get_experiment_ids()[:EXPERIMENTS_PAGE_SIZE]
+        return ExperimentListSerializer(
+            instance.get_experiments(experiment_ids),
+            context=self.context,
+            many=True,
+        ).data
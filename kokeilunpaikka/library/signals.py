@@ -0,0 +1,22 @@
+from django.db import transaction
+
+from ..utils.cache import bump_generation
+from .models import EXPERIMENT_IDS_GENERATION
+
+
+def themes_changed(sender, action, **kwargs):
+    """Invalidate the cached experiment ids of all library items when themes
+    of library items or experiments change.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_experiment_ids()
+
+
+def theme_post_delete(sender, instance, **kwargs):
+    invalidate_experiment_ids()
+
+
+def invalidate_experiment_ids():
+    # Bumped only after commit, so that the ids are not cached again from
+    # data which is not yet visible to other connections.
+    transaction.on_commit(lambda: bump_generation(EXPERIMENT_IDS_GENERATION))
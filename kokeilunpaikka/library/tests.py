@@ -55,14 +55,14 @@ class LibraryItemAPITestCase(APITestCase):
             name='Library Item',
             slug='library-item',
         )
-        theme = Theme.objects.create()
+        self.theme = Theme.objects.create()
         self.experiment = Experiment.objects.create(
             description='Lorem ipsum',
             is_published=True,
             name='Example Experiment',
         )
-        self.experiment.themes.add(theme)
-        self.library_item.themes.add(theme)
+        self.experiment.themes.add(self.theme)
+        self.library_item.themes.add(self.theme)
 
     def test_library_item_list(self):
         expected_response_body = [{
@@ -96,7 +96,7 @@ class LibraryItemAPITestCase(APITestCase):
                 'published_at': '2019-07-10T12:00:00Z',
                 'short_description': 'Lorem ipsum',
                 'slug': 'example-experiment',
-                'themes': [{'id': 59, 'is_curated': False, 'name': None}],
+                'themes': [{'id': self.theme.id, 'is_curated': False, 'name': None}],
                 'stage': {
                     'description': '',
                     'name': 'First stage',
@@ -126,3 +126,48 @@ class LibraryItemAPITestCase(APITestCase):
         })
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_library_item_experiments(self):
+        other_theme = Theme.objects.create()
+        self.library_item.themes.add(other_theme)
+        best_match = Experiment.objects.create(
+            is_published=True,
+            name='Best match',
+        )
+        best_match.themes.add(self.theme, other_theme)
+        Experiment.objects.create(
+            is_published=False,
+            name='Unpublished',
+        ).themes.add(self.theme)
+
+        url = reverse('library-item-experiments', kwargs={
+            'translations__slug': self.library_item.slug
+        })
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(
+            [experiment['id'] for experiment in response.json()['results']],
+            [best_match.id, self.experiment.id]
+        )
+
+        response = self.client.get(url + '?page_size=1&page=2')
+        self.assertEqual(
+            [experiment['id'] for experiment in response.json()['results']],
+            [self.experiment.id]
+        )
+
+    def test_library_item_experiments_are_updated_on_theme_changes(self):
+        url = reverse('library-item-experiments', kwargs={
+            'translations__slug': self.library_item.slug
+        })
+        self.assertEqual(self.client.get(url).json()['count'], 1)
+
+        experiment = Experiment.objects.create(is_published=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment.themes.add(self.theme)
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.library_item.themes.clear()
+        self.assertEqual(self.client.get(url).json()['count'], 0)
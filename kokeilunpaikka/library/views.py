@@ -1,14 +1,20 @@
 from rest_framework import filters, mixins, viewsets
+from rest_framework.decorators import action
 
 from ..docs.mixins import ApiResponseCodeDocumentationMixin
+from ..experiments.serializers import ExperimentListSerializer
 from ..utils.pagination import ControllablePageNumberPagination
-from .models import LibraryItem
+from .models import EXPERIMENTS_PAGE_SIZE, LibraryItem
 from .serializers import (
     LibraryItemListSerializer,
     LibraryItemRetrieveSerializer
 )
 
 
+class LibraryItemExperimentPagination(ControllablePageNumberPagination):
+    page_size = EXPERIMENTS_PAGE_SIZE
+
+
 class LibraryItemViewSet(
     ApiResponseCodeDocumentationMixin,
     mixins.RetrieveModelMixin,
@@ -43,7 +49,8 @@ class LibraryItemViewSet(
 
     ### Notices
 
-    - Lists all public experiments that use themes linked to this library item.
+    - Lists the first public experiments that use themes linked to this
+      library item, see `experiments` for all of them.
 
     ### Response
 
@@ -74,6 +81,44 @@ class LibraryItemViewSet(
             "slug": "example"
         }
 
+    experiments:
+    Return public experiments that use themes linked to the given library
+    item.
+
+    ### Notices
+
+    - Experiments sharing the most themes with the library item are listed
+      first.
+    - Results are paginated, page size may be changed by giving the
+      `page_size` query parameter.
+
+    ### Response
+
+    Sample JSON response body:
+
+        {
+            "count": 1,
+            "next": null,
+            "previous": null,
+            "results": [
+                {
+                    "id": 1,
+                    "image_url": "http://localhost/media/test.jpg.720x480_q80_crop.jpg",
+                    "is_published": true,
+                    "name": "Test",
+                    "published_at": "2019-11-07T09:43:50.837027Z",
+                    "short_description": "Lorem ipsum",
+                    "slug": "test",
+                    "stage": {
+                        "description": "Lorem ipsum",
+                        "name": "First stage",
+                        "stage_number": 1
+                    },
+                    "themes": []
+                }
+            ]
+        }
+
     """
     filter_backends = (
         filters.OrderingFilter,
@@ -81,12 +126,32 @@ class LibraryItemViewSet(
     ordering = ('-created_at')
     lookup_field = 'translations__slug'
     pagination_class = ControllablePageNumberPagination
+    query_budgets = {
+        'experiments': 5,
+        'list': 3,
+        'retrieve': 6,
+    }
 
     def get_queryset(self):
         return LibraryItem.objects.visible()
 
+    def get_response_codes(self):
+        if self.action == 'experiments':
+            return ('200', '404')
+        return super().get_response_codes()
+
     def get_serializer_class(self):
         if self.action == 'list':
             return LibraryItemListSerializer
         if self.action == 'retrieve':
             return LibraryItemRetrieveSerializer
+        if self.action == 'experiments':
+            return ExperimentListSerializer
+
+    @action(detail=True, pagination_class=LibraryItemExperimentPagination)
+    def experiments(self, request, *args, **kwargs):
+        library_item = self.get_object()
+        experiment_ids = library_item.get_experiment_ids()
+        page = self.paginate_queryset(experiment_ids)
+        serializer = self.get_serializer(library_item.get_experiments(page), many=True)
+        return self.get_paginated_response(serializer.data)
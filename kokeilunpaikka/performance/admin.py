@@ -0,0 +1,126 @@
+import json
+
+from django.contrib import admin
+from django.http import Http404, HttpResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+
+from .models import RequestProfile
+
+# Downloadable artifacts of a profile by their names: content type, file
+# extension and a function returning the content.
+ARTIFACTS = {
+    'allocations': (
+        'text/plain; charset=utf-8',
+        'txt',
+        lambda profile: profile.allocations,
+    ),
+    'sql': (
+        'application/json',
+        'json',
+        lambda profile: json.dumps(profile.sql_timeline, indent=2),
+    ),
+    'stats': (
+        'application/octet-stream',
+        'prof',
+        lambda profile: bytes(profile.stats),
+    ),
+}
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    date_hierarchy = 'created_at'
+    fields = (
+        'created_at',
+        'user',
+        'method',
+        'path',
+        'view_name',
+        'status_code',
+        'duration',
+        'query_count',
+        'query_duration',
+        'peak_memory',
+        'downloads',
+        'summary',
+        'allocations',
+    )
+    list_display = (
+        'created_at',
+        'method',
+        'path',
+        'status_code',
+        'duration',
+        'query_count',
+        'peak_memory',
+        'user',
+    )
+    list_filter = (
+        'method',
+        'view_name',
+    )
+    readonly_fields = fields
+    search_fields = (
+        'path',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        # The artifacts are only loaded for a single profile.
+        return super().get_queryset(request).select_related('user').defer(
+            'allocations',
+            'sql_timeline',
+            'stats',
+            'summary',
+        )
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:object_id>/download/<str:artifact>/',
+                self.admin_site.admin_view(self.download_view),
+                name='performance_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, object_id, artifact):
+        profile = self.get_object(request, object_id)
+        if profile is None or artifact not in ARTIFACTS or \
+                not self.has_view_permission(request, profile):
+            raise Http404()
+        content_type, extension, get_content = ARTIFACTS[artifact]
+        response = HttpResponse(get_content(profile), content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="profile-{}-{}.{}"'.format(
+            profile.pk,
+            artifact,
+            extension,
+        )
+        return response
+
+    def downloads(self, obj):
+        return format_html_join(', ', '<a href="{}">{}</a>', (
+            (
+                reverse(
+                    'admin:performance_requestprofile_download',
+                    args=(obj.pk, artifact),
+                ),
+                '{}.{}'.format(artifact, extension),
+            )
+            for artifact, (content_type, extension, get_content) in ARTIFACTS.items()
+        ))
+    downloads.short_description = _('downloads')
+
+    def summary(self, obj):
+        return format_html('<pre>{}</pre>', obj.summary)
+    summary.short_description = _('summary')
+
+    def allocations(self, obj):
+        return format_html('<pre>{}</pre>', obj.allocations)
+    allocations.short_description = _('allocations')
@@ -0,0 +1,245 @@
+import csv
+import io
+import math
+import os
+import random
+import time
+import tracemalloc
+from collections import OrderedDict
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, Max
+
+from ..excel_export.experiments_export import (
+    ExperimentChallengeReport,
+    UserDetailsReport
+)
+from ..experiments.models import Experiment, ExperimentChallenge
+from ..sitemap.management.commands import create_sitemap
+from ..themes.models import Theme
+from .db import QueryRecorder, record_queries
+
+# Growth exponents above these limits between the two largest sizes are
+# reported. Batch jobs should run a constant number of queries or one per
+# chunk, and their time and memory should grow at most linearly.
+QUERY_GROWTH_LIMIT = 0.5
+RESOURCE_GROWTH_LIMIT = 1.2
+
+CSV_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def get_volumes(size):
+    """Return the generated volumes of a dataset of the given size.
+
+    All experiments are candidates for the only challenge, so the challenge
+    report grows with the size too.
+    """
+    return {
+        'answers': 2 * size,
+        'challenges': 1,
+        'comments': 2 * size,
+        'experiments': size,
+        'library_items': 10,
+        'posts': size,
+        'themes': 20,
+        'users': size,
+    }
+
+
+class BatchJob:
+    """Batch code path measured by the batch benchmarks.
+
+    `prepare` is called before the measurement, e.g. to write input files
+    into the working directory.
+    """
+    name = None
+
+    def prepare(self, workdir, size):
+        pass
+
+    def run(self, workdir):
+        raise NotImplementedError
+
+
+class ChallengeReportJob(BatchJob):
+    name = 'challenge-report'
+
+    def run(self, workdir):
+        challenge = (
+            ExperimentChallenge.objects
+            .annotate(experiment_count=Count('experiment'))
+            .order_by('-experiment_count')
+            .first()
+        )
+        ExperimentChallengeReport(challenge).create()
+
+
+class UserReportJob(BatchJob):
+    name = 'user-report'
+
+    def run(self, workdir):
+        UserDetailsReport(get_user_model().objects.all()).create()
+
+
+class SitemapJob(BatchJob):
+    name = 'sitemap'
+
+    def run(self, workdir):
+        # WordPress content lives outside of the database.
+        with patch.object(
+            create_sitemap.Command,
+            'fetch_wp_content',
+            side_effect=lambda content_type: iter(()),
+        ):
+            call_command('create_sitemap', output_dir=workdir, stdout=io.StringIO())
+
+
+class ImportJob(BatchJob):
+    """Import themes, users, experiments and experiment data of the old
+    system from generated CSV files.
+
+    The ids of the files continue after the existing rows, so the imported
+    rows are created instead of updating the generated content.
+    """
+    name = 'import'
+    types = ('themes', 'users', 'experiments', 'experiment_data')
+
+    def prepare(self, workdir, size):
+        rng = random.Random(size)
+        timestamp = time.strftime(CSV_TIMESTAMP_FORMAT)
+
+        def next_id(model):
+            return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+        theme_ids = range(next_id(Theme), next_id(Theme) + 20)
+        user_ids = range(next_id(get_user_model()), next_id(get_user_model()) + size)
+        experiment_ids = range(next_id(Experiment), next_id(Experiment) + size)
+
+        def tags(count):
+            return '[{}]'.format(', '.join(
+                str(theme_id) for theme_id in rng.sample(theme_ids, count)
+            ))
+
+        self.write(workdir, 'themes', ('id', 'name', 'created_at', 'updated_at'), (
+            (pk, 'Tuotu teema {}'.format(pk), timestamp, timestamp)
+            for pk in theme_ids
+        ))
+        self.write(workdir, 'users', (
+            'id', 'first_name', 'last_name', 'email', 'last_login', 'created_at',
+            'links', 'description', 'image_filename', 'tags',
+        ), (
+            (
+                pk, 'Tuotu', str(pk), 'imported{}@example.com'.format(pk), '',
+                timestamp, '[https://twitter.com/{}]'.format(pk), 'Kuvaus', '',
+                tags(rng.randint(0, 2)),
+            )
+            for pk in user_ids
+        ))
+        self.write(workdir, 'experiments', (
+            'id', 'stage_id', 'links', 'name_fi', 'name_sv', 'name_en',
+            'description_fi', 'description_sv', 'description_en', 'organizer_fi',
+            'organizer_sv', 'organizer_en', 'created_at', 'updated_at',
+            'published_at', 'is_published', 'created_by_id', 'image_filename',
+            'tags',
+        ), (
+            (
+                pk, rng.randint(0, 5), '[https://example.com/{}]'.format(pk),
+                'Tuotu kokeilu {}'.format(pk), '', '', 'Kuvaus', '', '',
+                'Järjestäjä', '', '', timestamp, timestamp, timestamp, '1',
+                rng.choice(user_ids), '', tags(rng.randint(1, 2)),
+            )
+            for pk in experiment_ids
+        ))
+        self.write(workdir, 'experiment_data', (
+            'experiment_id', 'lang_code', 'content_key', 'content', 'created_at',
+            'updated_at', 'stage',
+        ), (
+            (pk, 'fi', content_key, 'Sisältö', timestamp, timestamp, '1')
+            for pk in experiment_ids
+            for content_key in (
+                'title',
+                '1_long_description',
+                '0_short_description',
+                '2_who',
+                'what_learned',
+            )
+        ))
+
+    def write(self, workdir, import_type, header, rows):
+        with open(self.path(workdir, import_type), 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';', quotechar='"')
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def path(self, workdir, import_type):
+        return os.path.join(workdir, '{}.csv'.format(import_type))
+
+    def run(self, workdir):
+        for import_type in self.types:
+            call_command(
+                'import_csv_dump',
+                file=self.path(workdir, import_type),
+                type=import_type,
+                stdout=io.StringIO(),
+            )
+
+
+BATCH_JOBS = (
+    ChallengeReportJob(),
+    UserReportJob(),
+    SitemapJob(),
+    ImportJob(),
+)
+
+
+def measure(job, workdir, size):
+    """Run the job and return its wall time, query count and peak memory.
+
+    The memory allocations are traced during the whole run, which slows it
+    down by the same factor for every size.
+    """
+    job.prepare(workdir, size)
+    tracemalloc.start()
+    try:
+        with record_queries(QueryRecorder()) as recorder:
+            start = time.perf_counter()
+            job.run(workdir)
+            duration = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return OrderedDict([
+        ('seconds', round(duration, 3)),
+        ('queries', recorder.count),
+        ('peak_memory_mb', round(peak_memory / 1024 / 1024, 2)),
+    ])
+
+
+def get_growth(sizes, values):
+    """Return the exponent k of the growth `value ~ size ** k` between the
+    two largest sizes, or None if it can't be calculated.
+    """
+    if len(sizes) < 2 or not values[-2] or not values[-1]:
+        return None
+    return round(
+        math.log(values[-1] / values[-2]) / math.log(sizes[-1] / sizes[-2]),
+        2,
+    )
+
+
+def get_warnings(name, sizes, results):
+    """Return descriptions of the measurements of the job growing faster
+    than allowed.
+    """
+    warnings = []
+    for key, limit in (
+        ('queries', QUERY_GROWTH_LIMIT),
+        ('seconds', RESOURCE_GROWTH_LIMIT),
+        ('peak_memory_mb', RESOURCE_GROWTH_LIMIT),
+    ):
+        growth = get_growth(sizes, [result[key] for result in results])
+        if growth is not None and growth > limit:
+            warnings.append('{} {} grow as size^{}'.format(name, key, growth))
+    return warnings
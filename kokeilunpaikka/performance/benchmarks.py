@@ -0,0 +1,136 @@
+import math
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from ..experiments.models import Experiment, ExperimentChallenge
+from ..library.models import LibraryItem
+from .db import QueryRecorder, record_queries
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def get_endpoints():
+    """Return the URLs of the benchmarked endpoints by their names.
+
+    Detail endpoints are benchmarked with the first published experiment,
+    visible challenge, library item and listed user of the database.
+    """
+    experiment = Experiment.objects.filter(is_published=True).order_by('pk').first()
+    challenge = ExperimentChallenge.objects.filter(is_visible=True).order_by('pk').first()
+    library_item = LibraryItem.objects.visible().order_by('pk').first()
+    user = get_user_model().objects.filter(
+        is_active=True,
+        profile__isnull=False,
+    ).order_by('pk').first()
+
+    endpoints = OrderedDict([
+        ('experiment-list', reverse('experiment-list')),
+        ('experiment-statistics', reverse('experiment-statistics')),
+        ('user-list', reverse('user-list')),
+    ])
+    if experiment is not None:
+        endpoints['experiment-detail'] = reverse(
+            'experiment-detail',
+            kwargs={'slug': experiment.slug},
+        )
+    if challenge is not None:
+        endpoints['experiment-challenge-detail'] = reverse(
+            'experiment-challenge-detail',
+            kwargs={'translations__slug': challenge.slug},
+        )
+    if library_item is not None:
+        endpoints['library-item-detail'] = reverse(
+            'library-item-detail',
+            kwargs={'translations__slug': library_item.slug},
+        )
+    if user is not None:
+        endpoints['user-detail'] = reverse('user-detail', kwargs={'pk': user.pk})
+    return endpoints
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of the values."""
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise BenchmarkError('{} returned status {}.'.format(url, response.status_code))
+    return response
+
+
+def measure(client, url, rounds):
+    """Request the URL the given number of times and return the latency
+    percentiles, the query count and the peak memory of the requests.
+
+    The memory is measured in an additional request, as tracing the memory
+    allocations slows the request down.
+    """
+    get(client, url)
+    durations = []
+    query_count = 0
+    for i in range(rounds):
+        with record_queries(QueryRecorder()) as recorder:
+            start = time.perf_counter()
+            get(client, url)
+            durations.append(time.perf_counter() - start)
+        query_count = max(query_count, recorder.count)
+
+    tracemalloc.start()
+    try:
+        get(client, url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return OrderedDict([
+        ('p50_ms', round(percentile(durations, 0.5) * 1000, 2)),
+        ('p95_ms', round(percentile(durations, 0.95) * 1000, 2)),
+        ('queries', query_count),
+        ('peak_memory_kb', round(peak_memory / 1024, 1)),
+    ])
+
+
+def run_benchmarks(rounds):
+    client = Client()
+    return OrderedDict(
+        (name, measure(client, url, rounds))
+        for name, url in get_endpoints().items()
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of the measurements worse than in the baseline.
+
+    Latencies and memory may exceed the baseline by the given fraction, but
+    any additional query is a regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'peak_memory_kb'):
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append('{} {}: {} > {}'.format(
+                    name,
+                    key,
+                    result[key],
+                    expected[key],
+                ))
+        if result['queries'] > expected['queries']:
+            regressions.append('{} queries: {} > {}'.format(
+                name,
+                result['queries'],
+                expected['queries'],
+            ))
+    return regressions
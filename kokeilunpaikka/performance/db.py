@@ -0,0 +1,91 @@
+import io
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date
+
+from django.db import connections
+
+# Number of rows sent to the database in a single COPY statement.
+COPY_CHUNK_SIZE = 10000
+
+
+class QueryRecorder:
+    """Database execute wrapper counting the executed queries and the time
+    spent executing them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def record_queries(recorder):
+    """Pass the queries executed in every database connection of the current
+    thread through the given execute wrapper.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def format_copy_value(value):
+    """Format the value in the text format of PostgreSQL COPY."""
+    if isinstance(value, str):
+        return (
+            value
+            .replace('\\', '\\\\')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+            .replace('\t', '\\t')
+        )
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return '{{{}}}'.format(','.join(str(item) for item in value))
+    return str(value)
+
+
+def copy_rows(model, field_names, rows, using='default'):
+    """Insert the rows, tuples of values of the given fields, into the table
+    of the model with COPY.
+
+    The rows are sent in chunks written to an in-memory buffer, so a
+    generator of any number of rows can be given. No signals are sent and
+    the sequences of the inserted primary keys are not reset. Returns the
+    number of inserted rows.
+    """
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        quote_name(model._meta.db_table),
+        ', '.join(quote_name(model._meta.get_field(name).column) for name in field_names),
+    )
+    count = 0
+    with connection.cursor() as cursor:
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(format_copy_value(value) for value in row))
+            buffer.write('\n')
+            count += 1
+            if count % COPY_CHUNK_SIZE == 0:
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                buffer = io.StringIO()
+        if count % COPY_CHUNK_SIZE:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    return count
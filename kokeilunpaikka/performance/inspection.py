@@ -0,0 +1,149 @@
+import logging
+import os
+import re
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from rest_framework import serializers
+
+from .db import record_queries
+
+logger = logging.getLogger(__name__)
+
+# A statement executed this many times from the same call site while handling
+# a single request is reported as a query executed per row.
+REPEATED_QUERY_THRESHOLD = 3
+
+# Code locations skipped when looking for the call site of a query.
+IGNORED_PATHS = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    for filename in ('db.py', 'inspection.py', 'middleware.py')
+) + (
+    os.sep + 'site-packages' + os.sep,
+)
+
+LITERAL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\?(?:, \?)*\)'), '(...)'),
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """Return the statement with the literals and parameters replaced, so
+    statements differing only by their values are equal.
+    """
+    for pattern, replacement in LITERAL_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def get_call_site(frame):
+    """Return the innermost project code location of the stack of the frame
+    and the serializer field being represented there, if any.
+    """
+    call_site = ''
+    serializer_field = ''
+    while frame is not None and not (call_site and serializer_field):
+        code = frame.f_code
+        if not call_site and code.co_filename.startswith(settings.BASE_DIR) and \
+                not any(path in code.co_filename for path in IGNORED_PATHS):
+            call_site = '{}:{} in {}'.format(
+                os.path.relpath(code.co_filename, settings.BASE_DIR),
+                frame.f_lineno,
+                code.co_name,
+            )
+        if not serializer_field and code.co_name == 'to_representation':
+            serializer = frame.f_locals.get('self')
+            field = frame.f_locals.get('field')
+            if isinstance(serializer, serializers.Serializer) and field is not None:
+                serializer_field = '{}.{}'.format(
+                    type(serializer).__name__,
+                    field.field_name,
+                )
+        frame = frame.f_back
+    return call_site, serializer_field
+
+
+class QueryGroup:
+
+    def __init__(self, sql, call_site, serializer_field):
+        self.sql = sql
+        self.call_site = call_site
+        self.serializer_field = serializer_field
+        self.count = 0
+
+    def __str__(self):
+        return '{} queries from {}{}: {}'.format(
+            self.count,
+            self.call_site or 'unknown location',
+            ' ({})'.format(self.serializer_field) if self.serializer_field else '',
+            self.sql,
+        )
+
+
+class QueryInspector:
+    """Database execute wrapper grouping the executed queries by their
+    normalized statement and call site.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.groups = OrderedDict()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        call_site, serializer_field = get_call_site(sys._getframe(1))
+        key = (normalize_sql(sql), call_site)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = QueryGroup(key[0], call_site, serializer_field)
+        group.count += 1
+        return execute(sql, params, many, context)
+
+    def get_repeated_queries(self, threshold=REPEATED_QUERY_THRESHOLD):
+        """Return the groups of statements repeated at least `threshold`
+        times from the same call site, most repeated first.
+        """
+        return sorted(
+            (group for group in self.groups.values() if group.count >= threshold),
+            key=lambda group: -group.count,
+        )
+
+
+@contextmanager
+def inspect_queries():
+    """Group the queries executed inside the block, e.g. in a test::
+
+        with inspect_queries() as inspector:
+            self.client.get(url)
+        self.assertEqual(inspector.get_repeated_queries(), [])
+    """
+    with record_queries(QueryInspector()) as inspector:
+        yield inspector
+
+
+def get_query_budget(request):
+    """Return the query budget of the view and action handling the request,
+    or None if the view has no budget.
+
+    Views declare their budgets in a `query_budgets` dictionary keyed by the
+    viewset action, or by the lowercase method for other views.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    view_class = getattr(getattr(resolver_match, 'func', None), 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    if not budgets:
+        return None, ''
+    actions = getattr(resolver_match.func, 'actions', None) or {}
+    method = request.method.lower()
+    action = actions.get(method, method)
+    return budgets.get(action), '{}.{}'.format(view_class.__name__, action)
@@ -0,0 +1,225 @@
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.urls import reverse
+
+import requests
+
+from .benchmarks import percentile
+
+# Seconds to wait for a response before the request counts as an error.
+REQUEST_TIMEOUT = 30
+
+# Experiments listed on a page of the frontend.
+EXPERIMENT_PAGE_SIZE = 12
+
+
+class DelayedEmailBackend(BaseEmailBackend):
+    """Email backend which discards the messages after blocking for
+    `LOAD_TEST_MAIL_LATENCY` seconds per message.
+
+    Simulates the round trip to an SMTP server, as the mails are sent
+    synchronously within the requests.
+    """
+
+    def send_messages(self, email_messages):
+        email_messages = list(email_messages)
+        time.sleep(getattr(settings, 'LOAD_TEST_MAIL_LATENCY', 0) * len(email_messages))
+        return len(email_messages)
+
+
+class JourneyAborted(Exception):
+    pass
+
+
+class Results:
+    """Thread-safe store of the step durations and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, step, duration, error):
+        with self.lock:
+            self.durations[step].append(duration)
+            if error:
+                self.errors[step] += 1
+
+    def report(self, elapsed):
+        """Return the throughput, latency percentiles and error rate of each
+        step by the step names.
+        """
+        report = OrderedDict()
+        for step, durations in sorted(self.durations.items()):
+            report[step] = OrderedDict([
+                ('requests', len(durations)),
+                ('per_second', round(len(durations) / elapsed, 2)),
+                ('p50_ms', round(percentile(durations, 0.5) * 1000, 1)),
+                ('p95_ms', round(percentile(durations, 0.95) * 1000, 1)),
+                ('p99_ms', round(percentile(durations, 0.99) * 1000, 1)),
+                ('error_rate', round(self.errors[step] / len(durations), 3)),
+            ])
+        return report
+
+
+class VirtualUser:
+    """Client of a single simulated user with a session of its own."""
+
+    def __init__(self, base_url, username, password, results, rng):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.results = results
+        self.rng = rng
+        self.session = requests.Session()
+        self.is_logged_in = False
+
+    def request(self, step, method, path, expected_status, **kwargs):
+        """Make a request and record its duration under the step.
+
+        Raises `JourneyAborted` if the request fails or the status isn't the
+        expected one, as the rest of the journey would depend on it.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                self.base_url + path,
+                timeout=REQUEST_TIMEOUT,
+                **kwargs
+            )
+        except requests.RequestException:
+            self.results.record(step, time.perf_counter() - start, error=True)
+            raise JourneyAborted
+        error = response.status_code != expected_status
+        self.results.record(step, time.perf_counter() - start, error=error)
+        if error:
+            raise JourneyAborted
+        return response.json() if response.content else None
+
+    def log_in(self):
+        self.session.headers.pop('Authorization', None)
+        data = self.request('log in', 'post', reverse('rest_login'), 200, json={
+            'password': self.password,
+            'username': self.username,
+        })
+        self.session.headers['Authorization'] = 'Token {}'.format(data['key'])
+        self.is_logged_in = True
+
+    def ensure_logged_in(self):
+        if not self.is_logged_in:
+            self.log_in()
+
+
+def browse_and_comment(user):
+    """Browse the experiment list, open an experiment and comment on its
+    first post.
+    """
+    user.ensure_logged_in()
+    experiments = user.request(
+        'list experiments',
+        'get',
+        reverse('experiment-list'),
+        200,
+        params={'page_size': EXPERIMENT_PAGE_SIZE},
+    )['results']
+    if not experiments:
+        return
+    slug = user.rng.choice(experiments)['slug']
+    experiment = user.request(
+        'open experiment',
+        'get',
+        reverse('experiment-detail', kwargs={'slug': slug}),
+        200,
+    )
+    if not experiment['posts']:
+        return
+    user.request(
+        'comment',
+        'post',
+        reverse('experiment-post-comment-list', kwargs={
+            'experiment_slug': slug,
+            'post_id': experiment['posts'][0]['id'],
+        }),
+        201,
+        json={'content': 'Kommentti kuormitustestistä.'},
+    )
+
+
+def edit_profile(user):
+    """Log in and edit the profile description."""
+    user.log_in()
+    user.request('edit profile', 'patch', reverse('rest_user_details'), 200, json={
+        'description': 'Kuvaus {}'.format(user.rng.randint(1, 10 ** 6)),
+    })
+
+
+def publish_experiment(user):
+    """Create an unpublished experiment and publish it."""
+    user.ensure_logged_in()
+    experiment = user.request('create experiment', 'post', reverse('experiment-list'), 201, json={
+        'description': 'Kuormitustestin kokeilu.',
+        'is_published': False,
+        'name': 'Kuormitustesti {}'.format(user.rng.randint(1, 10 ** 6)),
+    })
+    user.request(
+        'publish experiment',
+        'patch',
+        reverse('experiment-detail', kwargs={'slug': experiment['slug']}),
+        200,
+        json={'is_published': True},
+    )
+
+
+# Journeys by their names with their relative weights. Most users only
+# browse, editing and publishing are rarer.
+JOURNEYS = OrderedDict([
+    ('browse-and-comment', (browse_and_comment, 6)),
+    ('edit-profile', (edit_profile, 2)),
+    ('publish-experiment', (publish_experiment, 1)),
+])
+
+
+def run_journeys(base_url, usernames, password, concurrency, duration, seed=0):
+    """Run journeys in the given number of threads for the given number of
+    seconds and return the report of the steps.
+
+    Every thread simulates one of the users, the users are shared by the
+    threads if there are fewer users than threads. The threads compete with
+    a server running in the same process, so a separately started server
+    gives more accurate absolute numbers.
+    """
+    results = Results()
+    journeys = list(JOURNEYS.values())
+    deadline = time.monotonic() + duration
+
+    def run(index):
+        rng = random.Random(seed + index)
+        user = VirtualUser(
+            base_url,
+            usernames[index % len(usernames)],
+            password,
+            results,
+            rng,
+        )
+        while time.monotonic() < deadline:
+            journey = rng.choices(
+                [journey for journey, weight in journeys],
+                weights=[weight for journey, weight in journeys],
+            )[0]
+            try:
+                journey(user)
+            except JourneyAborted:
+                pass
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Exceptions of the threads are raised when the results are read.
+        list(executor.map(run, range(concurrency)))
+    return results.report(time.monotonic() - start)
@@ -0,0 +1,120 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+
+from core.settings.base import BASE_DIR
+from kokeilunpaikka.performance.benchmarks import (
+    BenchmarkError,
+    compare,
+    run_benchmarks
+)
+from kokeilunpaikka.performance.seeding import (
+    Seeder,
+    add_volume_arguments,
+    get_volumes
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a test database with generated content and measures the '
+        'latency, query count and peak memory of the main API endpoints. '
+        'The results are compared against the stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        add_volume_arguments(parser)
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(BASE_DIR, 'benchmark-baseline.json'),
+            help='JSON file of the baseline results.',
+        )
+        parser.add_argument(
+            '--rounds',
+            default=20,
+            help='Number of measured requests per endpoint.',
+            type=int,
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Store the results as the new baseline.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            default=0.25,
+            help='Allowed relative increase of latency and memory.',
+            type=float,
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed.')
+        volumes = get_volumes(options)
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Inspecting the queries would distort the measurements.
+            with override_settings(QUERY_INSPECTION=None):
+                Seeder(volumes, seed=options['seed']).seed()
+                results = run_benchmarks(options['rounds'])
+        except BenchmarkError as e:
+            raise CommandError(e)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.write_results(results)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as f:
+                json.dump({'results': results, 'volumes': volumes}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                'Baseline saved to {}.'.format(options['baseline'])
+            ))
+            return
+
+        baseline = self.load_baseline(options['baseline'])
+        if baseline is None:
+            return
+        if baseline['volumes'] != volumes:
+            self.stdout.write(self.style.WARNING(
+                'The baseline was measured with different volumes, not comparing.'
+            ))
+            return
+        regressions = compare(results, baseline['results'], options['tolerance'])
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n{}'.format(
+                '\n'.join(regressions)
+            ))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(
+                'No baseline at {}, store one with --save-baseline.'.format(path)
+            ))
+            return None
+
+    def write_results(self, results):
+        row = '{:<30} {:>10} {:>10} {:>8} {:>12}'
+        self.stdout.write(row.format('endpoint', 'p50 ms', 'p95 ms', 'queries', 'peak KiB'))
+        for name, result in results.items():
+            self.stdout.write(row.format(
+                name,
+                result['p50_ms'],
+                result['p95_ms'],
+                result['queries'],
+                result['peak_memory_kb'],
+            ))
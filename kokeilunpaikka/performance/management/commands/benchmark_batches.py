@@ -0,0 +1,118 @@
+import json
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+
+from kokeilunpaikka.performance.batches import (
+    BATCH_JOBS,
+    get_growth,
+    get_volumes,
+    get_warnings,
+    measure
+)
+from kokeilunpaikka.performance.seeding import Seeder
+
+
+def parse_sizes(value):
+    try:
+        sizes = sorted({int(size) for size in value.split(',')})
+    except ValueError:
+        raise CommandError('Sizes must be a comma separated list of integers.')
+    if sizes[0] < 1:
+        raise CommandError('Sizes must be positive.')
+    return sizes
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the reports, the sitemap generation and the CSV import against '
+        'test databases seeded with datasets of increasing size, and reports '
+        'how their wall time, query count and peak memory grow.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='JSON file the results are written to.',
+        )
+        parser.add_argument(
+            '--seed',
+            default=0,
+            help='Seed of the generated content.',
+            type=int,
+        )
+        parser.add_argument(
+            '--sizes',
+            default='250,500,1000',
+            help=(
+                'Comma separated dataset sizes. A dataset has the given number '
+                'of users, experiments and posts, and twice as many comments '
+                'and answers.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        sizes = parse_sizes(options['sizes'])
+        results = {job.name: [] for job in BATCH_JOBS}
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Inspecting the queries would distort the measurements.
+            with override_settings(QUERY_INSPECTION=None):
+                for size in sizes:
+                    call_command('flush', interactive=False, verbosity=0)
+                    Seeder(get_volumes(size), seed=options['seed']).seed()
+                    with tempfile.TemporaryDirectory() as workdir:
+                        for job in BATCH_JOBS:
+                            results[job.name].append(measure(job, workdir, size))
+                            self.stdout.write('{} measured with size {}.'.format(
+                                job.name,
+                                size,
+                            ))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.write_results(sizes, results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'results': results, 'sizes': sizes}, f, indent=2)
+
+    def write_results(self, sizes, results):
+        row = '{:<20} {:>8} {:>10} {:>8} {:>10}'
+        self.stdout.write(row.format('job', 'size', 'seconds', 'queries', 'peak MiB'))
+        for name, job_results in results.items():
+            for size, result in zip(sizes, job_results):
+                self.stdout.write(row.format(
+                    name,
+                    size,
+                    result['seconds'],
+                    result['queries'],
+                    result['peak_memory_mb'],
+                ))
+            growths = (
+                get_growth(sizes, [result[key] for result in job_results])
+                for key in ('seconds', 'queries', 'peak_memory_mb')
+            )
+            self.stdout.write(row.format(name, 'growth', *(
+                '-' if growth is None else growth for growth in growths
+            )))
+
+        warnings = [
+            warning
+            for name, job_results in results.items()
+            for warning in get_warnings(name, sizes, job_results)
+        ]
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(warning))
+        if not warnings:
+            self.stdout.write(self.style.SUCCESS('All jobs grow at most linearly.'))
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kokeilunpaikka.performance.seeding import (
+    PASSWORD,
+    Seeder,
+    add_volume_arguments,
+    get_volumes
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic content of the given volumes into the database '
+        'for scale testing. The same seed generates the same content into an '
+        'empty database. Only allowed with DEBUG enabled.'
+    )
+
+    def add_arguments(self, parser):
+        add_volume_arguments(parser)
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError('Synthetic data can only be generated with DEBUG enabled.')
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed.')
+
+        start = time.perf_counter()
+        Seeder(get_volumes(options), seed=options['seed']).seed()
+        self.stdout.write(self.style.SUCCESS(
+            'Content generated in {:.1f} seconds. The password of the generated '
+            'users is "{}".'.format(time.perf_counter() - start, PASSWORD)
+        ))
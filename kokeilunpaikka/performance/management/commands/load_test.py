@@ -0,0 +1,168 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.testcases import LiveServerThread
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+
+from kokeilunpaikka.performance.loadtest import run_journeys
+from kokeilunpaikka.performance.seeding import (
+    PASSWORD,
+    Seeder,
+    add_volume_arguments,
+    get_volumes
+)
+
+
+def parse_concurrency(value):
+    try:
+        levels = sorted({int(level) for level in value.split(',')})
+    except ValueError:
+        raise CommandError('Concurrency must be a comma separated list of integers.')
+    if levels[0] < 1:
+        raise CommandError('Concurrency must be positive.')
+    return levels
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs scripted user journeys over HTTP with increasing numbers of '
+        'concurrent users and reports the throughput, latency percentiles '
+        'and error rate of every step. Without --url a local server is '
+        'started against a test database seeded with generated content.'
+    )
+
+    def add_arguments(self, parser):
+        add_volume_arguments(parser)
+        parser.add_argument(
+            '--concurrency',
+            default='1,4,16',
+            help='Comma separated numbers of concurrent users.',
+        )
+        parser.add_argument(
+            '--duration',
+            default=30,
+            help='Seconds to run the journeys with each number of users.',
+            type=float,
+        )
+        parser.add_argument(
+            '--mail-latency',
+            default=0.2,
+            help=(
+                'Seconds a mail send blocks the request on the local server. '
+                'The mails are discarded.'
+            ),
+            type=float,
+        )
+        parser.add_argument(
+            '--output',
+            help='JSON file the results are written to.',
+        )
+        parser.add_argument(
+            '--password',
+            default=PASSWORD,
+            help='Password of the users of the database.',
+        )
+        parser.add_argument(
+            '--url',
+            help=(
+                'Base URL of a running server to test instead of a local one. '
+                'The users are read from the configured database, which must '
+                'be the database of the server.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        levels = parse_concurrency(options['concurrency'])
+        if options['url']:
+            results = self.run_levels(options['url'].rstrip('/'), levels, options)
+        else:
+            results = self.run_local(levels, options)
+
+        self.write_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def run_local(self, levels, options):
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed.')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        server = None
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['localhost'],
+                EMAIL_BACKEND='kokeilunpaikka.performance.loadtest.DelayedEmailBackend',
+                LOAD_TEST_MAIL_LATENCY=options['mail_latency'],
+                # Inspecting the queries would distort the measurements.
+                QUERY_INSPECTION=None,
+            ):
+                Seeder(get_volumes(options), seed=options['seed']).seed()
+                server = LiveServerThread('localhost', lambda handler: handler)
+                server.daemon = True
+                server.start()
+                server.is_ready.wait()
+                if server.error:
+                    raise CommandError('Could not start the server: {}'.format(server.error))
+                return self.run_levels(
+                    'http://localhost:{}'.format(server.port),
+                    levels,
+                    options,
+                )
+        finally:
+            if server is not None:
+                server.terminate()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def run_levels(self, base_url, levels, options):
+        usernames = list(
+            get_user_model().objects.filter(
+                is_active=True,
+                profile__isnull=False,
+            ).order_by('pk').values_list('username', flat=True)[:max(levels)]
+        )
+        if not usernames:
+            raise CommandError('No users to log in with.')
+
+        results = {}
+        for concurrency in levels:
+            self.stdout.write('Running with {} concurrent users for {} seconds.'.format(
+                concurrency,
+                options['duration'],
+            ))
+            results[concurrency] = run_journeys(
+                base_url,
+                usernames,
+                options['password'],
+                concurrency,
+                options['duration'],
+                seed=options['seed'],
+            )
+        return results
+
+    def write_results(self, results):
+        row = '{:>5} {:<20} {:>8} {:>8} {:>9} {:>9} {:>9} {:>7}'
+        self.stdout.write(row.format(
+            'users', 'step', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors',
+        ))
+        for concurrency, report in results.items():
+            for step, result in report.items():
+                self.stdout.write(row.format(
+                    concurrency,
+                    step,
+                    result['requests'],
+                    result['per_second'],
+                    result['p50_ms'],
+                    result['p95_ms'],
+                    result['p99_ms'],
+                    '{:.1%}'.format(result['error_rate']),
+                ))
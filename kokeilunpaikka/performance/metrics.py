@@ -0,0 +1,149 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'),
+        )
+        for name, value in zip(names, values)
+    ))
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = defaultdict(float)
+
+    def inc(self, label_values, amount=1):
+        self.values[label_values] += amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield self.name, format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # Observations per bucket, the last one being +Inf, followed by the
+        # sum of the observed values.
+        self.values = defaultdict(lambda: [0] * (len(self.buckets) + 2))
+
+    def observe(self, label_values, value):
+        values = self.values[label_values]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def samples(self):
+        label_names = self.labels + ('le',)
+        for label_values, values in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                yield (
+                    self.name + '_bucket',
+                    format_labels(label_names, label_values + (format_value(bound),)),
+                    cumulative,
+                )
+            labels = format_labels(self.labels, label_values)
+            yield self.name + '_count', labels, cumulative
+            yield self.name + '_sum', labels, values[-1]
+
+
+class Registry:
+    """Metrics of the current process.
+
+    The metrics are kept in memory and updated under a single lock, so
+    recording a request costs a few dictionary operations. Every process
+    exposes its own metrics, so every worker has to be scraped separately.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+                lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+                for name, labels, value in metric.samples():
+                    lines.append('{}{} {}'.format(name, labels, format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+
+registry = Registry()
+
+REQUEST_LABELS = ('view', 'action', 'method')
+
+requests_total = registry.register(Counter(
+    'kokeilunpaikka_http_requests_total',
+    'Number of handled requests.',
+    labels=REQUEST_LABELS + ('status',),
+))
+request_duration = registry.register(Histogram(
+    'kokeilunpaikka_http_request_duration_seconds',
+    'Time spent handling a request.',
+    LATENCY_BUCKETS,
+    labels=REQUEST_LABELS,
+))
+request_queries = registry.register(Histogram(
+    'kokeilunpaikka_http_request_db_queries',
+    'Number of database queries executed while handling a request.',
+    QUERY_COUNT_BUCKETS,
+    labels=REQUEST_LABELS,
+))
+request_query_duration = registry.register(Histogram(
+    'kokeilunpaikka_http_request_db_duration_seconds',
+    'Time spent in database queries while handling a request.',
+    LATENCY_BUCKETS,
+    labels=REQUEST_LABELS,
+))
+
+
+def record_request(labels, status_code, duration, query_count, query_duration):
+    with registry.lock:
+        requests_total.inc(labels + (str(status_code),))
+        request_duration.observe(labels, duration)
+        request_queries.observe(labels, query_count)
+        request_query_duration.observe(labels, query_duration)
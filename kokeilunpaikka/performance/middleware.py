@@ -0,0 +1,151 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject, empty
+
+from .db import QueryRecorder, record_queries
+from .inspection import QueryBudgetExceeded, get_query_budget, inspect_queries
+from .metrics import record_request
+from .profiling import (
+    get_staff_user,
+    is_profiling_requested,
+    profile_request,
+    profiling_lock
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_labels(request):
+    """Return the name of the resolved view, the viewset action and the
+    method of the request as metric labels.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return ('unresolved', '', request.method)
+    actions = getattr(resolver_match.func, 'actions', None) or {}
+    return (
+        resolver_match.view_name,
+        actions.get(request.method.lower(), ''),
+        request.method,
+    )
+
+
+def is_authenticated_staff(request):
+    """Return whether the request was made by a staff user.
+
+    A user the view has not needed is not loaded just for this check.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return False
+    return bool(user and user.is_staff)
+
+
+class MetricsMiddleware:
+    """Record the latency and the database queries of every request.
+
+    Responses to staff users include a `Server-Timing` header with the same
+    measurements. Should be the first middleware, so the measured time
+    covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with record_queries(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        record_request(
+            get_view_labels(request),
+            response.status_code,
+            duration,
+            recorder.count,
+            recorder.duration,
+        )
+        if is_authenticated_staff(request):
+            response['Server-Timing'] = (
+                'db;desc="{} queries";dur={:.1f}, total;dur={:.1f}'.format(
+                    recorder.count,
+                    recorder.duration * 1000,
+                    duration * 1000,
+                )
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile the requests of staff users sending the `X-Profile` header or
+    the `profile` query parameter.
+
+    The profile is stored as a `RequestProfile`, whose admin page is linked
+    in the `X-Profile-Url` header of the response. Other requests are only
+    checked for the header and the parameter.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_requested(request):
+            return self.get_response(request)
+        user = get_staff_user(request)
+        if user is None or not profiling_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            response, profile = profile_request(self.get_response, request, user)
+        finally:
+            profiling_lock.release()
+        response['X-Profile-Url'] = request.build_absolute_uri(reverse(
+            'admin:performance_requestprofile_change',
+            args=(profile.pk,),
+        ))
+        return response
+
+
+class QueryInspectionMiddleware:
+    """Report queries repeated per row and requests exceeding the query
+    budget of their view.
+
+    Enabled by the `QUERY_INSPECTION` setting. With 'warn' the findings are
+    logged, naming the serializer field causing repeated queries. With
+    'raise', set by the test runner, exceeding a budget fails the request and
+    thus the test making it. Not used in production.
+    """
+
+    def __init__(self, get_response):
+        if settings.QUERY_INSPECTION not in ('raise', 'warn'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries() as inspector:
+            response = self.get_response(request)
+
+        budget, name = get_query_budget(request)
+        if budget is not None and inspector.count > budget:
+            message = '{} executed {} queries, exceeding its budget of {}.'.format(
+                name,
+                inspector.count,
+                budget,
+            )
+            if settings.QUERY_INSPECTION == 'raise':
+                raise QueryBudgetExceeded('\n'.join(
+                    [message] + [str(group) for group in inspector.groups.values()]
+                ))
+            logger.warning(message)
+
+        if settings.QUERY_INSPECTION == 'warn':
+            for group in inspector.get_repeated_queries():
+                logger.warning('Repeated query in %s: %s', request.path, group)
+        return response
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.22 on 2026-10-19 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allocations', models.TextField(blank=True, help_text='Source lines allocating the most memory.', verbose_name='allocations')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('duration', models.FloatField(help_text='In seconds, including the profiling overhead.', verbose_name='duration')),
+                ('method', models.CharField(max_length=10, verbose_name='method')),
+                ('path', models.TextField(verbose_name='path')),
+                ('peak_memory', models.PositiveBigIntegerField(help_text='Peak size of the traced memory blocks in bytes.', verbose_name='peak memory')),
+                ('query_count', models.PositiveIntegerField(verbose_name='query count')),
+                ('query_duration', models.FloatField(help_text='In seconds.', verbose_name='query duration')),
+                ('sql_timeline', models.JSONField(default=list, verbose_name='SQL timeline')),
+                ('stats', models.BinaryField(help_text='Profiler statistics in the format of pstats.', verbose_name='stats')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='status code')),
+                ('summary', models.TextField(blank=True, help_text='Functions with the highest cumulative time.', verbose_name='summary')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='view name')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'request profile',
+                'verbose_name_plural': 'request profiles',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
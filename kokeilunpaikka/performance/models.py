@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RequestProfile(models.Model):
+    """Profile of a single request made by a staff user, see
+    `ProfilingMiddleware`.
+    """
+    allocations = models.TextField(
+        blank=True,
+        help_text=_('Source lines allocating the most memory.'),
+        verbose_name=_('allocations'),
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('created at'),
+    )
+    duration = models.FloatField(
+        help_text=_('In seconds, including the profiling overhead.'),
+        verbose_name=_('duration'),
+    )
+    method = models.CharField(
+        max_length=10,
+        verbose_name=_('method'),
+    )
+    path = models.TextField(
+        verbose_name=_('path'),
+    )
+    peak_memory = models.PositiveBigIntegerField(
+        help_text=_('Peak size of the traced memory blocks in bytes.'),
+        verbose_name=_('peak memory'),
+    )
+    query_count = models.PositiveIntegerField(
+        verbose_name=_('query count'),
+    )
+    query_duration = models.FloatField(
+        help_text=_('In seconds.'),
+        verbose_name=_('query duration'),
+    )
+    sql_timeline = models.JSONField(
+        default=list,
+        verbose_name=_('SQL timeline'),
+    )
+    stats = models.BinaryField(
+        help_text=_('Profiler statistics in the format of pstats.'),
+        verbose_name=_('stats'),
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name=_('status code'),
+    )
+    summary = models.TextField(
+        blank=True,
+        help_text=_('Functions with the highest cumulative time.'),
+        verbose_name=_('summary'),
+    )
+    user = models.ForeignKey(
+        null=True,
+        on_delete=models.SET_NULL,
+        to=settings.AUTH_USER_MODEL,
+        verbose_name=_('user'),
+    )
+    view_name = models.CharField(
+        blank=True,
+        max_length=200,
+        verbose_name=_('view name'),
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = _('request profile')
+        verbose_name_plural = _('request profiles')
+
+    def __str__(self):
+        return '{} {}'.format(self.method, self.path)
@@ -0,0 +1,20 @@
+import hmac
+
+from django.conf import settings
+
+from rest_framework.permissions import BasePermission
+
+
+class HasMetricsToken(BasePermission):
+    """Permission for metrics scrapers sending the `METRICS_TOKEN` setting as
+    a bearer token.
+    """
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if not token:
+            return False
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''),
+            'Bearer {}'.format(token),
+        )
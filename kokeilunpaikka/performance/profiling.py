@@ -0,0 +1,150 @@
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .db import record_queries
+from .inspection import get_call_site
+from .models import RequestProfile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAMETER = 'profile'
+
+# Number of the most recent profiles kept.
+PROFILE_RETENTION = 100
+
+ALLOCATION_COUNT = 50
+FUNCTION_COUNT = 50
+
+ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+# Memory allocations are traced for the whole process, so only one request
+# is profiled at a time.
+profiling_lock = threading.Lock()
+
+
+def is_profiling_requested(request):
+    return PROFILE_HEADER in request.META or PROFILE_PARAMETER in request.GET
+
+
+def get_staff_user(request):
+    """Return the staff user authenticated by the request or None.
+
+    Views authenticate their requests only after the middleware, so the
+    credentials are checked here with the authentication classes of the API.
+    """
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except APIException:
+            return None
+        if result is not None:
+            user = result[0]
+            return user if user.is_staff else None
+    return None
+
+
+class SQLTimeline:
+    """Database execute wrapper recording when each query started, how long
+    it took and where it was executed from.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        call_site, serializer_field = get_call_site(sys._getframe(1))
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.duration += duration
+            self.queries.append({
+                'call_site': call_site,
+                'duration_ms': round(duration * 1000, 3),
+                'serializer_field': serializer_field,
+                'sql': sql,
+                'start_ms': round((start - self.start) * 1000, 3),
+            })
+
+
+def format_function_stats(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(FUNCTION_COUNT)
+    return stats, stream.getvalue()
+
+
+def format_allocations(snapshot):
+    statistics = snapshot.filter_traces(ALLOCATION_FILTERS).statistics('lineno')
+    return '\n'.join(str(statistic) for statistic in statistics[:ALLOCATION_COUNT])
+
+
+def profile_request(get_response, request, user):
+    """Handle the request under cProfile and tracemalloc and store the
+    results as a `RequestProfile`.
+
+    Returns the response and the profile.
+    """
+    start = time.perf_counter()
+    timeline = SQLTimeline(start)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        with record_queries(timeline):
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats, summary = format_function_stats(profiler)
+    resolver_match = getattr(request, 'resolver_match', None)
+    profile = RequestProfile.objects.create(
+        allocations=format_allocations(snapshot),
+        duration=duration,
+        method=request.method,
+        path=request.get_full_path(),
+        peak_memory=peak_memory,
+        query_count=len(timeline.queries),
+        query_duration=timeline.duration,
+        sql_timeline=timeline.queries,
+        stats=marshal.dumps(stats.stats),
+        status_code=response.status_code,
+        summary=summary,
+        user=user,
+        view_name=resolver_match.view_name if resolver_match else '',
+    )
+    delete_old_profiles()
+    return response, profile
+
+
+def delete_old_profiles():
+    expired_ids = (
+        RequestProfile.objects
+        .order_by('-id')
+        .values_list('id', flat=True)[PROFILE_RETENTION:PROFILE_RETENTION + 1]
+    )
+    if expired_ids:
+        RequestProfile.objects.filter(id__lte=expired_ids[0]).delete()
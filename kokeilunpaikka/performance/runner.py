@@ -0,0 +1,18 @@
+from django.test.utils import override_settings
+
+from django_nose import NoseTestSuiteRunner
+
+
+class QueryInspectingTestRunner(NoseTestSuiteRunner):
+    """Test runner failing the tests whose requests exceed the query budgets
+    of the views.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_inspection = override_settings(QUERY_INSPECTION='raise')
+        self.query_inspection.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_inspection.disable()
+        super().teardown_test_environment(**kwargs)
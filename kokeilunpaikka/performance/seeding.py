@@ -0,0 +1,581 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..experiments.models import (
+    Experiment,
+    ExperimentChallenge,
+    ExperimentChallengeMembership,
+    ExperimentChallengeTimelineEntry,
+    ExperimentExternalLink,
+    ExperimentLookingForOption,
+    ExperimentPost,
+    ExperimentPostComment
+)
+from ..library.models import LibraryItem
+from ..sitemap.models import SiteConfiguration
+from ..stages.models import Question, QuestionAnswer, Stage
+from ..themes.models import Theme
+from ..users.models import (
+    UserDirectoryEntry,
+    UserLookingForOption,
+    UserProfile,
+    UserStatusOption
+)
+from .db import copy_rows
+
+# Default number of rows generated per kind of content.
+DEFAULT_VOLUMES = {
+    'answers': 1000,
+    'challenges': 10,
+    'comments': 2000,
+    'experiments': 500,
+    'library_items': 10,
+    'posts': 1000,
+    'themes': 20,
+    'users': 500,
+}
+
+# Password of every generated user.
+PASSWORD = 'kokeilunpaikka'
+
+LOOKING_FOR_OPTION_COUNT = 8
+QUESTIONS_PER_STAGE = 3
+STAGE_COUNT = 3
+STATUS_OPTION_COUNT = 5
+TEXT_POOL_SIZE = 1000
+TIMELINE_ENTRIES_PER_CHALLENGE = 3
+
+FIRST_NAMES = (
+    'Aino', 'Eero', 'Helmi', 'Ilmari', 'Kaisa', 'Lauri', 'Maria', 'Mikko',
+    'Noora', 'Olli', 'Pia', 'Sami', 'Tiina', 'Ville', 'Elsa', 'Juho',
+)
+LAST_NAMES = (
+    'Korhonen', 'Virtanen', 'Mäkinen', 'Nieminen', 'Mäkelä', 'Hämäläinen',
+    'Laine', 'Heikkinen', 'Koskinen', 'Järvinen', 'Lehtonen', 'Saarinen',
+)
+WORDS = (
+    'avoin', 'data', 'energia', 'kaupunki', 'kestävä', 'kokeilu', 'kulttuuri',
+    'liikenne', 'luonto', 'nuoret', 'oppiminen', 'palvelu', 'ruoka', 'terveys',
+    'digitaalinen', 'yhteisö', 'asuminen', 'kierrätys', 'hyvinvointi', 'työ',
+)
+
+
+def add_volume_arguments(parser):
+    for name, count in DEFAULT_VOLUMES.items():
+        parser.add_argument(
+            '--{}'.format(name.replace('_', '-')),
+            default=count,
+            dest=name,
+            help='Number of {} to generate, {} by default.'.format(
+                name.replace('_', ' '),
+                count,
+            ),
+            type=int,
+        )
+    parser.add_argument(
+        '--seed',
+        default=0,
+        help='Random seed of the generated content.',
+        type=int,
+    )
+
+
+def get_volumes(options):
+    return {name: options[name] for name in DEFAULT_VOLUMES}
+
+
+class Seeder:
+    """Generate content of the given volumes for every model of the site.
+
+    The rows, their translations in every language and their many-to-many
+    relations are loaded with COPY, so that databases of hundreds of
+    thousands of users and millions of comments can be generated in minutes.
+    The primary keys are assigned here and the sequences are reset
+    afterwards. The same seed generates the same content into an empty
+    database.
+
+    No signals are sent, so the user directory is built with a single
+    statement and everything cached is cleared at the end. Images are not
+    generated, as their thumbnails would need real files. Feed scores are
+    not generated either, as they pair every user with every experiment
+    sharing a theme with them.
+    """
+
+    def __init__(self, volumes, seed=0):
+        self.volumes = dict(DEFAULT_VOLUMES, **volumes)
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+        self.texts = [self.words(12).capitalize() + '.' for i in range(TEXT_POOL_SIZE)]
+        self.models = []
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for i in range(count))
+
+    def text(self, sentences):
+        return ' '.join(self.random.choice(self.texts) for i in range(sentences))
+
+    def html(self, sentences):
+        return '<p>{}</p>'.format(self.text(sentences))
+
+    def sample(self, population, min_count, max_count):
+        return self.random.sample(
+            population,
+            min(len(population), self.random.randint(min_count, max_count)),
+        )
+
+    def timestamp(self, max_days=365):
+        return self.now - timedelta(seconds=self.random.randrange(max_days * 86400))
+
+    def allocate_ids(self, model, count):
+        start = (model._default_manager.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+        self.models.append(model)
+        return range(start, start + count)
+
+    def copy(self, model, field_names, rows):
+        copy_rows(model, field_names, rows)
+
+    def copy_timestamped(self, model, ids, field_names, get_values):
+        """Copy rows of a timestamped model, one for each id with the values
+        of the given fields returned by the function.
+        """
+        def rows():
+            for pk in ids:
+                created_at = self.timestamp()
+                yield (pk, created_at, created_at) + tuple(get_values(pk))
+        self.copy(model, ('id', 'created_at', 'updated_at') + tuple(field_names), rows())
+
+    def translate(self, model, ids, field_names, get_values):
+        """Copy the translations of the given rows of a translatable model in
+        every language.
+        """
+        self.copy(
+            model._parler_meta.root_model,
+            ('master_id', 'language_code') + tuple(field_names),
+            (
+                (pk, language_code) + tuple(get_values(pk, language_code))
+                for pk in ids
+                for language_code, name in settings.LANGUAGES
+            ),
+        )
+
+    def link(self, field, pairs):
+        """Copy the pairs of source and target ids of a many-to-many
+        relation.
+        """
+        through = field.remote_field.through
+        self.copy(
+            through,
+            (field.m2m_column_name(), field.m2m_reverse_name()),
+            pairs,
+        )
+
+    def seed(self):
+        with transaction.atomic():
+            self.seed_stages()
+            self.seed_options()
+            self.seed_themes()
+            self.seed_users()
+            self.seed_challenges()
+            self.seed_experiments()
+            self.seed_questions()
+            self.seed_posts()
+            self.seed_library_items()
+            self.seed_site_configuration()
+            self.build_user_directory()
+            self.reset_sequences()
+        # Rebuild everything cached or held in memory.
+        cache.clear()
+
+    def seed_stages(self):
+        self.stage_ids = list(Stage.objects.values_list('pk', flat=True))
+        if self.stage_ids:
+            return
+        self.stage_ids = list(range(1, STAGE_COUNT + 1))
+        self.copy(Stage, ('stage_number', 'created_at', 'updated_at'), (
+            (number, self.now, self.now) for number in self.stage_ids
+        ))
+        self.translate(Stage, self.stage_ids, ('description', 'name'), (
+            lambda pk, language_code: (self.text(2), 'Vaihe {}'.format(pk))
+        ))
+
+    def seed_options(self):
+        self.status_option_ids = self.allocate_ids(UserStatusOption, STATUS_OPTION_COUNT)
+        self.copy_timestamped(UserStatusOption, self.status_option_ids, (), lambda pk: ())
+        self.translate(UserStatusOption, self.status_option_ids, ('value',), (
+            lambda pk, language_code: (self.words(2),)
+        ))
+
+        self.user_option_ids = self.allocate_ids(UserLookingForOption, LOOKING_FOR_OPTION_COUNT)
+        self.copy_timestamped(UserLookingForOption, self.user_option_ids, (), lambda pk: ())
+        self.translate(UserLookingForOption, self.user_option_ids, (
+            'offering_value',
+            'value',
+        ), lambda pk, language_code: (self.words(2), self.words(2)))
+
+        self.experiment_option_ids = self.allocate_ids(
+            ExperimentLookingForOption,
+            LOOKING_FOR_OPTION_COUNT,
+        )
+        self.copy_timestamped(
+            ExperimentLookingForOption,
+            self.experiment_option_ids,
+            (),
+            lambda pk: (),
+        )
+        self.translate(ExperimentLookingForOption, self.experiment_option_ids, ('value',), (
+            lambda pk, language_code: (self.words(2),)
+        ))
+
+    def seed_themes(self):
+        self.theme_ids = self.allocate_ids(Theme, self.volumes['themes'])
+        self.copy_timestamped(Theme, self.theme_ids, ('created_by_id', 'is_curated'), (
+            lambda pk: (None, True)
+        ))
+        self.translate(Theme, self.theme_ids, ('name',), (
+            lambda pk, language_code: ('Teema {}'.format(pk),)
+        ))
+
+    def seed_users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        self.user_ids = self.allocate_ids(User, self.volumes['users'])
+
+        def user_rows():
+            for pk in self.user_ids:
+                email = 'user{}@example.com'.format(pk)
+                yield (
+                    pk,
+                    password,
+                    self.random.choice(FIRST_NAMES),
+                    self.random.choice(LAST_NAMES),
+                    email,
+                    email,
+                    self.timestamp(max_days=3 * 365),
+                    True,
+                    False,
+                    False,
+                )
+        self.copy(User, (
+            'id',
+            'password',
+            'first_name',
+            'last_name',
+            'email',
+            'username',
+            'date_joined',
+            'is_active',
+            'is_staff',
+            'is_superuser',
+        ), user_rows())
+
+        # Every user has a profile with the same id offset as the user.
+        self.profile_ids = self.allocate_ids(UserProfile, len(self.user_ids))
+        offset = self.profile_ids.start - self.user_ids.start
+        self.copy_timestamped(UserProfile, self.profile_ids, (
+            'description',
+            'expose_email_address',
+            'facebook_url',
+            'instagram_url',
+            'language',
+            'linkedin_url',
+            'send_experiment_notification',
+            'status_id',
+            'twitter_url',
+            'user_id',
+        ), lambda pk: (
+            self.text(3),
+            self.random.random() < 0.2,
+            '',
+            '',
+            settings.LANGUAGE_CODE,
+            '',
+            self.random.random() < 0.5,
+            self.random.choice(self.status_option_ids),
+            '',
+            pk - offset,
+        ))
+        self.link(UserProfile.interested_in_themes.field, (
+            (pk, theme_id)
+            for pk in self.profile_ids
+            for theme_id in self.sample(self.theme_ids, 0, 3)
+        ))
+        self.link(UserProfile.looking_for.field, (
+            (pk, option_id)
+            for pk in self.profile_ids
+            for option_id in self.sample(self.user_option_ids, 0, 2)
+        ))
+        self.link(UserProfile.offering.field, (
+            (pk, option_id)
+            for pk in self.profile_ids
+            for option_id in self.sample(self.user_option_ids, 0, 2)
+        ))
+
+    def seed_challenges(self):
+        self.challenge_ids = self.allocate_ids(ExperimentChallenge, self.volumes['challenges'])
+
+        def get_values(pk):
+            starts_at = self.timestamp()
+            return (
+                starts_at + timedelta(days=self.random.randint(30, 365)),
+                'experiment_challenges/challenge.jpg',
+                True,
+                starts_at,
+            )
+        self.copy_timestamped(ExperimentChallenge, self.challenge_ids, (
+            'ends_at',
+            'image',
+            'is_visible',
+            'starts_at',
+        ), get_values)
+        self.translate(ExperimentChallenge, self.challenge_ids, (
+            'description',
+            'lead_text',
+            'name',
+            'slug',
+        ), lambda pk, language_code: (
+            self.html(10),
+            self.text(2),
+            'Kokeiluhaku {}'.format(pk),
+            'kokeiluhaku-{}-{}'.format(pk, language_code),
+        ))
+        self.link(ExperimentChallenge.themes.field, (
+            (pk, theme_id)
+            for pk in self.challenge_ids
+            for theme_id in self.sample(self.theme_ids, 1, 3)
+        ))
+
+        entry_ids = self.allocate_ids(
+            ExperimentChallengeTimelineEntry,
+            len(self.challenge_ids) * TIMELINE_ENTRIES_PER_CHALLENGE,
+        )
+        self.copy_timestamped(ExperimentChallengeTimelineEntry, entry_ids, (
+            'date',
+            'experiment_challenge_id',
+        ), lambda pk: (
+            self.timestamp().date(),
+            self.challenge_ids[(pk - entry_ids.start) // TIMELINE_ENTRIES_PER_CHALLENGE],
+        ))
+        self.translate(ExperimentChallengeTimelineEntry, entry_ids, ('content',), (
+            lambda pk, language_code: (self.text(1),)
+        ))
+
+    def seed_experiments(self):
+        self.experiment_ids = self.allocate_ids(Experiment, self.volumes['experiments'])
+        creators = {}
+
+        def get_values(pk):
+            is_published = self.random.random() < 0.9
+            creators[pk] = self.random.choice(self.user_ids)
+            return (
+                creators[pk],
+                self.text(8),
+                is_published,
+                settings.LANGUAGE_CODE,
+                'Kokeilu {}'.format(pk),
+                self.words(2),
+                self.timestamp() if is_published else None,
+                'kokeilu-{}'.format(pk),
+                self.random.choice(self.stage_ids),
+                self.random.choice((None, self.random.randint(1, 10))),
+                self.random.randrange(1000),
+            )
+        self.copy_timestamped(Experiment, self.experiment_ids, (
+            'created_by_id',
+            'description',
+            'is_published',
+            'language',
+            'name',
+            'organizer',
+            'published_at',
+            'slug',
+            'stage_id',
+            'success_rating',
+            'views',
+        ), get_values)
+        self.link(Experiment.responsible_users.field, (
+            (pk, user_id)
+            for pk in self.experiment_ids
+            for user_id in {creators.pop(pk), self.random.choice(self.user_ids)}
+        ))
+        self.link(Experiment.themes.field, (
+            (pk, theme_id)
+            for pk in self.experiment_ids
+            for theme_id in self.sample(self.theme_ids, 1, 3)
+        ))
+        self.link(Experiment.looking_for.field, (
+            (pk, option_id)
+            for pk in self.experiment_ids
+            for option_id in self.sample(self.experiment_option_ids, 0, 2)
+        ))
+
+        if self.challenge_ids:
+            member_ids = self.experiment_ids[::5]
+            membership_ids = self.allocate_ids(ExperimentChallengeMembership, len(member_ids))
+            self.copy_timestamped(ExperimentChallengeMembership, membership_ids, (
+                'experiment_challenge_id',
+                'experiment_id',
+                'is_approved',
+            ), lambda pk: (
+                self.random.choice(self.challenge_ids),
+                member_ids[pk - membership_ids.start],
+                self.random.random() < 0.8,
+            ))
+
+        linked_ids = self.experiment_ids[::3]
+        link_ids = self.allocate_ids(ExperimentExternalLink, len(linked_ids))
+        self.copy_timestamped(ExperimentExternalLink, link_ids, ('experiment_id', 'url'), (
+            lambda pk: (
+                linked_ids[pk - link_ids.start],
+                'https://example.com/{}'.format(pk),
+            )
+        ))
+
+    def seed_questions(self):
+        question_ids = self.allocate_ids(Question, len(self.stage_ids) * QUESTIONS_PER_STAGE)
+        self.copy_timestamped(Question, question_ids, (
+            'experiment_challenge_id',
+            'is_public',
+            'stage_id',
+        ), lambda pk: (
+            None,
+            self.random.random() < 0.8,
+            self.stage_ids[(pk - question_ids.start) // QUESTIONS_PER_STAGE],
+        ))
+        self.translate(Question, question_ids, ('description', 'question'), (
+            lambda pk, language_code: (self.text(1), self.words(5) + '?')
+        ))
+        if self.challenge_ids:
+            self.link(Question.ignore_in_experiment_challenge.field, (
+                (question_ids[0], challenge_id)
+                for challenge_id in self.challenge_ids[::2]
+            ))
+
+        # Every experiment answers the questions in the same order, so the
+        # answers are spread evenly.
+        experiment_count = len(self.experiment_ids)
+        answer_ids = self.allocate_ids(QuestionAnswer, min(
+            self.volumes['answers'],
+            experiment_count * len(question_ids),
+        ))
+        self.copy_timestamped(QuestionAnswer, answer_ids, (
+            'answered_by_id',
+            'experiment_id',
+            'question_id',
+            'value',
+        ), lambda pk: (
+            self.random.choice(self.user_ids),
+            self.experiment_ids[(pk - answer_ids.start) % experiment_count],
+            question_ids[(pk - answer_ids.start) // experiment_count],
+            self.text(3),
+        ))
+
+    def seed_posts(self):
+        post_ids = self.allocate_ids(
+            ExperimentPost,
+            self.volumes['posts'] if self.experiment_ids else 0,
+        )
+        self.copy_timestamped(ExperimentPost, post_ids, (
+            'content',
+            'created_by_id',
+            'experiment_id',
+            'title',
+        ), lambda pk: (
+            self.html(5),
+            self.random.choice(self.user_ids),
+            self.random.choice(self.experiment_ids),
+            self.words(4).capitalize(),
+        ))
+        comment_ids = self.allocate_ids(
+            ExperimentPostComment,
+            self.volumes['comments'] if post_ids else 0,
+        )
+        self.copy_timestamped(ExperimentPostComment, comment_ids, (
+            'content',
+            'created_by_id',
+            'experiment_post_id',
+        ), lambda pk: (
+            self.text(2),
+            self.random.choice(self.user_ids),
+            self.random.choice(post_ids),
+        ))
+
+    def seed_library_items(self):
+        item_ids = self.allocate_ids(LibraryItem, self.volumes['library_items'])
+        self.copy_timestamped(LibraryItem, item_ids, (
+            'image',
+            'is_visible',
+            'lead_text',
+        ), lambda pk: ('library_items/item.jpg', True, self.text(2)))
+        self.translate(LibraryItem, item_ids, ('description', 'name', 'slug'), (
+            lambda pk, language_code: (
+                self.html(10),
+                'Kirjaston sisältö {}'.format(pk),
+                'kirjaston-sisalto-{}-{}'.format(pk, language_code),
+            )
+        ))
+        self.link(LibraryItem.themes.field, (
+            (pk, theme_id)
+            for pk in item_ids
+            for theme_id in self.sample(self.theme_ids, 1, 3)
+        ))
+
+    def seed_site_configuration(self):
+        if SiteConfiguration.objects.filter(active=True).exists():
+            return
+        configuration = SiteConfiguration.objects.create(
+            active=True,
+            front_page_image='front_page.jpg',
+        )
+        self.link(SiteConfiguration.featured_experiments.field, (
+            (configuration.pk, experiment_id)
+            for experiment_id in self.experiment_ids[:3]
+        ))
+
+    def build_user_directory(self):
+        """Build the directory entries of the generated users, like
+        `users.directory.build_directory_entries` would, with a single
+        statement.
+        """
+        quote_name = connection.ops.quote_name
+        user_model = get_user_model()
+
+        def related_ids(field):
+            return 'ARRAY(SELECT {target} FROM {table} WHERE {source} = p.id ORDER BY 1)'.format(
+                source=quote_name(field.m2m_column_name()),
+                table=quote_name(field.m2m_db_table()),
+                target=quote_name(field.m2m_reverse_name()),
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {directory} (user_id, date_joined, first_name, last_name, '
+                'full_name, image_id, avatar_thumbnail, image_thumbnail, looking_for_ids, '
+                'offering_ids, theme_ids, version) '
+                "SELECT u.id, u.date_joined, u.first_name, u.last_name, "
+                "TRIM(u.first_name || ' ' || u.last_name), p.image_id, '', '', "
+                '{looking_for_ids}, {offering_ids}, {theme_ids}, 1 '
+                'FROM {profile} p JOIN {user} u ON u.id = p.user_id '
+                'WHERE u.is_active AND u.id BETWEEN %s AND %s'.format(
+                    directory=quote_name(UserDirectoryEntry._meta.db_table),
+                    looking_for_ids=related_ids(UserProfile.looking_for.field),
+                    offering_ids=related_ids(UserProfile.offering.field),
+                    profile=quote_name(UserProfile._meta.db_table),
+                    theme_ids=related_ids(UserProfile.interested_in_themes.field),
+                    user=quote_name(user_model._meta.db_table),
+                ),
+                (self.user_ids.start, self.user_ids.stop - 1),
+            )
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), self.models):
+                cursor.execute(sql)
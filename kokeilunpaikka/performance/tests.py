@@ -0,0 +1,401 @@
+import marshal
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    LiveServerTestCase,
+    RequestFactory,
+    TestCase,
+    override_settings
+)
+from django.urls import reverse
+
+from rest_framework import serializers, status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..experiments.models import Experiment, ExperimentChallenge
+from ..experiments.views import ExperimentViewSet
+from ..stages.models import Stage
+from ..users.models import UserDirectoryEntry
+from .batches import BATCH_JOBS, get_growth, get_volumes, get_warnings, measure
+from .benchmarks import compare, percentile, run_benchmarks
+from .db import format_copy_value
+from .inspection import QueryBudgetExceeded, inspect_queries, normalize_sql
+from .loadtest import Results, run_journeys
+from .metrics import Histogram, registry
+from .middleware import MetricsMiddleware
+from .models import RequestProfile
+from .seeding import PASSWORD, Seeder
+
+
+class HistogramTestCase(TestCase):
+
+    def test_samples_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', (0.1, 1), labels=('view',))
+        histogram.observe(('list',), 0.05)
+        histogram.observe(('list',), 0.1)
+        histogram.observe(('list',), 2)
+        self.assertEqual(list(histogram.samples()), [
+            ('test_seconds_bucket', '{view="list",le="0.1"}', 2),
+            ('test_seconds_bucket', '{view="list",le="1"}', 2),
+            ('test_seconds_bucket', '{view="list",le="+Inf"}', 3),
+            ('test_seconds_count', '{view="list"}', 3),
+            ('test_seconds_sum', '{view="list"}', 2.15),
+        ])
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsAPITestCase(APITestCase):
+
+    def setUp(self):
+        registry.clear()
+        Stage.objects.create(stage_number=1)
+        self.staff_user = get_user_model().objects.create(
+            is_staff=True,
+            username='staff',
+        )
+        self.url = reverse('metrics')
+
+    def test_requests_are_recorded_per_view_and_action(self):
+        self.client.get(reverse('experiment-list'))
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn(
+            'kokeilunpaikka_http_requests_total'
+            '{view="experiment-list",action="list",method="GET",status="200"} 1',
+            content
+        )
+        self.assertIn(
+            'kokeilunpaikka_http_request_db_queries_count'
+            '{view="experiment-list",action="list",method="GET"} 1',
+            content
+        )
+
+    def test_metrics_denied_for_non_staff(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=get_user_model().objects.create())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_allowed_with_token(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_server_timing_header_for_staff_only(self):
+        response = self.client.get(reverse('experiment-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('experiment-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;desc="\d+ queries";dur=')
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsMiddlewareTestCase(TestCase):
+
+    def test_overhead_is_negligible(self):
+        request = RequestFactory().get('/')
+
+        def get_response(request):
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(get_response)
+        rounds = 1000
+        start = time.perf_counter()
+        for i in range(rounds):
+            middleware(request)
+        overhead = (time.perf_counter() - start) / rounds
+        # Typically some tens of microseconds.
+        self.assertLess(overhead, 0.001)
+
+
+class ExperimentPostCountSerializer(serializers.ModelSerializer):
+    post_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Experiment
+        fields = ('id', 'post_count')
+
+    def get_post_count(self, obj):
+        return obj.posts.count()
+
+
+class QueryInspectionTestCase(TestCase):
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT * FROM t WHERE a = %s AND b IN (%s, %s) AND c = 'x' LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? LIMIT ?'
+        )
+
+    def test_repeated_queries_name_serializer_field(self):
+        Stage.objects.create(stage_number=1)
+        for i in range(3):
+            Experiment.objects.create(name='Experiment {}'.format(i))
+        experiments = list(Experiment.objects.all())
+        with inspect_queries() as inspector:
+            ExperimentPostCountSerializer(experiments, many=True).data
+        self.assertEqual(inspector.count, 3)
+        groups = inspector.get_repeated_queries()
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0].count, 3)
+        self.assertEqual(
+            groups[0].serializer_field,
+            'ExperimentPostCountSerializer.post_count'
+        )
+        self.assertIn('performance/tests.py', groups[0].call_site)
+
+
+@override_settings(QUERY_INSPECTION='raise')
+class QueryBudgetAPITestCase(APITestCase):
+
+    def setUp(self):
+        Stage.objects.create(stage_number=1)
+
+    def test_request_within_budget(self):
+        response = self.client.get(reverse('experiment-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch.object(ExperimentViewSet, 'query_budgets', {'list': 0})
+    def test_request_exceeding_budget_fails(self):
+        with self.assertRaisesRegex(
+            QueryBudgetExceeded,
+            'ExperimentViewSet.list executed 1 queries, exceeding its budget of 0.'
+        ):
+            self.client.get(reverse('experiment-list'))
+
+
+class ProfilingAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        Stage.objects.create(stage_number=1)
+        self.staff_user = get_user_model().objects.create(
+            is_staff=True,
+            is_superuser=True,
+            username='staff',
+        )
+        self.token = Token.objects.create(user=self.staff_user)
+        self.url = reverse('experiment-list')
+
+    def test_flagged_staff_request_is_profiled(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        profile = RequestProfile.objects.get()
+        self.assertTrue(response['X-Profile-Url'].endswith(
+            reverse('admin:performance_requestprofile_change', args=(profile.pk,))
+        ))
+        self.assertEqual(profile.user, self.staff_user)
+        self.assertEqual(profile.view_name, 'experiment-list')
+        self.assertEqual(profile.query_count, len(profile.sql_timeline))
+        self.assertIn('experiments_experiment', profile.sql_timeline[-1]['sql'])
+        self.assertIn('cumulative', profile.summary)
+        self.assertGreater(profile.peak_memory, 0)
+
+        self.client.force_login(self.staff_user)
+        response = self.client.get(reverse(
+            'admin:performance_requestprofile_download',
+            args=(profile.pk, 'stats'),
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any(
+            function == 'list' for filename, line, function in marshal.loads(response.content)
+        ))
+
+    def test_query_parameter_triggers_profiling(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.get(self.url, {'profile': ''})
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_requests_are_not_profiled_without_flag_or_staff_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Profile-Url', response)
+
+        user = get_user_model().objects.create(username='user')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Url', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+class SeederTestCase(TestCase):
+
+    def test_format_copy_value(self):
+        self.assertEqual(format_copy_value('a\tb\nc\\'), 'a\\tb\\nc\\\\')
+        self.assertEqual(format_copy_value(None), '\\N')
+        self.assertEqual(format_copy_value(False), 'f')
+        self.assertEqual(format_copy_value(12), '12')
+        self.assertEqual(format_copy_value([1, 2]), '{1,2}')
+        self.assertEqual(
+            format_copy_value(datetime(2020, 1, 2, 3, 4, tzinfo=timezone.utc)),
+            '2020-01-02T03:04:00+00:00'
+        )
+
+    def test_seeded_content_is_complete(self):
+        Seeder({
+            'challenges': 2,
+            'experiments': 5,
+            'users': 4,
+        }).seed()
+
+        self.assertEqual(
+            ExperimentChallenge.objects.get(pk=1).translations.count(),
+            len(settings.LANGUAGES)
+        )
+        self.assertEqual(Experiment.objects.count(), 5)
+        self.assertTrue(Experiment.themes.through.objects.exists())
+        self.assertEqual(UserDirectoryEntry.objects.count(), 4)
+        user = get_user_model().objects.get(pk=1)
+        self.assertTrue(user.check_password(PASSWORD))
+        self.assertEqual(
+            UserDirectoryEntry.objects.get(user=user).full_name,
+            user.get_full_name()
+        )
+        # The sequences continue after the generated primary keys.
+        self.assertEqual(Experiment.objects.create(name='New').pk, 6)
+
+
+class BenchmarkTestCase(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 21))
+        self.assertEqual(percentile(values, 0.5), 10)
+        self.assertEqual(percentile(values, 0.95), 19)
+        self.assertEqual(percentile([3], 0.95), 3)
+
+    def test_compare_reports_regressions(self):
+        baseline = {
+            'experiment-list': {'p50_ms': 10, 'p95_ms': 20, 'queries': 3, 'peak_memory_kb': 100},
+        }
+        results = {
+            'experiment-list': {'p50_ms': 12, 'p95_ms': 30, 'queries': 4, 'peak_memory_kb': 100},
+            'user-list': {'p50_ms': 1, 'p95_ms': 1, 'queries': 1, 'peak_memory_kb': 1},
+        }
+        self.assertEqual(compare(results, baseline, 0.25), [
+            'experiment-list p95_ms: 30 > 20',
+            'experiment-list queries: 4 > 3',
+        ])
+
+    @override_settings(QUERY_INSPECTION=None)
+    def test_benchmarks_run_against_seeded_content(self):
+        Seeder({
+            'answers': 10,
+            'challenges': 2,
+            'comments': 10,
+            'experiments': 5,
+            'library_items': 2,
+            'posts': 5,
+            'themes': 3,
+            'users': 5,
+        }).seed()
+        self.assertEqual(Experiment.objects.count(), 5)
+        results = run_benchmarks(rounds=2)
+        self.assertEqual(set(results), {
+            'experiment-challenge-detail',
+            'experiment-detail',
+            'experiment-list',
+            'experiment-statistics',
+            'library-item-detail',
+            'user-detail',
+            'user-list',
+        })
+        for result in results.values():
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+
+class BatchBenchmarkTestCase(TestCase):
+
+    def test_growth(self):
+        self.assertEqual(get_growth([100, 200], [1, 2]), 1)
+        self.assertEqual(get_growth([100, 200, 400], [1, 2, 8]), 2)
+        self.assertEqual(get_growth([100, 200], [5, 5]), 0)
+        self.assertIsNone(get_growth([100], [1]))
+        self.assertIsNone(get_growth([100, 200], [0, 3]))
+        self.assertEqual(get_warnings('import', [100, 200], [
+            {'seconds': 1, 'queries': 10, 'peak_memory_mb': 1},
+            {'seconds': 4, 'queries': 20, 'peak_memory_mb': 2},
+        ]), [
+            'import queries grow as size^1.0',
+            'import seconds grow as size^2.0',
+        ])
+
+    @override_settings(QUERY_INSPECTION=None)
+    def test_batch_jobs_run_against_seeded_content(self):
+        Seeder(get_volumes(5)).seed()
+        with tempfile.TemporaryDirectory() as workdir:
+            results = {job.name: measure(job, workdir, 5) for job in BATCH_JOBS}
+        self.assertEqual(set(results), {
+            'challenge-report',
+            'import',
+            'sitemap',
+            'user-report',
+        })
+        for result in results.values():
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['peak_memory_mb'], 0)
+        # The imported experiments were added after the generated ones.
+        self.assertEqual(Experiment.objects.count(), 10)
+
+
+class LoadTestTestCase(LiveServerTestCase):
+
+    def test_report(self):
+        results = Results()
+        for i in range(1, 11):
+            results.record('open experiment', i / 1000, error=i == 10)
+        self.assertEqual(results.report(elapsed=2), {
+            'open experiment': {
+                'requests': 10,
+                'per_second': 5,
+                'p50_ms': 5,
+                'p95_ms': 10,
+                'p99_ms': 10,
+                'error_rate': 0.1,
+            },
+        })
+
+    @override_settings(
+        EMAIL_BACKEND='kokeilunpaikka.performance.loadtest.DelayedEmailBackend',
+        QUERY_INSPECTION=None,
+    )
+    def test_journeys_run_against_live_server(self):
+        Seeder({
+            'answers': 10,
+            'challenges': 1,
+            'comments': 10,
+            'experiments': 5,
+            'posts': 10,
+            'users': 3,
+        }).seed()
+        report = run_journeys(
+            self.live_server_url,
+            ['user1@example.com', 'user2@example.com'],
+            PASSWORD,
+            concurrency=2,
+            duration=2,
+        )
+        self.assertIn('log in', report)
+        self.assertIn('open experiment', report)
+        for result in report.values():
+            self.assertEqual(result['error_rate'], 0)
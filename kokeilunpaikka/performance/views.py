@@ -0,0 +1,21 @@
+from django.http import HttpResponse
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from .metrics import CONTENT_TYPE, registry
+from .permissions import HasMetricsToken
+
+
+class MetricsView(APIView):
+    """Expose the request metrics of the process in the Prometheus text
+    format. Allowed for staff users and for scrapers sending the metrics
+    token.
+    """
+    permission_classes = (
+        IsAdminUser | HasMetricsToken,
+    )
+    schema = None
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
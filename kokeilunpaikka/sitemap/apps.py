@@ -1,5 +1,41 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class SitemapConfig(AppConfig):
     name = 'kokeilunpaikka.sitemap'
+
+    def ready(self):
+        from ..experiments.models import Experiment
+        from ..stages.models import Stage
+        from ..themes.models import Theme
+        from ..uploads.models import Image
+        from . import signals
+        from .models import EditableText, SiteConfiguration
+
+        # Models shown on the front page, directly or as a part of the
+        # statistics.
+        models = (
+            EditableText,
+            EditableText._parler_meta.root_model,
+            Experiment,
+            SiteConfiguration,
+            Stage,
+            Stage._parler_meta.root_model,
+            Theme,
+            Theme._parler_meta.root_model,
+            get_user_model(),
+        )
+        for model in models:
+            post_save.connect(signals.content_changed, sender=model)
+            post_delete.connect(signals.content_changed, sender=model)
+        # Removing an image updates the experiments using it without signals.
+        post_delete.connect(signals.content_changed, sender=Image)
+
+        for through in (
+            Experiment.responsible_users.through,
+            Experiment.themes.through,
+            SiteConfiguration.featured_experiments.through,
+        ):
+            m2m_changed.connect(signals.content_changed, sender=through)
@@ -1,6 +1,12 @@
+import json
 import os
-from django.core.management.base import BaseCommand
+from xml.sax.saxutils import escape
+
 from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import requests
 
 from core.settings.base import BASE_DIR
@@ -8,113 +14,299 @@ from kokeilunpaikka.experiments.models import Experiment, ExperimentChallenge
 from kokeilunpaikka.library.models import LibraryItem
 from kokeilunpaikka.users.models import UserProfile
 
+# Maximum number of URLs allowed in a single sitemap file by the protocol.
+SITEMAP_MAX_URLS = 50000
+
+MANIFEST_FILENAME = 'sitemap-manifest.json'
+
+REACT_URLS = [
+    'kokeilijat',
+    'kokeiluhaut',
+    'ajankohtaista',
+    'kirjasto',
+    'kokeilut',
+]
+
 
 class Command(BaseCommand):
-    help = 'Closes the specified poll for voting'
+    help = (
+        'Creates the sitemap files. With --incremental only the rows changed '
+        'since the previous run are queried and only the affected sitemap '
+        'shards are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Use the manifest of the previous run to rewrite only changed shards.',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=os.path.join(BASE_DIR, 'files'),
+            help='Directory where the sitemap files and the manifest are written.',
+        )
 
     def handle(self, *args, **options):
-        front_base = os.environ.get('BASE_FRONTEND_URL', '')
-        wp_api = os.environ.get('WP_API', '')
-        urls = []
-        react_urls = [
-            'kokeilijat',
-            'kokeiluhaut',
-            'ajankohtaista',
-            'kirjasto',
-            'kokeilut',
-        ]
-
-        for language in settings.LANGUAGES:
-            lang = language[0]
-
-            # Language home page
-            urls.append({
-                'url': '{}/{}'.format(front_base, lang)
-            })
-
-            # Users
-            profiles = UserProfile.objects.all()
-            for profile in profiles:
-                urls.append({
-                    'url': '{}/{}/kokeilija/{}'.format(front_base, lang, profile.user.id)
-                })
-
-            # Experiments
-            experiments = Experiment.objects.all()
-            for experiment in experiments:
-                urls.append({
-                    'url': '{}/{}/kokeilu/{}'.format(front_base, lang, experiment.slug)
-                })
-
-            # Library items
-            library_items = LibraryItem.objects.all()
-            for library_item in library_items:
-                library_item.set_current_language(lang)
-                urls.append({
-                    'url': '{}/{}/kirjasto/{}'.format(front_base, lang, library_item.slug)
-                })
-
-            # Experiment challanges
-            experiment_challenges = ExperimentChallenge.objects.all()
-            for experiment_challenge in experiment_challenges:
-                experiment_challenge.set_current_language(lang)
-                urls.append({
-                    'url': '{}/{}/kokeiluhaku/{}'.format(front_base, lang,
-                                                         experiment_challenge.slug)
-                })
-
-            # React listing views
-            for react_url in react_urls:
-                urls.append({
-                    'url': '{}/{}/{}'.format(front_base, lang, react_url)
-                })
-
-        # Posts from WP
+        self.front_base = os.environ.get('BASE_FRONTEND_URL', '')
+        self.wp_api = os.environ.get('WP_API', '')
+        self.output_dir = options['output_dir']
+        self.languages = [language[0] for language in settings.LANGUAGES]
+
+        started_at = timezone.now()
+        manifest = self.load_manifest() if options['incremental'] else None
+        since = None
+        if manifest is not None:
+            since = parse_datetime(manifest['generated_at'])
+        else:
+            manifest = {'sections': {}}
+
+        sections = manifest['sections']
+        builders = (
+            ('pages', self.build_pages),
+            ('users', self.build_users),
+            ('experiments', self.build_experiments),
+            ('library', self.build_library_items),
+            ('challenges', self.build_experiment_challenges),
+            ('wp', self.build_wp_content),
+        )
+
+        rewritten = []
+        for section, builder in builders:
+            entries = sections.get(section)
+            shards_missing = not os.path.exists(self.shard_path(section, 1))
+            if entries is None or shards_missing:
+                # Nothing to compare against, build the whole section.
+                entries = {}
+                builder(entries, None)
+                changed = True
+            else:
+                changed = builder(entries, since)
+            sections[section] = entries
+            if changed:
+                self.write_section(section, entries)
+                rewritten.append(section)
+
+        self.write_index(sections)
+        manifest['generated_at'] = started_at.isoformat()
+        self.write_manifest(manifest)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Sitemap created, rewritten shards: {}.'.format(
+                ', '.join(rewritten) if rewritten else 'none'
+            )
+        ))
+
+    # Section builders
+    #
+    # Every builder updates the given entries dictionary in place (or builds
+    # a new one when called with `since=None` and empty entries) and returns
+    # whether anything changed. An entry maps a key, usually the primary key
+    # of a row, to the URLs generated for it and the last modification time.
+
+    def build_pages(self, entries, since):
+        new_entries = {}
+        for lang in self.languages:
+            urls = ['{}/{}'.format(self.front_base, lang)]
+            urls += [
+                '{}/{}/{}'.format(self.front_base, lang, react_url)
+                for react_url in REACT_URLS
+            ]
+            new_entries[lang] = {'urls': urls, 'lastmod': None}
+        return self.replace_entries(entries, new_entries)
+
+    def build_users(self, entries, since):
+        queryset = UserProfile.objects.all()
+        return self.update_model_entries(
+            entries,
+            since,
+            queryset,
+            lambda rows: (
+                (row['pk'], row['updated_at'], [
+                    '{}/{}/kokeilija/{}'.format(self.front_base, lang, row['user_id'])
+                    for lang in self.languages
+                ])
+                for row in rows.values('pk', 'updated_at', 'user_id')
+            ),
+        )
+
+    def build_experiments(self, entries, since):
+        queryset = Experiment.objects.all()
+        return self.update_model_entries(
+            entries,
+            since,
+            queryset,
+            lambda rows: (
+                (row['pk'], row['updated_at'], [
+                    '{}/{}/kokeilu/{}'.format(self.front_base, lang, row['slug'])
+                    for lang in self.languages
+                ])
+                for row in rows.values('pk', 'updated_at', 'slug')
+            ),
+        )
+
+    def build_library_items(self, entries, since):
+        return self.update_model_entries(
+            entries,
+            since,
+            LibraryItem.objects.all(),
+            lambda rows: self.translated_rows(rows, 'kirjasto'),
+        )
+
+    def build_experiment_challenges(self, entries, since):
+        return self.update_model_entries(
+            entries,
+            since,
+            ExperimentChallenge.objects.all(),
+            lambda rows: self.translated_rows(rows, 'kokeiluhaku'),
+        )
+
+    def build_wp_content(self, entries, since):
+        # WordPress content lives outside of the database, so it is always
+        # fetched. The shard is rewritten only if the content has changed.
+        new_entries = {}
+        for content_type in ('posts', 'pages'):
+            for post in self.fetch_wp_content(content_type):
+                modified = post.get('modified_gmt')
+                new_entries[post['link']] = {
+                    'urls': [post['link']],
+                    'lastmod': '{}+00:00'.format(modified) if modified else None,
+                }
+        return self.replace_entries(entries, new_entries)
+
+    def translated_rows(self, rows, path):
+        for obj in rows.prefetch_related('translations'):
+            urls = []
+            for lang in self.languages:
+                obj.set_current_language(lang)
+                urls.append('{}/{}/{}/{}'.format(self.front_base, lang, path, obj.slug))
+            yield obj.pk, obj.updated_at, urls
+
+    def update_model_entries(self, entries, since, queryset, generate):
+        """Update entries of a model based section.
+
+        Only the primary keys of all rows are fetched to detect removed rows.
+        Full data is fetched for rows modified since the previous run and for
+        rows missing from the manifest.
+        """
+        current_keys = {str(pk) for pk in queryset.values_list('pk', flat=True)}
+        changed = False
+
+        for key in set(entries) - current_keys:
+            del entries[key]
+            changed = True
+
+        if since is None:
+            rows = queryset
+        else:
+            missing_keys = current_keys - set(entries)
+            rows = queryset.filter(Q(updated_at__gte=since) | Q(pk__in=missing_keys))
+
+        for pk, updated_at, urls in generate(rows.order_by('pk')):
+            entry = {'urls': urls, 'lastmod': updated_at.isoformat()}
+            if entries.get(str(pk)) != entry:
+                entries[str(pk)] = entry
+                changed = True
+
+        return changed
+
+    def replace_entries(self, entries, new_entries):
+        if entries == new_entries:
+            return False
+        entries.clear()
+        entries.update(new_entries)
+        return True
+
+    def fetch_wp_content(self, content_type):
         posts_per_page = 100
-        r = requests.get('{}/wp-json/wp/v2/posts?per_page={}'.format(wp_api, posts_per_page))
-        page = 1
-        for post in r.json():
-            urls.append({
-                'url': post['link']
-            })
+        r = requests.get('{}/wp-json/wp/v2/{}?per_page={}'.format(
+            self.wp_api, content_type, posts_per_page))
+        yield from r.json()
 
-        total_pages = int(r.headers['X-WP-TotalPages'])
-        while page < total_pages:
-            page += 1
-            r = requests.get(
-                '{}/wp-json/wp/v2/posts?per_page={}&page={}'.format(wp_api, posts_per_page, page))
-            for post in r.json():
-                urls.append({
-                    'url': post['link']
-                })
-
-        # Pages from WP
-        r = requests.get('{}/wp-json/wp/v2/pages?per_page={}'.format(wp_api, posts_per_page))
         page = 1
-        for post in r.json():
-            urls.append({
-                'url': post['link']
-            })
-
         total_pages = int(r.headers['X-WP-TotalPages'])
         while page < total_pages:
             page += 1
-            r = requests.get(
-                '{}/wp-json/wp/v2/pages?per_page={}&page={}'.format(wp_api, posts_per_page, page))
-            for post in r.json():
-                urls.append({
-                    'url': post['link']
-                })
+            r = requests.get('{}/wp-json/wp/v2/{}?per_page={}&page={}'.format(
+                self.wp_api, content_type, posts_per_page, page))
+            yield from r.json()
+
+    # Output
+
+    def shard_filename(self, section, number):
+        return 'sitemap-{}-{}.xml'.format(section, number)
+
+    def shard_path(self, section, number):
+        return os.path.join(self.output_dir, self.shard_filename(section, number))
+
+    def section_shards(self, entries):
+        """Split the entries of a section to chunks fitting into a sitemap.
+
+        Returns a list of (urls, lastmod) tuples, where urls is a list of
+        (url, lastmod) tuples.
+        """
+        urls = []
+        for key in sorted(entries, key=lambda k: (not k.isdigit(), int(k) if k.isdigit() else k)):
+            entry = entries[key]
+            urls += [(url, entry['lastmod']) for url in entry['urls']]
+
+        shards = []
+        for start in range(0, max(len(urls), 1), SITEMAP_MAX_URLS):
+            chunk = urls[start:start + SITEMAP_MAX_URLS]
+            lastmods = [lastmod for url, lastmod in chunk if lastmod]
+            shards.append((chunk, max(lastmods) if lastmods else None))
+        return shards
+
+    def write_section(self, section, entries):
+        shards = self.section_shards(entries)
+        for number, (urls, lastmod) in enumerate(shards, start=1):
+            content = ['<?xml version="1.0" encoding="UTF-8"?>']
+            content.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+            for url, url_lastmod in urls:
+                content.append('<url>')
+                content.append('<loc>{}</loc>'.format(escape(url)))
+                if url_lastmod:
+                    content.append('<lastmod>{}</lastmod>'.format(url_lastmod))
+                content.append('</url>')
+            content.append('</urlset>')
+            self.write_file(self.shard_filename(section, number), ''.join(content))
+
+        # Remove shards left over from a previous run with more URLs.
+        number = len(shards) + 1
+        while os.path.exists(self.shard_path(section, number)):
+            os.remove(self.shard_path(section, number))
+            number += 1
 
-        f = open(BASE_DIR + "/files/sitemap.xml", "w")
-        f.write('<?xml version="1.0" encoding="UTF-8"?>')
-        f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+    def write_index(self, sections):
+        content = ['<?xml version="1.0" encoding="UTF-8"?>']
+        content.append('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+        for section, entries in sections.items():
+            for number, (urls, lastmod) in enumerate(self.section_shards(entries), start=1):
+                content.append('<sitemap>')
+                content.append('<loc>{}</loc>'.format(escape('{}/{}'.format(
+                    self.front_base, self.shard_filename(section, number)
+                ))))
+                if lastmod:
+                    content.append('<lastmod>{}</lastmod>'.format(lastmod))
+                content.append('</sitemap>')
+        content.append('</sitemapindex>')
+        self.write_file('sitemap.xml', ''.join(content))
 
-        for url in urls:
-            f.write("<url>")
-            f.write("<loc>{}</loc>".format(url['url']))
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST_FILENAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-            f.write("</url>")
+    def write_manifest(self, manifest):
+        self.write_file(MANIFEST_FILENAME, json.dumps(manifest))
 
-        f.write('</urlset> ')
-        f.close()
+    def write_file(self, filename, content):
+        # Write to a temporary file first so that crawlers never see a
+        # partially written sitemap.
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, filename)
+        with open(path + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
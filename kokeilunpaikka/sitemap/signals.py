@@ -0,0 +1,15 @@
+from django.db import transaction
+
+from ..utils.cache import bump_generation
+from .views import FRONT_PAGE_GENERATION
+
+
+def content_changed(sender, **kwargs):
+    """Invalidate the cached front page when any of its content changes."""
+    if kwargs.get('action') in ('pre_add', 'pre_remove', 'pre_clear'):
+        return
+    # Logging in updates only the last login time of the user, which is not
+    # shown.
+    if kwargs.get('update_fields') == frozenset(['last_login']):
+        return
+    transaction.on_commit(lambda: bump_generation(FRONT_PAGE_GENERATION))
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..experiments.models import Experiment
+from ..stages.models import Stage
+from ..users.models import UserProfile
+from .models import EditableText
+
+
+def mock_wp_response(*args, **kwargs):
+    response = MagicMock()
+    response.headers = {'X-WP-TotalPages': '1'}
+    if '/posts' in args[0]:
+        response.json.return_value = [{
+            'link': 'http://example.com/post/',
+            'modified_gmt': '2020-01-01T12:00:00',
+        }]
+    else:
+        response.json.return_value = []
+    return response
+
+
+@patch('kokeilunpaikka.sitemap.management.commands.create_sitemap.requests.get',
+       mock_wp_response)
+class CreateSitemapCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        Stage.objects.create(stage_number=1)
+        self.experiment = Experiment.objects.create(name='Experiment')
+        user = get_user_model().objects.create(username='user')
+        UserProfile.objects.create(user=user)
+
+    def create_sitemap(self, *args):
+        out = StringIO()
+        call_command('create_sitemap', *args, output_dir=self.output_dir, stdout=out)
+        return out.getvalue()
+
+    def read(self, filename):
+        with open(os.path.join(self.output_dir, filename)) as f:
+            return f.read()
+
+    def test_full_run_writes_index_and_shards(self):
+        self.create_sitemap()
+        index = self.read('sitemap.xml')
+        self.assertIn('<sitemapindex', index)
+        self.assertIn('sitemap-experiments-1.xml', index)
+        experiments = self.read('sitemap-experiments-1.xml')
+        self.assertIn('/fi/kokeilu/experiment</loc>', experiments)
+        self.assertIn('<lastmod>{}</lastmod>'.format(
+            self.experiment.updated_at.isoformat()
+        ), experiments)
+        wp = self.read('sitemap-wp-1.xml')
+        self.assertIn('<lastmod>2020-01-01T12:00:00+00:00</lastmod>', wp)
+
+    def test_incremental_run_without_changes_rewrites_nothing(self):
+        self.create_sitemap()
+        output = self.create_sitemap('--incremental')
+        self.assertIn('rewritten shards: none', output)
+
+    def test_incremental_run_rewrites_only_changed_shards(self):
+        self.create_sitemap()
+        self.experiment.name = 'Renamed'
+        self.experiment.slug = 'renamed'
+        self.experiment.save()
+        Experiment.objects.create(name='Another')
+
+        # Two queries per model based section: primary keys of all rows and
+        # the changed rows only.
+        with self.assertNumQueries(8):
+            output = self.create_sitemap('--incremental')
+
+        self.assertIn('rewritten shards: experiments.', output)
+        experiments = self.read('sitemap-experiments-1.xml')
+        self.assertIn('/fi/kokeilu/renamed</loc>', experiments)
+        self.assertIn('/fi/kokeilu/another</loc>', experiments)
+        self.assertNotIn('/fi/kokeilu/experiment</loc>', experiments)
+
+    def test_incremental_run_removes_deleted_rows(self):
+        self.create_sitemap()
+        self.experiment.delete()
+        output = self.create_sitemap('--incremental')
+        self.assertIn('experiments', output)
+        self.assertNotIn('/kokeilu/experiment<', self.read('sitemap-experiments-1.xml'))
+
+
+class FrontPageAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        Stage.objects.create(stage_number=1, name='First stage')
+        self.experiment = Experiment.objects.create(is_published=True, name='Experiment')
+        Experiment.objects.create(is_published=False, name='Unpublished')
+        self.editable_text = EditableText.objects.get(text_type='front_page_header')
+        self.editable_text.text_value = 'Header'
+        self.editable_text.save()
+        self.url = reverse('front-page')
+
+    def test_front_page(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['configuration'], [])
+        self.assertIn({
+            'id': self.editable_text.id,
+            'text_type': 'front_page_header',
+            'text_value': 'Header',
+        }, data['editable_texts'])
+        self.assertEqual(
+            [experiment['id'] for experiment in data['latest_experiments']],
+            [self.experiment.id]
+        )
+        self.assertEqual(data['statistics']['visible_experiments_count'], 1)
+        self.assertEqual(data['themes'], [])
+
+    def test_front_page_is_cached_until_content_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editable_text.text_value = 'Changed'
+            self.editable_text.save()
+        response = self.client.get(self.url)
+        self.assertIn({
+            'id': self.editable_text.id,
+            'text_type': 'front_page_header',
+            'text_value': 'Changed',
+        }, response.json()['editable_texts'])
@@ -2,7 +2,7 @@ from django.urls import include, path
 
 from rest_framework import routers
 
-from .views import EditableTextViewset, SiteConfigurationViewset
+from .views import EditableTextViewset, FrontPageView, SiteConfigurationViewset
 
 router = routers.DefaultRouter()
 router.register('editable-text', EditableTextViewset, basename='editable-text')
@@ -10,4 +10,5 @@ router.register('configuration', SiteConfigurationViewset, basename='configurati
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('front_page/', FrontPageView.as_view(), name='front-page'),
 ]
@@ -1,14 +1,33 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils.translation import get_language
+
+from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..experiments.models import Experiment
+from ..experiments.serializers import ExperimentListSerializer
+from ..experiments.statistics import get_statistics
+from ..themes.models import Theme
+from ..themes.serializers import ThemeSerializer
+from ..utils.cache import get_generation
 from .models import EditableText, SiteConfiguration
 from .serializers import EditableTextSerializer, SiteConfigurationSerializer
 
-from rest_framework import mixins, viewsets
+FRONT_PAGE_CACHE_TIMEOUT = 15 * 60  # seconds
+
+FRONT_PAGE_GENERATION = 'front_page'
+
+# Number of the latest experiments included in the front page content.
+FRONT_PAGE_EXPERIMENTS_COUNT = 12
 
 
 class EditableTextViewset(
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
-    queryset = EditableText.objects.all()
+    queryset = EditableText.objects.prefetch_related('translations')
     serializer_class = EditableTextSerializer
 
 
@@ -16,5 +35,128 @@ class SiteConfigurationViewset(
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
-    queryset = SiteConfiguration.objects.filter(active=True)
+    queryset = SiteConfiguration.objects.filter(active=True).prefetch_related(
+        Prefetch(
+            'featured_experiments',
+            queryset=Experiment.objects.with_list_relations(),
+        ),
+    )
     serializer_class = SiteConfigurationSerializer
+
+
+class FrontPageView(APIView):
+    """Return all content needed to render the front page.
+
+    Language of the returned content can be changed using `Accept-Language`
+    header with a value of `fi`, `sv` or `en`.
+
+    ### Notices
+
+    - Combines the responses of `editable-text`, `configuration`,
+      `experiments/statistics` and `themes` endpoints and the latest
+      published experiments in a single response.
+
+    ### Response
+
+    Sample JSON response body:
+
+        {
+            "configuration": [
+                {
+                    "id": 1,
+                    "front_page_image": "http://localhost/media/front.jpg",
+                    "front_page_image_opacity": 0.1,
+                    "top_menu_opacity": 0.25,
+                    "featured_experiments": [],
+                    "funded_experiments_amount": 10
+                }
+            ],
+            "editable_texts": [
+                {
+                    "id": 1,
+                    "text_type": "front_page_header",
+                    "text_value": "Lorem ipsum"
+                }
+            ],
+            "latest_experiments": [
+                {
+                    "id": 1,
+                    "image_url": "",
+                    "is_published": true,
+                    "name": "Lorem ipsum",
+                    "published_at": "2019-07-10T12:00:00Z",
+                    "short_description": "Lorem ipsum",
+                    "slug": "lorem-ipsum",
+                    "stage": {
+                        "description": "Lorem ipsum.",
+                        "name": "First stage",
+                        "stage_number": 1
+                    },
+                    "themes": []
+                }
+            ],
+            "statistics": {
+                "active_users_count": 284,
+                "experiment_success_rating_average": 8.0,
+                "users_with_experiments_count": 36,
+                "visible_experiments_count": 29
+            },
+            "themes": [
+                {
+                    "id": 1,
+                    "is_curated": false,
+                    "name": "My theme"
+                }
+            ]
+        }
+
+    """
+    query_budgets = {
+        'get': 10,
+    }
+
+    def get(self, request):
+        # Image URLs are absolute, so the content depends on the host too.
+        cache_key = 'front_page:{}:{}:{}'.format(
+            get_generation(FRONT_PAGE_GENERATION),
+            get_language(),
+            request.build_absolute_uri('/'),
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_data()
+            cache.set(cache_key, data, FRONT_PAGE_CACHE_TIMEOUT)
+        return Response(data)
+
+    def get_data(self):
+        context = {'request': self.request}
+        latest_experiments = (
+            Experiment.objects
+            .active()
+            .with_list_relations()
+            .order_by('-published_at', '-created_at')
+            [:FRONT_PAGE_EXPERIMENTS_COUNT]
+        )
+        return {
+            'configuration': SiteConfigurationSerializer(
+                SiteConfigurationViewset.queryset.all(),
+                context=context,
+                many=True,
+            ).data,
+            'editable_texts': EditableTextSerializer(
+                EditableTextViewset.queryset.all(),
+                context=context,
+                many=True,
+            ).data,
+            'latest_experiments': ExperimentListSerializer(
+                latest_experiments,
+                context=context,
+                many=True,
+            ).data,
+            'statistics': get_statistics(),
+            'themes': ThemeSerializer(
+                Theme.objects.prefetch_related('translations'),
+                context=context,
+                many=True,
+            ).data,
+        }
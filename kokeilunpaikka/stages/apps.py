@@ -5,3 +5,9 @@ from django.utils.translation import gettext_lazy as _
 class StagesConfig(AppConfig):
     name = 'kokeilunpaikka.stages'
     verbose_name = _('Stages')
+
+    def ready(self):
+        from .catalog import question_catalog, stage_catalog
+
+        question_catalog.connect_signals()
+        stage_catalog.connect_signals()
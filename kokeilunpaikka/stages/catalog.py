@@ -0,0 +1,15 @@
+from ..utils.catalog import Catalog
+from .models import Question, Stage
+
+question_catalog = Catalog(
+    Question,
+    fields=('experiment_challenge_id', 'is_public', 'stage_id'),
+    translated_fields=('description', 'question'),
+    relations=('ignore_in_experiment_challenge',),
+)
+
+stage_catalog = Catalog(
+    Stage,
+    pk_name='stage_number',
+    translated_fields=('description', 'name'),
+)
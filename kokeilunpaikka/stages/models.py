@@ -6,6 +6,7 @@ from django.utils.translation import gettext_lazy as _
 from parler.models import TranslatableModel, TranslatedFields
 
 from ..utils.models import TimeStampedModel
+from .querysets import QuestionAnswerQuerySet
 
 
 class Stage(TimeStampedModel, TranslatableModel):
@@ -48,8 +49,14 @@ class Stage(TimeStampedModel, TranslatableModel):
 
     @classmethod
     def get_initial_stage(cls):
-        """Get instance of the first stage of the experiment process."""
-        return cls.objects.filter(stage_number=1).first()
+        """Get instance of the first stage of the experiment process.
+
+        The stage is read from the stage catalog, as this is the default
+        stage of every new experiment.
+        """
+        from .catalog import stage_catalog
+
+        return stage_catalog.get_instance(1)
 
 
 class Question(TimeStampedModel, TranslatableModel):
@@ -137,6 +144,8 @@ class QuestionAnswer(TimeStampedModel):
         verbose_name=_('value'),
     )
 
+    objects = QuestionAnswerQuerySet.as_manager()
+
     class Meta:
         unique_together = (
             'experiment',
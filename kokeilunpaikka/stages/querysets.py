@@ -0,0 +1,71 @@
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+
+class QuestionAnswerQuerySet(QuerySet):
+
+    def upsert(self, experiment, answered_by, values):
+        """Create or update the answers of the experiment to the given
+        questions with a single statement.
+
+        Values are given as a dictionary of question ids and answers. Existing
+        answers of the experiment to the questions are updated in place,
+        keeping their creation time. No signals are sent.
+
+        Return the created and updated answers.
+        """
+        if not values:
+            return []
+        connection = connections[self.db]
+        fields = self.model._meta.concrete_fields
+        field_names = (
+            'answered_by',
+            'created_at',
+            'experiment',
+            'question',
+            'updated_at',
+            'value',
+        )
+        columns = {
+            name: connection.ops.quote_name(self.model._meta.get_field(name).column)
+            for name in field_names
+        }
+        now = timezone.now()
+        params = []
+        for question_id, value in values.items():
+            params.extend((
+                answered_by.pk if answered_by else None,
+                now,
+                experiment.pk,
+                question_id,
+                now,
+                value,
+            ))
+        row = '({})'.format(', '.join(['%s'] * len(field_names)))
+        sql = (
+            'INSERT INTO {table} ({columns}) VALUES {rows} '
+            'ON CONFLICT ({experiment}, {question}) DO UPDATE SET '
+            '{answered_by} = EXCLUDED.{answered_by}, '
+            '{updated_at} = EXCLUDED.{updated_at}, '
+            '{value} = EXCLUDED.{value} '
+            'RETURNING {returning}'
+        ).format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            columns=', '.join(columns[name] for name in field_names),
+            rows=', '.join([row] * len(values)),
+            returning=', '.join(
+                '{}.{}'.format(
+                    connection.ops.quote_name(self.model._meta.db_table),
+                    connection.ops.quote_name(field.column),
+                )
+                for field in fields
+            ),
+            **columns
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                self.model.from_db(self.db, [field.attname for field in fields], row)
+                for row in cursor.fetchall()
+            ]
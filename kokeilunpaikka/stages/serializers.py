@@ -1,35 +1,36 @@
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from ..utils.catalog import CatalogPrimaryKeyRelatedField
+from .catalog import question_catalog, stage_catalog
 from .models import Question, QuestionAnswer, Stage
 
 
 class QuestionAnswerListSerializer(serializers.ListSerializer):
 
     def update(self, instance, validated_data):
-        ret = []
-        for data in validated_data:
-            ret.append(self.child.update(instance, data))
-        return ret
+        """Save all answers with a single statement. The last answer to a
+        question is saved if the same question is answered more than once.
+        """
+        return QuestionAnswer.objects.upsert(
+            experiment=instance,
+            answered_by=self.context['request'].user,
+            values={data['question'].pk: data['value'] for data in validated_data},
+        )
 
 
 class QuestionAnswerSerializer(serializers.ModelSerializer):
-    question_id = serializers.PrimaryKeyRelatedField(
-        queryset=Question.objects.all(),
+    question_id = CatalogPrimaryKeyRelatedField(
+        catalog=question_catalog,
         source='question',
     )
 
-    def update(self, instance, validated_data):
-        answer, created = QuestionAnswer.objects.update_or_create(
-            question=validated_data['question'],
-            experiment=self.instance,
-            defaults={
-                'answered_by': self.context['request'].user,
-                'value': validated_data['value']
-            }
-        )
-        return answer
+    @cached_property
+    def experiment_challenge_ids(self):
+        # The serializer is shared by all answers of the list.
+        return {challenge.pk for challenge in self.instance.experiment_challenges.all()}
 
     class Meta:
         model = QuestionAnswer
@@ -41,9 +42,8 @@ class QuestionAnswerSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         if (
-            data['question'].experiment_challenge is not None and
-            data['question'].experiment_challenge not in
-            self.instance.experiment_challenges.all()
+            data['question'].experiment_challenge_id is not None and
+            data['question'].experiment_challenge_id not in self.experiment_challenge_ids
         ):
             raise serializers.ValidationError(_(
                 'The question is intended for an experiment challenge this '
@@ -74,3 +74,10 @@ class StageSerializer(serializers.ModelSerializer):
             'name',
             'stage_number',
         )
+
+    def to_representation(self, instance):
+        # Stages are nested in experiments, so they are represented from the
+        # catalog instead of querying their translations for every experiment.
+        return super().to_representation(
+            stage_catalog.get_instance(instance.pk) or instance
+        )
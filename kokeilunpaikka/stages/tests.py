@@ -1,11 +1,16 @@
+import threading
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from ..experiments.models import Experiment, ExperimentChallenge
+from .catalog import question_catalog, stage_catalog
 from .models import Question, QuestionAnswer, Stage
 
 
@@ -53,6 +58,7 @@ class StageAPITestCase(APITestCase):
     maxDiff = None
 
     def setUp(self):
+        cache.clear()
         self.stage = Stage.objects.create(
             description='Lorem ipsum',
             name='First phase',
@@ -86,6 +92,7 @@ class QuestionAPITestCase(APITestCase):
     maxDiff = None
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create(
             first_name='John',
             last_name='Doe'
@@ -210,3 +217,104 @@ class QuestionAPITestCase(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_question_list_excluding_questions_ignored_in_experiment_challenge(self):
+        self.question.ignore_in_experiment_challenge.add(self.experiment_challenge)
+        url = '{}?experiment_challenge[]={}'.format(
+            reverse('question-list', kwargs={
+                'stage_id': self.stage.stage_number
+            }),
+            self.experiment_challenge.id
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [question['id'] for question in response.json()],
+            [self.question_with_experiment_challenge.id]
+        )
+
+    def test_question_list_filtering_with_invalid_value(self):
+        url = '{}?experiment_challenge_id=invalid'.format(
+            reverse('question-list', kwargs={
+                'stage_id': self.stage.stage_number
+            })
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StageCatalogTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.stage = Stage.objects.create(
+            name='First phase',
+            stage_number=1,
+        )
+        self.experiment_challenge = ExperimentChallenge.objects.create()
+        self.question = Question.objects.create(
+            question='Question',
+            stage=self.stage,
+        )
+
+    def test_initial_stage_is_read_from_catalog(self):
+        stage_catalog.get_snapshot()
+        with self.assertNumQueries(0):
+            stage = Stage.get_initial_stage()
+            self.assertEqual(stage.pk, 1)
+            self.assertEqual(stage.name, 'First phase')
+
+    def test_questions_include_ignored_experiment_challenges(self):
+        self.question.ignore_in_experiment_challenge.add(self.experiment_challenge)
+        self.assertEqual(
+            question_catalog.get_item(self.question.pk)['ignore_in_experiment_challenge'],
+            [self.experiment_challenge.pk]
+        )
+
+    def test_catalog_is_rebuilt_after_changes_are_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stage.set_current_language('en')
+            self.stage.name = 'Changed'
+            self.stage.save()
+        self.assertEqual(stage_catalog.get_item(1, 'en')['name'], 'Changed')
+
+
+class StageCatalogTransactionTestCase(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.stage = Stage.objects.create(
+            name='First phase',
+            stage_number=1,
+        )
+
+    def test_catalog_changes_are_discarded_on_rollback(self):
+        stage_catalog.get_snapshot()
+        other_thread_items = []
+
+        def get_item_in_other_thread():
+            try:
+                other_thread_items.append(stage_catalog.get_item(1))
+            finally:
+                connection.close()
+
+        try:
+            with transaction.atomic():
+                self.stage.name = 'Changed'
+                self.stage.save()
+                self.assertTrue(stage_catalog.has_pending_change())
+                self.assertEqual(stage_catalog.get_item(1)['name'], 'Changed')
+
+                # The uncommitted change is not shared with other threads.
+                thread = threading.Thread(target=get_item_in_other_thread)
+                thread.start()
+                thread.join()
+                self.assertEqual(other_thread_items[0]['name'], 'First phase')
+                raise IntegrityError
+        except IntegrityError:
+            pass
+
+        self.assertFalse(stage_catalog.has_pending_change())
+        self.assertEqual(stage_catalog.get_item(1)['name'], 'First phase')
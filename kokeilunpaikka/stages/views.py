@@ -1,8 +1,12 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import mixins, permissions, viewsets
+from rest_framework import mixins, permissions, serializers, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 
 from ..docs.mixins import ApiResponseCodeDocumentationMixin
+from ..utils.catalog import catalog_response
 from ..utils.permissions import ReadOnly
+from .catalog import question_catalog, stage_catalog
 from .models import Question, Stage
 from .serializers import QuestionSerializer, StageSerializer
 
@@ -50,6 +54,18 @@ class StageViewSet(
     queryset = Stage.objects.all()
     serializer_class = StageSerializer
 
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, stage_catalog)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            stage = stage_catalog.get_instance(int(kwargs['pk']))
+        except ValueError:
+            stage = None
+        if stage is None:
+            raise NotFound()
+        return Response(self.get_serializer(stage).data)
+
 
 class QuestionViewSet(
     ApiResponseCodeDocumentationMixin,
@@ -121,12 +137,37 @@ class QuestionViewSet(
     }
 
     def get_queryset(self):
-        if self.request.query_params.getlist('experiment_challenge[]'):
-            return Question.objects.filter(
-                stage_id=self.kwargs['stage_id']
-            ).exclude(
-                ignore_in_experiment_challenge__in=self.request.query_params.getlist(
-                    'experiment_challenge[]'
-                )
-            )
-        return Question.objects.filter(stage_id=self.kwargs['stage_id'])
+        queryset = Question.objects.filter(stage_id=self.kwargs['stage_id']).order_by('pk')
+        ignored_in = [
+            self.parse_query_param('experiment_challenge[]', value, serializers.IntegerField())
+            for value in self.request.query_params.getlist('experiment_challenge[]')
+        ]
+        if ignored_in:
+            queryset = queryset.exclude(ignore_in_experiment_challenge__in=ignored_in)
+        return queryset
+
+    def parse_query_param(self, name, value, field):
+        try:
+            return field.to_internal_value(value)
+        except ValidationError as e:
+            raise ValidationError({name: e.detail})
+
+    def list(self, request, *args, **kwargs):
+        # The questions are filtered in the database, but built from the
+        # question catalog, so their translations are not queried.
+        pks = self.filter_queryset(self.get_queryset()).values_list('pk', flat=True)
+        questions = [question_catalog.get_instance(pk) for pk in pks]
+        serializer = self.get_serializer(
+            [question for question in questions if question is not None],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            question = question_catalog.get_instance(int(kwargs['pk']))
+        except ValueError:
+            question = None
+        if question is None or question.stage_id != kwargs['stage_id']:
+            raise NotFound()
+        return Response(self.get_serializer(question).data)
@@ -5,3 +5,8 @@ from django.utils.translation import gettext_lazy as _
 class ThemesConfig(AppConfig):
     name = 'kokeilunpaikka.themes'
     verbose_name = _('Themes')
+
+    def ready(self):
+        from .catalog import theme_catalog
+
+        theme_catalog.connect_signals()
@@ -0,0 +1,8 @@
+from ..utils.catalog import Catalog
+from .models import Theme
+
+theme_catalog = Catalog(
+    Theme,
+    fields=('is_curated',),
+    translated_fields=('name',),
+)
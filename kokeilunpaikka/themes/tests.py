@@ -1,9 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
 
+from ..utils.catalog import CatalogPrimaryKeyRelatedField
+from .catalog import theme_catalog
 from .models import Theme
 
 
@@ -11,6 +15,7 @@ class ThemeAPITestCase(APITestCase):
     maxDiff = None
 
     def setUp(self):
+        cache.clear()
         self.user_1 = get_user_model().objects.create()
         self.theme = Theme.objects.create(
             name='Theme'
@@ -27,6 +32,35 @@ class ThemeAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), expected_response_body)
 
+    def test_theme_list_without_translation(self):
+        untranslated_theme = Theme.objects.create()
+        url = reverse('theme-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[1], {
+            'id': untranslated_theme.id,
+            'is_curated': False,
+            'name': None,
+        })
+
+    def test_theme_list_is_served_from_catalog(self):
+        url = reverse('theme-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theme.name = 'Renamed'
+            self.theme.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['name'], 'Renamed')
+
     def test_theme_create(self):
         request_body = {
             'name': 'Lorem ipsum'
@@ -58,3 +92,23 @@ class ThemeAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), expected_response_body)
+
+
+class ThemeCatalogTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.theme = Theme.objects.create(name='Theme')
+
+    def test_related_field_validates_ids_without_queries(self):
+        field = CatalogPrimaryKeyRelatedField(catalog=theme_catalog, many=True)
+        field.to_internal_value([self.theme.id])
+        with self.assertNumQueries(0):
+            themes = field.to_internal_value([self.theme.id, str(self.theme.id)])
+            self.assertEqual(themes[0], self.theme)
+            self.assertEqual(themes[0].name, 'Theme')
+
+    def test_related_field_rejects_unknown_ids(self):
+        field = CatalogPrimaryKeyRelatedField(catalog=theme_catalog, many=True)
+        with self.assertRaises(ValidationError):
+            field.to_internal_value([self.theme.id + 1000])
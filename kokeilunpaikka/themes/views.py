@@ -1,6 +1,8 @@
 from rest_framework import mixins, permissions, viewsets
 
 from ..docs.mixins import ApiResponseCodeDocumentationMixin
+from ..utils.catalog import catalog_response
+from .catalog import theme_catalog
 from .models import Theme
 from .serializers import ThemeSerializer
 
@@ -20,6 +22,12 @@ class ThemeViewSet(
     Language of the returned content can be changed using `Accept-Language`
     header with a value of `fi`, `sv` or `en`.
 
+    ### Notices
+
+    - The list is served from an in-memory catalog and has an `ETag` header.
+      Requests with a matching `If-None-Match` header get an empty `304`
+      response.
+
     ### Response
 
     Sample JSON response body:
@@ -77,5 +85,8 @@ class ThemeViewSet(
     queryset = Theme.objects.all()
     serializer_class = ThemeSerializer
 
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, theme_catalog)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -1,7 +1,7 @@
-from rest_framework import serializers
+from ..utils.serializers import BulkPrimaryKeyRelatedField
 
 
-class UploaderFilteredPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+class UploaderFilteredPrimaryKeyRelatedField(BulkPrimaryKeyRelatedField):
 
     def get_queryset(self):
         request = self.context.get('request', None)
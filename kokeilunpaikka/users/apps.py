@@ -1,7 +1,34 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.translation import gettext_lazy as _
 
 
 class UsersConfig(AppConfig):
     name = 'kokeilunpaikka.users'
     verbose_name = _('Users')
+
+    def ready(self):
+        from ..themes.models import Theme
+        from ..uploads.models import Image
+        from . import signals
+        from .catalog import looking_for_option_catalog, status_option_catalog
+        from .models import UserLookingForOption, UserProfile
+
+        post_save.connect(signals.user_post_save, sender=get_user_model())
+        post_save.connect(signals.user_profile_changed, sender=UserProfile)
+        post_delete.connect(signals.user_profile_changed, sender=UserProfile)
+        for through in (
+            UserProfile.interested_in_themes.through,
+            UserProfile.looking_for.through,
+            UserProfile.offering.through,
+        ):
+            m2m_changed.connect(signals.user_profile_relations_changed, sender=through)
+        post_delete.connect(signals.image_post_delete, sender=Image)
+        post_delete.connect(signals.theme_post_delete, sender=Theme)
+        post_delete.connect(
+            signals.looking_for_option_post_delete,
+            sender=UserLookingForOption
+        )
+        looking_for_option_catalog.connect_signals()
+        status_option_catalog.connect_signals()
@@ -0,0 +1,11 @@
+from ..utils.catalog import Catalog
+from .models import UserLookingForOption, UserStatusOption
+
+looking_for_option_catalog = Catalog(
+    UserLookingForOption,
+    translated_fields=('value', 'offering_value'),
+)
+status_option_catalog = Catalog(
+    UserStatusOption,
+    translated_fields=('value',),
+)
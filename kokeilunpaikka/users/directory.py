@@ -0,0 +1,224 @@
+import threading
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from easy_thumbnails.files import get_thumbnailer
+from easy_thumbnails.storage import thumbnail_default_storage
+
+from ..utils.cache import bump_generation
+from .models import UserDirectoryEntry, UserProfile
+
+AVATAR_SIZE = 'small_profile_image'
+GENERATION = 'user_directory'
+SESSION_CACHE_TIMEOUT = 5 * 60
+THUMBNAIL_SIZE = 'list_image'
+
+# Users whose directory entries are rebuilt when the transaction is committed.
+_pending = threading.local()
+
+
+def build_directory_entries(profiles):
+    """Build unsaved directory entries of the given profiles.
+
+    Thumbnails are generated here, when the profile changes, instead of when
+    the directory is listed. Only the names of the thumbnails are stored, see
+    `get_thumbnail_url`.
+    """
+    profiles = (
+        profiles
+        .filter(user__is_active=True)
+        .select_related('image', 'user')
+        .annotate(
+            directory_looking_for_ids=ArrayAgg(
+                'looking_for',
+                distinct=True,
+                filter=Q(looking_for__isnull=False),
+            ),
+            directory_offering_ids=ArrayAgg(
+                'offering',
+                distinct=True,
+                filter=Q(offering__isnull=False),
+            ),
+            directory_theme_ids=ArrayAgg(
+                'interested_in_themes',
+                distinct=True,
+                filter=Q(interested_in_themes__isnull=False),
+            ),
+        )
+    )
+    for profile in profiles:
+        user = profile.user
+        avatar_thumbnail = image_thumbnail = ''
+        if profile.image:
+            avatar_thumbnail = get_thumbnail_name(profile.image.image, AVATAR_SIZE)
+            image_thumbnail = get_thumbnail_name(profile.image.image, THUMBNAIL_SIZE)
+        yield UserDirectoryEntry(
+            avatar_thumbnail=avatar_thumbnail,
+            date_joined=user.date_joined,
+            first_name=user.first_name,
+            full_name=user.get_full_name(),
+            image_id=profile.image_id,
+            image_thumbnail=image_thumbnail,
+            last_name=user.last_name,
+            looking_for_ids=profile.directory_looking_for_ids,
+            offering_ids=profile.directory_offering_ids,
+            theme_ids=profile.directory_theme_ids,
+            user=user,
+        )
+
+
+def get_thumbnail_name(image, alias):
+    """Generate the thumbnail of the image and return its name in the
+    thumbnail storage, or an empty string if it can't be generated.
+    """
+    try:
+        return get_thumbnailer(image)[alias].name
+    except Exception:
+        return ''
+
+
+def get_thumbnail_url(name):
+    """Return the URL of the stored thumbnail.
+
+    The URL is resolved on every request, as the URLs given by the storage
+    may expire, like the signed URLs of Google Cloud Storage.
+    """
+    return thumbnail_default_storage.url(name) if name else ''
+
+
+def save_directory_entries(entries, batch_size=1000):
+    """Insert the given entries, or update the existing entries of the same
+    users incrementing their version.
+
+    The entries are upserted, so that concurrent rebuilds of the entries of
+    a user don't conflict with each other.
+    """
+    quote_name = connection.ops.quote_name
+    fields = [
+        field for field in UserDirectoryEntry._meta.concrete_fields
+        if field.attname != 'version'
+    ]
+    columns = [quote_name(field.column) for field in fields]
+    table = quote_name(UserDirectoryEntry._meta.db_table)
+    sql = (
+        'INSERT INTO {table} ({columns}, {version}) VALUES {{values}} '
+        'ON CONFLICT ({pk}) DO UPDATE SET {updates}, '
+        '{version} = {table}.{version} + 1'.format(
+            columns=', '.join(columns),
+            pk=quote_name(UserDirectoryEntry._meta.pk.column),
+            table=table,
+            updates=', '.join(
+                '{column} = EXCLUDED.{column}'.format(column=column)
+                for column in columns
+            ),
+            version=quote_name(UserDirectoryEntry._meta.get_field('version').column),
+        )
+    )
+    row = '({}, 1)'.format(', '.join(['%s'] * len(fields)))
+    with connection.cursor() as cursor:
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            cursor.execute(
+                sql.format(values=', '.join([row] * len(batch))),
+                [
+                    field.get_db_prep_save(getattr(entry, field.attname), connection)
+                    for entry in batch
+                    for field in fields
+                ],
+            )
+
+
+def rebuild_directory_entries(user_ids):
+    """Rebuild the directory entries of the given users.
+
+    Entries of users which are no longer listed in the directory, because
+    they are inactive or have no profile, are removed.
+    """
+    entries = list(build_directory_entries(
+        UserProfile.objects.filter(user_id__in=user_ids)
+    ))
+    with transaction.atomic():
+        (
+            UserDirectoryEntry.objects
+            .filter(user_id__in=user_ids)
+            .exclude(user_id__in=[entry.user_id for entry in entries])
+            .delete()
+        )
+        save_directory_entries(entries)
+    announce_change(user_ids)
+
+
+def update_directory_entries(user_ids):
+    """Rebuild the directory entries of the given users once the current
+    transaction is committed.
+
+    A single save of a profile sends several signals, so the users are
+    collected and the entry of each user is rebuilt only once per
+    transaction. Every call registers a callback, as the callbacks of a
+    rolled back transaction are discarded, but only the first one of a
+    transaction finds users to rebuild.
+    """
+    pending_user_ids = getattr(_pending, 'user_ids', None)
+    if pending_user_ids is None:
+        pending_user_ids = _pending.user_ids = set()
+    pending_user_ids.update(user_ids)
+    transaction.on_commit(rebuild_pending_directory_entries)
+
+
+def rebuild_pending_directory_entries():
+    user_ids = getattr(_pending, 'user_ids', None)
+    if user_ids:
+        _pending.user_ids = set()
+        rebuild_directory_entries(user_ids)
+
+
+def update_all_directory_entries():
+    user_ids = set(UserProfile.objects.values_list('user_id', flat=True))
+    user_ids.update(UserDirectoryEntry.objects.values_list('user_id', flat=True))
+    rebuild_directory_entries(user_ids)
+
+
+def announce_change(user_ids):
+    # Data derived from the directory, like the facet counts and the session
+    # data of the users, is built again now that the change is committed.
+    bump_generation(GENERATION)
+    cache.delete_many([get_session_cache_key(user_id) for user_id in user_ids])
+
+
+def get_session_cache_key(user_id):
+    return 'user_session:{}'.format(user_id)
+
+
+def get_session_data(user):
+    """Return the minimal data of the logged in user needed by the clients on
+    every page load.
+
+    The data is read from the directory entry of the user and cached until
+    the entry changes. The version can be compared to detect when the full
+    profile of the user needs to be fetched again. The avatar is returned as
+    the name of the thumbnail, see `get_thumbnail_url`.
+    """
+    cache_key = get_session_cache_key(user.id)
+    data = cache.get(cache_key)
+    if data is None:
+        data = (
+            UserDirectoryEntry.objects
+            .filter(user_id=user.id)
+            .values('avatar_thumbnail', 'first_name', 'full_name', 'last_name', 'version')
+            .first()
+        )
+        if data is None:
+            # Users without a profile are not listed in the directory.
+            data = {
+                'avatar_thumbnail': '',
+                'first_name': user.first_name,
+                'full_name': user.get_full_name(),
+                'last_name': user.last_name,
+                'version': 0,
+            }
+        data['id'] = user.id
+        cache.set(cache_key, data, SESSION_CACHE_TIMEOUT)
+    return data
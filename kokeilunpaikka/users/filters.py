@@ -1,28 +1,41 @@
-from django.contrib.auth import get_user_model
 from django_filters import rest_framework as filters
 
-from .models import UserLookingForOption
+from .models import UserDirectoryEntry, UserLookingForOption
 from ..themes.models import Theme
 
 
 class UserFilter(filters.FilterSet):
+    """Filter the user directory by the ids stored on the entries.
+
+    The array fields are GIN indexed, so the containment lookups do not
+    need to join the profile relations.
+    """
     theme_id = filters.ModelChoiceFilter(
         queryset=Theme.objects.all(),
-        field_name='profile__interested_in_themes'
+        field_name='theme_ids',
+        method='filter_contains',
     )
     looking_for = filters.ModelChoiceFilter(
         queryset=UserLookingForOption.objects.all(),
-        field_name='profile__looking_for'
+        field_name='looking_for_ids',
+        method='filter_contains',
     )
     offering = filters.ModelChoiceFilter(
         queryset=UserLookingForOption.objects.all(),
-        field_name='profile__offering'
+        field_name='offering_ids',
+        method='filter_contains',
     )
 
+    # Facets counted by the facets endpoint.
+    facets = {
+        'looking_for': 'looking_for_ids',
+        'offering': 'offering_ids',
+        'themes': 'theme_ids',
+    }
+
     class Meta:
-        model = get_user_model()
-        fields = (
-            'profile__interested_in_themes',
-            'profile__offering',
-            'profile__looking_for',
-        )
+        model = UserDirectoryEntry
+        fields = ()
+
+    def filter_contains(self, queryset, name, value):
+        return queryset.filter(**{'{}__contains'.format(name): [value.pk]})
@@ -0,0 +1,104 @@
+# Generated by Django 3.2.22 on 2026-10-19 06:49
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+from easy_thumbnails.files import get_thumbnailer
+
+
+def populate_user_directory(apps, schema_editor):
+    UserDirectoryEntry = apps.get_model('users', 'UserDirectoryEntry')
+    UserProfile = apps.get_model('users', 'UserProfile')
+
+    profiles = (
+        UserProfile.objects
+        .filter(user__is_active=True)
+        .select_related('image', 'user')
+        .annotate(
+            directory_looking_for_ids=ArrayAgg(
+                'looking_for', distinct=True, filter=Q(looking_for__isnull=False)
+            ),
+            directory_offering_ids=ArrayAgg(
+                'offering', distinct=True, filter=Q(offering__isnull=False)
+            ),
+            directory_theme_ids=ArrayAgg(
+                'interested_in_themes',
+                distinct=True,
+                filter=Q(interested_in_themes__isnull=False)
+            ),
+        )
+    )
+    entries = []
+    for profile in profiles:
+        user = profile.user
+        image_thumbnail = ''
+        if profile.image:
+            try:
+                image_thumbnail = get_thumbnailer(profile.image.image)['list_image'].name
+            except Exception:
+                pass
+        entries.append(UserDirectoryEntry(
+            date_joined=user.date_joined,
+            first_name=user.first_name,
+            full_name='{} {}'.format(user.first_name, user.last_name).strip(),
+            image_id=profile.image_id,
+            image_thumbnail=image_thumbnail,
+            last_name=user.last_name,
+            looking_for_ids=profile.directory_looking_for_ids,
+            offering_ids=profile.directory_offering_ids,
+            theme_ids=profile.directory_theme_ids,
+            user=user,
+        ))
+    UserDirectoryEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0005_userlookingforoptiontranslation_offering_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDirectoryEntry',
+            fields=[
+                ('date_joined', models.DateTimeField(verbose_name='date joined')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('full_name', models.CharField(blank=True, max_length=301, verbose_name='full name')),
+                ('image_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='image id')),
+                ('image_thumbnail', models.CharField(blank=True, help_text='Name of the list thumbnail of the profile image in the thumbnail storage.', max_length=255, verbose_name='image thumbnail')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('looking_for_ids', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None, verbose_name='looking for ids')),
+                ('offering_ids', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None, verbose_name='offering ids')),
+                ('theme_ids', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None, verbose_name='theme ids')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='directory_entry', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'user directory entry',
+                'verbose_name_plural': 'user directory entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userdirectoryentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['looking_for_ids'], name='users_userd_looking_42f64e_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='userdirectoryentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['offering_ids'], name='users_userd_offerin_715e10_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='userdirectoryentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['theme_ids'], name='users_userd_theme_i_98dcd7_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='userdirectoryentry',
+            index=models.Index(fields=['-date_joined'], name='users_userd_date_jo_fe4dd7_idx'),
+        ),
+        migrations.RunPython(populate_user_directory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.22 on 2026-10-19 06:56
+
+from django.db import migrations, models
+
+from easy_thumbnails.files import get_thumbnailer
+
+
+def populate_avatar_thumbnails(apps, schema_editor):
+    Image = apps.get_model('uploads', 'Image')
+    UserDirectoryEntry = apps.get_model('users', 'UserDirectoryEntry')
+
+    entries = UserDirectoryEntry.objects.filter(image_id__isnull=False)
+    images = Image.objects.in_bulk({entry.image_id for entry in entries})
+    for entry in entries:
+        image = images.get(entry.image_id)
+        if image is None:
+            continue
+        try:
+            entry.avatar_thumbnail = get_thumbnailer(image.image)['small_profile_image'].name
+        except Exception:
+            pass
+    UserDirectoryEntry.objects.bulk_update(entries, ('avatar_thumbnail',), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+        ('users', '0006_userdirectoryentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdirectoryentry',
+            name='avatar_thumbnail',
+            field=models.CharField(blank=True, help_text='Name of the small thumbnail of the profile image in the thumbnail storage.', max_length=255, verbose_name='avatar thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='userdirectoryentry',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented whenever the user or the profile of the user changes.', verbose_name='version'),
+        ),
+        migrations.RunPython(populate_avatar_thumbnails, migrations.RunPython.noop),
+    ]
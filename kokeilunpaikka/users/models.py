@@ -1,4 +1,6 @@
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -101,6 +103,99 @@ class UserProfile(TimeStampedModel):
         )
 
 
+class UserDirectoryEntry(models.Model):
+    """Read optimized projection of a user listed in the user directory.
+
+    Contains a row for every active user with a profile, including the
+    thumbnail of the profile image and the ids of the related profile
+    options, so that the directory can be listed and filtered without
+    joins. The entries are kept up to date by signals, see `signals.py`.
+    """
+    avatar_thumbnail = models.CharField(
+        blank=True,
+        help_text=_(
+            'Name of the small thumbnail of the profile image in the thumbnail '
+            'storage.'
+        ),
+        max_length=255,
+        verbose_name=_('avatar thumbnail'),
+    )
+    date_joined = models.DateTimeField(
+        verbose_name=_('date joined'),
+    )
+    first_name = models.CharField(
+        blank=True,
+        max_length=150,
+        verbose_name=_('first name'),
+    )
+    full_name = models.CharField(
+        blank=True,
+        max_length=301,
+        verbose_name=_('full name'),
+    )
+    image_id = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_('image id'),
+    )
+    image_thumbnail = models.CharField(
+        blank=True,
+        help_text=_(
+            'Name of the list thumbnail of the profile image in the thumbnail '
+            'storage.'
+        ),
+        max_length=255,
+        verbose_name=_('image thumbnail'),
+    )
+    last_name = models.CharField(
+        blank=True,
+        max_length=150,
+        verbose_name=_('last name'),
+    )
+    looking_for_ids = ArrayField(
+        models.PositiveIntegerField(),
+        default=list,
+        verbose_name=_('looking for ids'),
+    )
+    offering_ids = ArrayField(
+        models.PositiveIntegerField(),
+        default=list,
+        verbose_name=_('offering ids'),
+    )
+    theme_ids = ArrayField(
+        models.PositiveIntegerField(),
+        default=list,
+        verbose_name=_('theme ids'),
+    )
+    user = models.OneToOneField(
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='directory_entry',
+        to=settings.AUTH_USER_MODEL,
+        verbose_name=_('user'),
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        help_text=_(
+            'Incremented whenever the user or the profile of the user changes.'
+        ),
+        verbose_name=_('version'),
+    )
+
+    class Meta:
+        indexes = (
+            GinIndex(fields=('looking_for_ids',)),
+            GinIndex(fields=('offering_ids',)),
+            GinIndex(fields=('theme_ids',)),
+            models.Index(fields=('-date_joined',)),
+        )
+        verbose_name = _('user directory entry')
+        verbose_name_plural = _('user directory entries')
+
+    def __str__(self):
+        return self.full_name
+
+
 class UserLookingForOption(TimeStampedModel, TranslatableModel):
     """Editable options (by superadmin) for things user is looking for in the
     service.
@@ -1,19 +1,27 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers
 
 from ..experiments.models import Experiment
 from ..experiments.serializers import ExperimentListSerializer
-from ..themes.models import Theme
+from ..themes.catalog import theme_catalog
 from ..themes.serializers import ThemeSerializer
 from ..uploads.fields import UploaderFilteredPrimaryKeyRelatedField
 from ..uploads.models import Image
-from ..utils.serializers import ThumbnailImageField
-from .models import UserLookingForOption, UserProfile, UserStatusOption
+from ..utils.catalog import CatalogPrimaryKeyRelatedField
+from ..utils.serializers import ThumbnailImageField, TranslationPrefetchMixin
+from .catalog import looking_for_option_catalog, status_option_catalog
+from .directory import get_thumbnail_url
+from .models import (
+    UserDirectoryEntry,
+    UserLookingForOption,
+    UserProfile,
+    UserStatusOption
+)
 
 
 class UserLookingForOptionSerializer(serializers.ModelSerializer):
@@ -57,37 +65,39 @@ class UserBaseSerializer(serializers.ModelSerializer):
         }
 
 
-class UserListSerializer(UserBaseSerializer):
-    image_url = ThumbnailImageField(
-        size='list_image',
-        source='profile.image.image',
-        default=None,
+class UserListSerializer(serializers.ModelSerializer):
+    """Serializer for the entries of the user directory."""
+    id = serializers.IntegerField(
+        read_only=True,
+        source='user_id',
     )
+    image_url = serializers.SerializerMethodField()
 
-    class Meta(UserBaseSerializer.Meta):
-        fields = UserBaseSerializer.Meta.fields + (
+    class Meta:
+        model = UserDirectoryEntry
+        fields = (
+            'id',
+            'first_name',
+            'full_name',
             'image_url',
+            'last_name',
         )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Add possibility to remove image_url field by using a custom URL
-        # param.
-        #
-        # This is useful when loading the whole dataset without pagination as
-        # the fetching of image information requires a lot of database queries
-        # because of the limits of easy-thumbnails library.
+        # param. The thumbnails are stored in the directory entries, so this
+        # only makes the response smaller.
         if 'simplified' in self.context['request'].GET:
             self.fields.pop('image_url')
 
-    def to_representation(self, instance):
-        # Make sure appropriate default values are returned for dot source
-        # fields in the name of uniformity.
-        data = super().to_representation(instance)
-        if 'image_url' in data and data['image_url'] is None:
-            data['image_url'] = ''
-        return data
+    def get_image_url(self, obj):
+        if not obj.image_thumbnail:
+            return ''
+        return self.context['request'].build_absolute_uri(
+            get_thumbnail_url(obj.image_thumbnail)
+        )
 
     def update(self, instance, validated_data):
         raise NotImplementedError('`update()` not allowed.')
@@ -140,6 +150,16 @@ class SingleUserBaseSerializer(UserBaseSerializer):
             'send_experiment_notification'
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Add possibility to remove the embedded experiments by using a
+        # custom URL param, e.g. when only the profile of the current user is
+        # needed.
+        request = self.context.get('request')
+        if request is not None and 'without_experiments' in request.GET:
+            self.fields.pop('experiments')
+
     def get_experiments(self, obj):
         current_user_id = self.context['request'].user.id
 
@@ -157,13 +177,25 @@ class SingleUserBaseSerializer(UserBaseSerializer):
             )
 
         return ExperimentListSerializer(
-            qs.order_by('-published_at', '-created_at').distinct(),
+            qs.with_list_relations().order_by('-published_at', '-created_at').distinct(),
             many=True,
             context=self.context
         ).data
 
 
-class UserRetrieveSerializer(SingleUserBaseSerializer):
+class UserRetrieveSerializer(TranslationPrefetchMixin, SingleUserBaseSerializer):
+    # Relations of the profile fetched up front. Related objects already
+    # prefetched by the caller are not fetched again.
+    prefetch_lookups = (
+        'profile__image',
+    )
+    translated_relations = (
+        'profile__interested_in_themes',
+        'profile__looking_for',
+        'profile__offering',
+        'profile__status',
+    )
+
     image_url = ThumbnailImageField(
         size='square_detail_image',
         source='profile.image.image',
@@ -198,6 +230,8 @@ class UserRetrieveSerializer(SingleUserBaseSerializer):
         # Make sure appropriate default values are returned for dot source
         # fields in the name of uniformity. This is an empty string for
         # CharField serializer and an empty list for ListSerializer.
+        if hasattr(instance, 'profile'):
+            prefetch_related_objects([instance], *self.prefetch_lookups)
         data = super().to_representation(instance)
         for field in (
             'description',
@@ -264,9 +298,9 @@ class UserUpdateSerializer(SingleUserBaseSerializer):
         required=False,
         source='profile.image',
     )
-    interested_in_theme_ids = serializers.PrimaryKeyRelatedField(
+    interested_in_theme_ids = CatalogPrimaryKeyRelatedField(
+        catalog=theme_catalog,
         many=True,
-        queryset=Theme.objects.all(),
         required=False,
         source='profile.interested_in_themes',
     )
@@ -275,20 +309,20 @@ class UserUpdateSerializer(SingleUserBaseSerializer):
         choices=settings.LANGUAGES,
         required=False,
     )
-    looking_for_ids = serializers.PrimaryKeyRelatedField(
+    looking_for_ids = CatalogPrimaryKeyRelatedField(
+        catalog=looking_for_option_catalog,
         many=True,
-        queryset=UserLookingForOption.objects.all(),
         required=False,
         source='profile.looking_for',
     )
-    offering_ids = serializers.PrimaryKeyRelatedField(
+    offering_ids = CatalogPrimaryKeyRelatedField(
+        catalog=looking_for_option_catalog,
         many=True,
-        queryset=UserLookingForOption.objects.all(),
         required=False,
         source='profile.offering',
     )
-    status_id = serializers.PrimaryKeyRelatedField(
-        queryset=UserStatusOption.objects.all(),
+    status_id = CatalogPrimaryKeyRelatedField(
+        catalog=status_option_catalog,
         required=False,
         source='profile.status',
     )
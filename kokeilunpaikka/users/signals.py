@@ -0,0 +1,85 @@
+from .directory import update_directory_entries
+from .models import UserDirectoryEntry, UserProfile
+
+# Fields of the user model copied to the directory entries.
+DIRECTORY_USER_FIELDS = {
+    'date_joined',
+    'first_name',
+    'is_active',
+    'last_name',
+}
+
+
+def user_post_save(sender, instance, update_fields, **kwargs):
+    if update_fields and not DIRECTORY_USER_FIELDS.intersection(update_fields):
+        return
+    update_directory_entries([instance.pk])
+
+
+def user_profile_changed(sender, instance, **kwargs):
+    update_directory_entries([instance.user_id])
+
+
+def user_profile_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update the entries of profiles whose themes or options have changed.
+
+    The profiles of a relation cleared from the option side are not known
+    after the relation has been cleared, so they are stored on the instance
+    before that.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            update_directory_entries([instance.user_id])
+        return
+
+    if action == 'pre_clear':
+        target_field = next(
+            field for field in sender._meta.fields
+            if field.related_model is type(instance)
+        )
+        instance._directory_user_ids = list(
+            sender.objects
+            .filter(**{target_field.name: instance})
+            .values_list('userprofile__user_id', flat=True)
+        )
+        return
+    if action == 'post_clear':
+        user_ids = instance.__dict__.pop('_directory_user_ids', [])
+    else:
+        user_ids = list(
+            UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+        )
+    if user_ids:
+        update_directory_entries(user_ids)
+
+
+def image_post_delete(sender, instance, **kwargs):
+    user_ids = list(
+        UserDirectoryEntry.objects
+        .filter(image_id=instance.pk)
+        .values_list('user_id', flat=True)
+    )
+    if user_ids:
+        update_directory_entries(user_ids)
+
+
+def theme_post_delete(sender, instance, **kwargs):
+    update_entries_containing(theme_ids__contains=[instance.pk])
+
+
+def looking_for_option_post_delete(sender, instance, **kwargs):
+    update_entries_containing(looking_for_ids__contains=[instance.pk])
+    update_entries_containing(offering_ids__contains=[instance.pk])
+
+
+def update_entries_containing(**lookups):
+    # Relations removed by a cascading delete do not send m2m_changed.
+    user_ids = list(
+        UserDirectoryEntry.objects
+        .filter(**lookups)
+        .values_list('user_id', flat=True)
+    )
+    if user_ids:
+        update_directory_entries(user_ids)
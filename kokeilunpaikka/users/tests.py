@@ -2,6 +2,9 @@ from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import translation
 
@@ -12,22 +15,29 @@ from rest_framework.test import APITestCase
 from ..experiments.models import Experiment
 from ..stages.models import Stage
 from ..themes.models import Theme
-from .models import UserLookingForOption, UserProfile, UserStatusOption
+from .models import (
+    UserDirectoryEntry,
+    UserLookingForOption,
+    UserProfile,
+    UserStatusOption
+)
 
 
 class UserAPITestCase(APITestCase):
     maxDiff = None
 
     def setUp(self):
-        self.user = get_user_model().objects.create(
-            username='john@example.com',
-            email='john@example.com',
-            first_name='John',
-            last_name='Doe'
-        )
-        UserProfile.objects.create(
-            user=self.user,
-        )
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = get_user_model().objects.create(
+                username='john@example.com',
+                email='john@example.com',
+                first_name='John',
+                last_name='Doe'
+            )
+            UserProfile.objects.create(
+                user=self.user,
+            )
 
     def test_user_list(self):
         expected_response_body = [{
@@ -72,6 +82,100 @@ class UserAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()['results']), 1)
 
+    def test_user_list_filter_by_profile_options(self):
+        theme = Theme.objects.create(name='Theme')
+        option = UserLookingForOption.objects.create(value='Help')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.interested_in_themes.add(theme)
+            self.user.profile.offering.add(option)
+        url = reverse('user-list')
+
+        response = self.client.get(url, {'theme_id': theme.id})
+        self.assertEqual([user['id'] for user in response.json()], [self.user.id])
+        response = self.client.get(url, {'offering': option.id})
+        self.assertEqual([user['id'] for user in response.json()], [self.user.id])
+        response = self.client.get(url, {'looking_for': option.id})
+        self.assertEqual(response.json(), [])
+
+        # Relations cleared from the option side and deleted options are
+        # removed from the directory too.
+        with self.captureOnCommitCallbacks(execute=True):
+            option.offering_userprofile_set.clear()
+        response = self.client.get(url, {'offering': option.id})
+        self.assertEqual(response.json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            theme.delete()
+        self.assertEqual(self.user.directory_entry.theme_ids, [])
+
+    def test_user_list_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user-list'), {'search': 'Doe'})
+
+    @patch('kokeilunpaikka.users.directory.thumbnail_default_storage')
+    def test_user_list_resolves_thumbnail_url(self, storage_mock):
+        signed_url = 'https://storage.example.com/thumbnail.jpg?Signature=' + 'x' * 300
+        storage_mock.url.return_value = signed_url
+        self.user.directory_entry.image_thumbnail = 'thumbnail.jpg'
+        self.user.directory_entry.save()
+
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['image_url'], signed_url)
+        storage_mock.url.assert_called_once_with('thumbnail.jpg')
+
+    def test_user_directory_follows_user_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Johnny'
+            self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.directory_entry.full_name, 'Johnny Doe')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.json(), [])
+
+    def test_user_directory_entry_is_rebuilt_once_per_transaction(self):
+        theme = Theme.objects.create(name='Theme')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Johnny'
+            self.user.save()
+            self.user.profile.description = 'Lorem ipsum'
+            self.user.profile.save()
+            self.user.profile.interested_in_themes.add(theme)
+            # Nothing is rebuilt before the transaction is committed.
+            self.assertEqual(self.user.directory_entry.full_name, 'John Doe')
+
+        entry = UserDirectoryEntry.objects.get(user=self.user)
+        self.assertEqual(entry.full_name, 'Johnny Doe')
+        self.assertEqual(entry.theme_ids, [theme.id])
+        self.assertEqual(entry.version, 2)
+
+    def test_user_facets(self):
+        cache.clear()
+        theme = Theme.objects.create(name='Theme')
+        option = UserLookingForOption.objects.create(value='Help')
+        with self.captureOnCommitCallbacks(execute=True):
+            other_user = get_user_model().objects.create(username='jane@example.com')
+            UserProfile.objects.create(user=other_user)
+            other_user.profile.interested_in_themes.add(theme)
+            self.user.profile.interested_in_themes.add(theme)
+            self.user.profile.looking_for.add(option)
+        url = reverse('user-facets')
+
+        # The filtered option is validated and each facet is a single query.
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'looking_for': option.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'looking_for': [{'id': option.id, 'count': 1}],
+            'offering': [],
+            'themes': [{'id': theme.id, 'count': 1}],
+        })
+        response = self.client.get(url)
+        self.assertEqual(response.json()['themes'], [{'id': theme.id, 'count': 2}])
+
     def test_user_create(self):
         request_body = {
             'first_name': 'John',
@@ -336,6 +440,29 @@ class UserAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['experiments']), 1)
 
+    def test_user_retrieve_query_count_does_not_depend_on_experiments(self):
+        theme = Theme.objects.create(name='Theme')
+        self.user.profile.interested_in_themes.add(theme)
+        Stage.objects.create(stage_number=1, name='First stage')
+        url = reverse('user-detail', kwargs={'pk': self.user.id})
+
+        def add_experiments(count):
+            for i in range(count):
+                experiment = Experiment.objects.create(is_published=True)
+                experiment.responsible_users.add(self.user)
+                experiment.themes.add(theme)
+
+        add_experiments(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        add_experiments(5)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['experiments']), 6)
+
+        response = self.client.get(url, {'without_experiments': ''})
+        self.assertNotIn('experiments', response.json())
+
     def test_user_retrieve_not_found_for_user_without_profile(self):
         user_without_profile = get_user_model().objects.create(
             username='jane.doe@example.com',
@@ -6,14 +6,17 @@ from django.views.decorators.debug import sensitive_post_parameters
 
 from rest_framework import filters, mixins, viewsets
 from rest_framework.decorators import action
-from rest_framework.response import Response
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAdminUser
 
 from ..excel_export.experiments_export import UserDetailsReport
 from ..docs.mixins import ApiResponseCodeDocumentationMixin
+from ..utils.catalog import catalog_response
+from ..utils.mixins import FacetCountsMixin
 from ..utils.pagination import ControllablePageNumberPagination
-from .models import UserLookingForOption, UserStatusOption
+from .directory import GENERATION as DIRECTORY_GENERATION
+from .catalog import looking_for_option_catalog, status_option_catalog
+from .models import UserDirectoryEntry
 from .filters import UserFilter
 from .serializers import (
     UserCreateSerializer,
@@ -30,6 +33,7 @@ sensitive_post_parameters_m = method_decorator(
 
 class UserViewSet(
     ApiResponseCodeDocumentationMixin,
+    FacetCountsMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -43,11 +47,13 @@ class UserViewSet(
     ### Notices
 
     - Pagination may be used by giving the `page_size` query parameter.
+    - The list is served from a denormalized user directory, which is kept
+      up to date whenever users or their profiles change. Listing and
+      filtering by `theme_id`, `looking_for` or `offering` is a single
+      indexed query and includes the thumbnails.
     - A special response without the `image_url` field can be achieved by
       giving an extra `simplified` query parameter in the URL like
-      `http://localhost:8019/api/users/?simplified`. This is useful when you
-      need to fetch the whole list without pagination as it makes the query
-      much more performant.
+      `http://localhost:8019/api/users/?simplified`.
 
     ### Response
 
@@ -88,6 +94,8 @@ class UserViewSet(
 
     - `email` field is listed only if the user has defined so. This is handled
       through the `expose_email_address` field of user profile.
+    - The `experiments` field can be left out by giving an extra
+      `without_experiments` query parameter in the URL.
 
     ### Response
 
@@ -120,6 +128,35 @@ class UserViewSet(
             "twitter_url": "https://twitter.com/kokeilunpaikka"
         }
 
+    facets:
+    Return the number of users per theme, looking for option and offering
+    option for the current filter state.
+
+    ### Notices
+
+    - Accepts the same filter and search query parameters as `list`.
+    - Options without matching users are not listed.
+
+    ### Response
+
+    Sample JSON response body:
+
+        {
+            "looking_for": [
+                {
+                    "id": 1,
+                    "count": 3
+                }
+            ],
+            "offering": [],
+            "themes": [
+                {
+                    "id": 1,
+                    "count": 7
+                }
+            ]
+        }
+
     looking_for_options:
     Return a list of options for things that users can select to their profiles
     to represent their points of interest. These options can be used while
@@ -159,9 +196,14 @@ class UserViewSet(
         filters.SearchFilter,
         filters.OrderingFilter,
     )
-    filterset_class = UserFilter
+    facets_generation = DIRECTORY_GENERATION
     ordering = ('-date_joined')
     pagination_class = ControllablePageNumberPagination
+    query_budgets = {
+        'facets': 4,
+        'list': 2,
+        'retrieve': 8,
+    }
     search_fields = (
         'first_name',
         'last_name',
@@ -180,7 +222,21 @@ class UserViewSet(
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    def get_queryset(self):
+        if self.action in ('facets', 'list'):
+            return UserDirectoryEntry.objects.all()
+        return super().get_queryset()
+
+    @property
+    def filterset_class(self):
+        # The filters work on the directory entries only.
+        if self.action in ('facets', 'list'):
+            return UserFilter
+        return None
+
     def get_response_codes(self):
+        if self.action == 'facets':
+            return ('200',)
         if self.action == 'looking_for_options':
             return ('200',)
         if self.action == 'status_options':
@@ -201,19 +257,11 @@ class UserViewSet(
 
     @action(detail=False)
     def looking_for_options(self, request):
-        serializer = self.get_serializer(
-            UserLookingForOption.objects.all(),
-            many=True
-        )
-        return Response(serializer.data)
+        return catalog_response(request, looking_for_option_catalog)
 
     @action(detail=False)
     def status_options(self, request):
-        serializer = self.get_serializer(
-            UserStatusOption.objects.all(),
-            many=True
-        )
-        return Response(serializer.data)
+        return catalog_response(request, status_option_catalog)
 
     @action(detail=False, permission_classes=(IsAdminUser,),
             authentication_classes=(SessionAuthentication,))
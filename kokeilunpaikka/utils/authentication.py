@@ -1,30 +1,108 @@
+import hashlib
 from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
 
+def get_token_cache_key(key):
+    # Token keys are credentials, so only a hash of them is stored in the
+    # cache.
+    return 'auth_token:{}'.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_token_cache(*keys):
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+def lazy_user_attribute(name):
+    """Read-only attribute of `LazyUser` read from the cached values until
+    the user has been fetched, and from the user after that.
+    """
+
+    def get(self):
+        if self._wrapped is empty:
+            return self.__dict__['_cached_values'][name]
+        return getattr(self._wrapped, name)
+    return property(get)
+
+
+class LazyUser(SimpleLazyObject):
+    """User which is fetched from the database on first use.
+
+    `id`, `pk`, `is_active`, `is_anonymous` and `is_authenticated` stay lazy,
+    so checking authentication and filtering querysets by the user don't
+    fetch the user. Reading any other attribute or assigning any attribute
+    fetches it, and the lazy attributes are read from the fetched user
+    after that.
+    """
+
+    id = lazy_user_attribute('id')
+    pk = lazy_user_attribute('pk')
+    is_active = lazy_user_attribute('is_active')
+    is_anonymous = lazy_user_attribute('is_anonymous')
+    is_authenticated = lazy_user_attribute('is_authenticated')
+
+    def __init__(self, user_id, is_active):
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        # Assigning attributes would fetch the user.
+        self.__dict__['_cached_values'] = {
+            'id': user_id,
+            'pk': user_id,
+            'is_active': is_active,
+            'is_anonymous': False,
+            'is_authenticated': True,
+        }
+
+
 class ExpiringTokenAuthentication(TokenAuthentication):
-    """Extend TokenAuthentication to require login after expiration time."""
+    """Extend TokenAuthentication to require login after expiration time.
+
+    With `REST_TOKEN_CACHE_ENABLED` validated tokens are cached for
+    `REST_TOKEN_CACHE_TIMEOUT` seconds so that authenticated requests don't
+    have to query the token and the user. The cache is invalidated by
+    signals when a token is refreshed or deleted and when a user is saved,
+    see `extensions.auth.signals`. The signals are handled only by the
+    process making the change, so the cache must be shared by all processes.
+    """
 
     INVALID_TOKEN = 'invalid_token'
     TOKEN_EXPIRED = 'token_expired'
 
     def authenticate_credentials(self, key):
         model = self.get_model()
-        try:
-            token = model.objects.select_related('user').get(key=key)
-        except model.DoesNotExist:
-            raise AuthenticationFailed(
-                detail=_('Invalid token.'),
-                code=self.INVALID_TOKEN
-            )
+        cache_enabled = settings.REST_TOKEN_CACHE_ENABLED
+        cache_key = get_token_cache_key(key)
+        cached = cache.get(cache_key) if cache_enabled else None
+
+        if cached is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed(
+                    detail=_('Invalid token.'),
+                    code=self.INVALID_TOKEN
+                )
+            user = token.user
+            if cache_enabled:
+                cache.set(
+                    cache_key,
+                    (user.id, user.is_active, token.created),
+                    settings.REST_TOKEN_CACHE_TIMEOUT
+                )
+        else:
+            user_id, is_active, created = cached
+            user = LazyUser(user_id, is_active)
+            token = model(key=key, user_id=user_id, created=created)
 
-        if not token.user.is_active:
+        if not user.is_active:
             raise AuthenticationFailed(
                 detail=_('User inactive or deleted.'),
                 code=self.INVALID_TOKEN
@@ -38,7 +116,7 @@ class ExpiringTokenAuthentication(TokenAuthentication):
                 code=self.TOKEN_EXPIRED
             )
 
-        return (token.user, token)
+        return (user, token)
 
 
 def create_expiring_token(token_model, user, serializer):
@@ -0,0 +1,67 @@
+import random
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+
+def get_generation_key(name):
+    return 'generation:{}'.format(name)
+
+
+def get_initial_generation():
+    # A random start keeps a generation evicted from the cache from starting
+    # again from a value already seen by the processes.
+    return random.getrandbits(48)
+
+
+def get_generation(name):
+    """Return the current generation of the cached data identified by name.
+
+    Data cached or held in memory can be tagged with the generation it was
+    built from. When the generation changes, the data is stale and must be
+    built again. The generations are stored in the default cache, so a
+    change reaches other processes only if the cache is shared by them, see
+    `check_shared_cache`.
+    """
+    key = get_generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, get_initial_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(name):
+    """Mark all data built from the current generation stale and return the
+    new generation.
+
+    The generation is incremented atomically, so data built from generation
+    N and changed by the bump to N + 1 is current if no other bump happened
+    in between.
+    """
+    key = get_generation_key(name)
+    cache.add(key, get_initial_generation(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Nothing is stored by the dummy cache.
+        return None
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Require a cache shared by all processes in deployments.
+
+    Cached and in-memory data, e.g. the experiment index, the catalogs and
+    their ETags, are invalidated through the generations. With a cache of
+    its own, a process would keep serving stale data until it expires.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in settings.LOCAL_CACHE_BACKENDS:
+        return []
+    return [checks.Error(
+        'The default cache {} is not shared by the processes.'.format(backend),
+        hint='Configure a shared cache, e.g. memcached, with CACHE_BACKEND.',
+        id='kokeilunpaikka.E001',
+    )]
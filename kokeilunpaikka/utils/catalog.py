@@ -0,0 +1,303 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+
+from parler.cache import MISSING
+from parler.utils.i18n import get_active_language_choices
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import bump_generation, get_generation
+from .serializers import BulkPrimaryKeyRelatedField
+
+# Rebuild the catalogs at least this often (in seconds) to recover from
+# changes made without signals, e.g. with queryset updates.
+MAX_AGE = 10 * 60
+
+
+class CatalogSnapshot:
+    """Contents of a catalog built from a single generation.
+
+    A snapshot is never modified after it has been built, so it can be read
+    without locking. The representations of the rows are memoized per
+    language.
+    """
+
+    def __init__(self, generation, field_names, rows, translation_field_names,
+                 translations, relations):
+        self.built_at = time.monotonic()
+        self.generation = generation
+        self.field_names = field_names
+        self.rows = rows
+        self.translation_field_names = translation_field_names
+        self.translations = translations
+        self.relations = relations
+        self.representations = {}
+
+
+class Catalog:
+    """In-process catalog of a small translatable model in all languages.
+
+    The catalog of a process is built on first use with two queries, one for
+    the rows and one for their translations, and an additional query for each
+    many-to-many relation, whose related ids are listed in the rows. Changes
+    are announced to all processes by bumping the shared generation of the
+    catalog, which makes them rebuild their catalog. Call `connect_signals`
+    in `AppConfig.ready` to announce the changes made through the models.
+    """
+
+    def __init__(self, model, fields=(), translated_fields=(), relations=(),
+                 pk_name='id'):
+        self.model = model
+        self.fields = fields
+        self.translated_fields = translated_fields
+        self.relations = relations
+        self.pk_name = pk_name
+        self.generation_name = 'catalog:{}'.format(model._meta.label_lower)
+        self.lock = threading.Lock()
+        self.snapshot = None
+        # Snapshot of a thread whose transaction has changed the catalog and
+        # whether the change is still pending.
+        self.local = threading.local()
+
+    def __deepcopy__(self, memo):
+        # Serializer fields are deep copied with their arguments, but the
+        # catalog is shared by the whole process.
+        return self
+
+    @property
+    def translation_model(self):
+        return self.model._parler_meta.root_model
+
+    def build(self, generation):
+        field_names = [field.attname for field in self.model._meta.concrete_fields]
+        rows = OrderedDict(
+            (values[field_names.index(self.model._meta.pk.attname)], values)
+            for values in self.model._default_manager.order_by('pk').values_list(*field_names)
+        )
+
+        translation_field_names = [
+            field.attname for field in self.translation_model._meta.concrete_fields
+        ]
+        translations = defaultdict(dict)
+        for values in self.translation_model._default_manager.values_list(
+            *translation_field_names
+        ):
+            translation = dict(zip(translation_field_names, values))
+            translations[translation['master_id']][translation['language_code']] = values
+
+        relations = {}
+        for name in self.relations:
+            field = self.model._meta.get_field(name)
+            related_ids = defaultdict(list)
+            for pk, related_id in (
+                field.remote_field.through.objects
+                .order_by(field.m2m_reverse_field_name())
+                .values_list(field.m2m_field_name(), field.m2m_reverse_field_name())
+            ):
+                related_ids[pk].append(related_id)
+            relations[name] = dict(related_ids)
+
+        return CatalogSnapshot(
+            generation,
+            field_names,
+            rows,
+            translation_field_names,
+            dict(translations),
+            relations,
+        )
+
+    def is_stale(self, snapshot, generation):
+        return (
+            snapshot is None or
+            snapshot.generation != generation or
+            time.monotonic() - snapshot.built_at > MAX_AGE
+        )
+
+    def has_pending_change(self):
+        """Return whether the transaction of the current thread has changed
+        the catalog without committing yet.
+
+        The change is flagged when it is announced and the flag is cleared
+        when the change is published on commit. The commit callbacks of a
+        rolled back transaction are discarded, so the flag is cleared as well
+        whenever the thread is no longer in a transaction.
+        """
+        if not transaction.get_connection().in_atomic_block:
+            self.local.pending_change = False
+        return getattr(self.local, 'pending_change', False)
+
+    def get_snapshot(self):
+        generation = get_generation(self.generation_name)
+        if self.has_pending_change():
+            # The uncommitted changes must not be seen by the other threads.
+            snapshot = getattr(self.local, 'snapshot', None)
+            if self.is_stale(snapshot, generation):
+                snapshot = self.local.snapshot = self.build(generation)
+            return snapshot
+
+        self.local.snapshot = None
+        snapshot = self.snapshot
+        if self.is_stale(snapshot, generation):
+            with self.lock:
+                snapshot = self.snapshot
+                if self.is_stale(snapshot, generation):
+                    snapshot = self.snapshot = self.build(generation)
+        return snapshot
+
+    def get_version(self):
+        return self.get_snapshot().generation
+
+    def get_list(self, language_code=None):
+        """Return all rows represented in the given or the active language.
+
+        Translated fields fall back to the fallback languages of parler and
+        to None if none of them has a translation.
+        """
+        return list(self.get_map(language_code).values())
+
+    def get_map(self, language_code=None):
+        """Return the represented rows by their primary keys."""
+        language_code = language_code or get_language()
+        snapshot = self.get_snapshot()
+        representations = snapshot.representations.get(language_code)
+        if representations is None:
+            representations = OrderedDict(
+                (pk, self.represent(snapshot, pk, values, language_code))
+                for pk, values in snapshot.rows.items()
+            )
+            snapshot.representations[language_code] = representations
+        return representations
+
+    def get_item(self, pk, language_code=None):
+        """Return the represented row of the given primary key or None."""
+        return self.get_map(language_code).get(pk)
+
+    def represent(self, snapshot, pk, values, language_code):
+        row = dict(zip(snapshot.field_names, values))
+        data = OrderedDict([(self.pk_name, pk)])
+        for field in self.fields:
+            data[field] = row[field]
+        for name in self.relations:
+            data[name] = snapshot.relations[name].get(pk, [])
+        translations = snapshot.translations.get(pk, {})
+        translation = None
+        for choice in get_active_language_choices(language_code):
+            if choice in translations:
+                translation = dict(zip(snapshot.translation_field_names, translations[choice]))
+                break
+        for field in self.translated_fields:
+            data[field] = translation[field] if translation else None
+        return data
+
+    def get_instance(self, pk):
+        """Return a new model instance of the given primary key or None.
+
+        The translations of the instance are set up front, so the translated
+        fields can be read without queries.
+        """
+        snapshot = self.get_snapshot()
+        values = snapshot.rows.get(pk)
+        if values is None:
+            return None
+        db = self.model._default_manager.db
+        instance = self.model.from_db(db, snapshot.field_names, values)
+        local_cache = instance._translations_cache[self.translation_model]
+        translations = snapshot.translations.get(pk, {})
+        for language_code, name in settings.LANGUAGES:
+            if language_code in translations:
+                local_cache[language_code] = self.translation_model.from_db(
+                    db,
+                    snapshot.translation_field_names,
+                    translations[language_code],
+                )
+            else:
+                local_cache[language_code] = MISSING
+        return instance
+
+    def announce_change(self, action='post_save', **kwargs):
+        if action.startswith('pre_'):
+            return
+        # The changing thread sees its own changes right away, the other
+        # threads and processes only after they have been committed.
+        self.local.snapshot = None
+        self.local.pending_change = True
+        transaction.on_commit(self.publish_change)
+
+    def publish_change(self):
+        self.snapshot = None
+        self.local.snapshot = None
+        self.local.pending_change = False
+        bump_generation(self.generation_name)
+
+    def connect_signals(self):
+        for model in (self.model, self.translation_model):
+            post_save.connect(self.announce_change, sender=model, weak=False)
+            post_delete.connect(self.announce_change, sender=model, weak=False)
+        for name in self.relations:
+            m2m_changed.connect(
+                self.announce_change,
+                sender=self.model._meta.get_field(name).remote_field.through,
+                weak=False,
+            )
+
+
+def catalog_response(request, catalog):
+    """Return the rows of the catalog in the active language.
+
+    The response has a strong ETag derived from the version of the catalog,
+    so clients revalidating an unchanged catalog get an empty 304 response.
+    """
+    etag = '"{}-{}"'.format(catalog.get_version(), get_language())
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in (value.strip() for value in if_none_match.split(',')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(catalog.get_list())
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Language',))
+    return response
+
+
+class CatalogPrimaryKeyRelatedField(BulkPrimaryKeyRelatedField):
+    """Primary key related field validating the ids against a catalog
+    instead of querying the database for every id.
+
+    Ids missing from the catalog are looked up from the database, as they
+    may have been created in the current transaction. With `many=True`, the
+    missing ids are looked up with a single query.
+    """
+
+    def __init__(self, catalog, **kwargs):
+        self.catalog = catalog
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', catalog.model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def get_objects(self, pks):
+        objects = {}
+        for pk in pks:
+            instance = self.catalog.get_instance(pk)
+            if instance is not None:
+                objects[pk] = instance
+        missing_pks = set(pks) - set(objects)
+        if missing_pks:
+            objects.update(super().get_objects(missing_pks))
+        return objects
+
+    def to_internal_value(self, data):
+        instance = None
+        if not isinstance(data, bool):
+            try:
+                instance = self.catalog.get_instance(int(data))
+            except (TypeError, ValueError):
+                pass
+        if instance is None:
+            return super().to_internal_value(data)
+        return instance
@@ -0,0 +1,46 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Count, F, Func, IntegerField, ManyToManyField
+
+
+def count_facet(queryset, field_name):
+    """Return a dictionary of values of the given field and the number of
+    rows of the queryset having each value.
+
+    The counts are calculated with a single grouped query. Many-to-many
+    relations are counted from the through table and array fields are
+    unnested, so every related id or element gets its own count. Rows without
+    a value are not counted.
+    """
+    model = queryset.model
+    field = model._meta.get_field(field_name)
+    row_ids = queryset.order_by().values('pk')
+
+    if isinstance(field, ManyToManyField):
+        through = field.remote_field.through
+        source_name = field.m2m_field_name()
+        rows = (
+            through.objects
+            .filter(**{'{}__in'.format(source_name): row_ids})
+            .values_list(field.m2m_reverse_name())
+            .annotate(count=Count(source_name))
+        )
+    elif isinstance(field, ArrayField):
+        rows = (
+            model.objects
+            .filter(pk__in=row_ids)
+            .annotate(facet_value=Func(
+                F(field.attname),
+                function='unnest',
+                output_field=IntegerField(),
+            ))
+            .values_list('facet_value')
+            .annotate(count=Count('*'))
+        )
+    else:
+        rows = (
+            model.objects
+            .filter(pk__in=row_ids, **{'{}__isnull'.format(field.attname): False})
+            .values_list(field.attname)
+            .annotate(count=Count('pk'))
+        )
+    return dict(rows.order_by())
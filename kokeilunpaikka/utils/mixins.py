@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .cache import get_generation
+from .facets import count_facet
+
+
+class CachedObjectMixin:
+    """Fetch the object of a detail view only once per request.
+
+    Permission classes, actions and helper methods may all call `get_object`
+    during the same request. The object is fetched and its permissions are
+    checked on the first call only.
+    """
+
+    def get_object(self):
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+
+class FacetCountsMixin:
+    """Add a `facets` action returning the number of rows per option of
+    each facet for the current filter state.
+
+    Facets are declared in the `facets` attribute of the filterset class as
+    a dictionary of facet names and model field names. The counts are cached
+    per normalized filter combination until `facets_generation` changes.
+    Set `facets_vary_by_user` if the visible rows depend on the user.
+    """
+    facets_cache_timeout = 5 * 60
+    facets_generation = None
+    facets_vary_by_user = False
+
+    @action(detail=False)
+    def facets(self, request, *args, **kwargs):
+        cache_key = self.get_facets_cache_key()
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = {
+                name: [
+                    {'id': value, 'count': count}
+                    for value, count in sorted(count_facet(queryset, field_name).items())
+                ]
+                for name, field_name in self.filterset_class.facets.items()
+            }
+            cache.set(cache_key, data, self.facets_cache_timeout)
+        return Response(data)
+
+    def get_facets_cache_key(self):
+        """Return a cache key identifying the filter state of the request.
+
+        Parameters which do not filter the rows, like ordering and
+        pagination, are ignored and the values are sorted, so equal filter
+        states share the cache entry.
+        """
+        parameter_names = set(self.filterset_class.base_filters)
+        parameter_names.add(api_settings.SEARCH_PARAM)
+        query_params = self.request.query_params
+        filter_state = sorted(
+            (name, sorted(value for value in query_params.getlist(name) if value))
+            for name in parameter_names.intersection(query_params)
+        )
+        if self.facets_vary_by_user and self.request.user.is_authenticated:
+            filter_state.append(('user', self.request.user.id))
+        return 'facets:{}:{}:{}'.format(
+            self.basename,
+            get_generation(self.facets_generation),
+            hashlib.sha256(json.dumps(filter_state).encode()).hexdigest(),
+        )
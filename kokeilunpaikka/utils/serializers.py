@@ -1,5 +1,11 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+
 from easy_thumbnails.templatetags.thumbnail import thumbnail_url
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from .translations import prefetch_translations
 
 
 class ThumbnailImageField(serializers.ImageField):
@@ -35,3 +41,90 @@ class ThumbnailImageField(serializers.ImageField):
         absolute_url = request.build_absolute_uri(thumbnail_path) if thumbnail_path else ''
 
         return absolute_url
+
+
+class TranslationPrefetchListSerializer(serializers.ListSerializer):
+    """List serializer loading the translations of all listed objects up
+    front with `TranslationPrefetchMixin.prefetch_translations`.
+    """
+
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.prefetch_translations(iterable)
+        return super().to_representation(iterable)
+
+
+class TranslationPrefetchMixin:
+    """Mixin for serializers of translatable objects, which loads the
+    translations of the represented objects and the relations listed in
+    `translated_relations` before the objects are represented.
+
+    Set `TranslationPrefetchListSerializer` as the `list_serializer_class` of
+    the serializer to load the translations of whole lists at once.
+    """
+    translated_relations = ()
+
+    def prefetch_translations(self, instances):
+        prefetch_translations(instances, *self.translated_relations)
+
+    def to_representation(self, instance):
+        if not isinstance(self.parent, TranslationPrefetchListSerializer):
+            self.prefetch_translations([instance])
+        return super().to_representation(instance)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Many related field validating all given primary keys at once with
+    `BulkPrimaryKeyRelatedField.to_internal_values`.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_values(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field which, with `many=True`, fetches all given
+    objects with a single query instead of a query per primary key.
+
+    All primary keys missing from the queryset are reported at once.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def get_objects(self, pks):
+        """Return a dictionary of the existing objects of the given primary
+        keys.
+        """
+        return self.get_queryset().in_bulk(pks)
+
+    def to_internal_values(self, data):
+        pk_field = self.get_queryset().model._meta.pk
+        pks = []
+        for value in data:
+            if self.pk_field is not None:
+                value = self.pk_field.to_internal_value(value)
+            if isinstance(value, bool):
+                self.fail('incorrect_type', data_type=type(value).__name__)
+            try:
+                pks.append(pk_field.to_python(value))
+            except DjangoValidationError:
+                self.fail('incorrect_type', data_type=type(value).__name__)
+
+        objects = self.get_objects(set(pks))
+        missing_pks = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing_pks:
+            raise serializers.ValidationError([
+                self.error_messages['does_not_exist'].format(pk_value=pk)
+                for pk in missing_pks
+            ])
+        return [objects[pk] for pk in pks]
@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from django.db.models import Manager, prefetch_related_objects
+from django.db.models.constants import LOOKUP_SEP
+
+from parler.cache import MISSING
+from parler.models import TranslatableModelMixin
+from parler.utils.i18n import get_active_language_choices
+
+
+def get_related_objects(objects, lookup):
+    """Return the objects related to the given objects through the lookup.
+
+    The lookup follows the same syntax as `prefetch_related`. Relations which
+    have not been prefetched are queried for every object.
+    """
+    for name in lookup.split(LOOKUP_SEP):
+        related_objects = []
+        for obj in objects:
+            value = getattr(obj, name, None)
+            if isinstance(value, Manager):
+                related_objects.extend(value.all())
+            elif value is not None:
+                related_objects.append(value)
+        objects = related_objects
+    return objects
+
+
+def prefetch_translations(objects, *lookups, language_code=None):
+    """Load the translations of the given objects and the objects related to
+    them through the lookups.
+
+    The relations are prefetched first. Translations in the given or the
+    active language and in its fallback languages are then fetched with one
+    query per translated model and stored in the translation cache of parler,
+    so reading the translated fields does not cause further queries.
+    Languages without a translation are marked missing.
+    """
+    objects = list(objects)
+    if lookups:
+        prefetch_related_objects(objects, *lookups)
+    translatable_objects = [
+        obj for obj in objects if isinstance(obj, TranslatableModelMixin)
+    ]
+    for lookup in lookups:
+        translatable_objects.extend(
+            obj for obj in get_related_objects(objects, lookup)
+            if isinstance(obj, TranslatableModelMixin)
+        )
+
+    language_codes = get_active_language_choices(language_code)
+    pending = defaultdict(lambda: defaultdict(list))
+    for obj in translatable_objects:
+        if obj.pk is None:
+            continue
+        for meta in obj._parler_meta:
+            local_cache = obj._translations_cache[meta.model]
+            if any(code not in local_cache for code in language_codes):
+                pending[meta.model][obj.pk].append(obj)
+
+    for translation_model, objects_by_pk in pending.items():
+        translations = defaultdict(dict)
+        for translation in translation_model._default_manager.filter(
+            language_code__in=language_codes,
+            master_id__in=objects_by_pk.keys(),
+        ):
+            translations[translation.master_id][translation.language_code] = translation
+        for pk, pk_objects in objects_by_pk.items():
+            for obj in pk_objects:
+                local_cache = obj._translations_cache[translation_model]
+                for code in language_codes:
+                    local_cache.setdefault(code, translations[pk].get(code, MISSING))